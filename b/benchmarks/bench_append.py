@@ -0,0 +1,64 @@
+"""
+Append benchmark: POST /upload/{session_id}/append of a fixed number of rows onto
+sessions of growing size. Only the new rows are parsed, profiled and stored, so the
+append time should stay flat while the base grows (compare with the base upload).
+
+  upload  cold POST /upload of the base dataset
+  append  POST /upload/{session_id}/append of --append-rows new rows
+  read    the first read of the session afterwards (combines the appended rows once)
+
+    cd b && python -m benchmarks.bench_append --sizes 100k,1m --append-rows 10000
+"""
+import os
+import time
+import logging
+import argparse
+
+from fastapi.testclient import TestClient
+
+from benchmarks.datasets import SIZES, csv_path, make_frame
+
+
+def bench(client: TestClient, session_store, rows: int, cols: int, append_rows: int) -> dict:
+    with open(csv_path(rows, cols), "rb") as f:
+        start = time.perf_counter()
+        response = client.post("/upload", files={"file": ("base.csv", f, "text/csv")})
+        upload = time.perf_counter() - start
+    session_id = response.json()["session_id"]
+
+    body = make_frame(append_rows, cols, offset=rows).to_csv(index=False)
+    start = time.perf_counter()
+    response = client.post(f"/upload/{session_id}/append", files={"file": ("rows.csv", body, "text/csv")})
+    append = time.perf_counter() - start
+    response.raise_for_status()
+
+    start = time.perf_counter()
+    session = session_store.get(session_id)
+    read = time.perf_counter() - start
+    assert len(session["df"]) == rows + append_rows
+    session_store.delete(session_id)
+    return {"rows": rows, "upload": upload, "append": append, "read": read}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1m", help=f"base sizes, from {','.join(SIZES)}")
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--append-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    import main as app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with TestClient(app.app) as client:
+        for size in args.sizes.split(","):
+            result = bench(client, app.session_store, SIZES[size], args.cols, args.append_rows)
+            print(
+                f"base={result['rows']:>10}  upload={result['upload']:.3f}s  "
+                f"append({args.append_rows})={result['append']:.3f}s  first read={result['read']:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
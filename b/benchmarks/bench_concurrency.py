@@ -0,0 +1,55 @@
+"""
+Concurrency benchmark: chats completed per second through the shared workflow
+with a fake LLM (fixed latency per call), at increasing numbers of in-flight chats.
+With async nodes, throughput should scale roughly linearly with concurrency.
+
+    cd b && python -m benchmarks.bench_concurrency [total_chats]
+"""
+import os
+import sys
+import time
+import asyncio
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+import pandas as pd  # noqa: E402
+
+from config.settings import set_llm  # noqa: E402
+from models.agent_state import AgentState  # noqa: E402
+from services.data_quality import generate_dqr_and_context  # noqa: E402
+from services.llm_workflow import get_workflow, workflow_config  # noqa: E402
+from benchmarks.fake_llm import FakeChatModel  # noqa: E402
+
+
+async def run_batch(df: pd.DataFrame, context: str, total: int, concurrency: int) -> float:
+    workflow = get_workflow()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one_chat(i: int):
+        async with limit:
+            state = AgentState(
+                user_query=f"How many rows? ({i})", df=df, dqr_report=context,
+                code_result="", error="", generated_code="", retries=0,
+            )
+            await workflow.ainvoke(state, config=workflow_config())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_chat(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    set_llm(FakeChatModel(latency=0.05))
+    df = pd.DataFrame({"a": range(1000), "b": ["x", "y"] * 500})
+    _, context = generate_dqr_and_context(df)
+
+    baseline = None
+    for concurrency in (1, 4, 16, 64):
+        throughput = asyncio.run(run_batch(df, context, total, concurrency))
+        baseline = baseline or throughput
+        print(f"in-flight={concurrency:>3}  chats/s={throughput:8.1f}  speedup={throughput / baseline:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
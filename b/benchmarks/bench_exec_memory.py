@@ -0,0 +1,63 @@
+"""
+Memory benchmark: peak bytes allocated per chat by the execute step, comparing the
+old per-attempt `df.copy().reset_index(drop=True)` with the copy-on-write view.
+Each "chat" runs two execution attempts (first attempt + one retry).
+
+    cd b && python -m benchmarks.bench_exec_memory [rows]
+"""
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from services.llm_workflow import execute_code_node  # noqa: E402
+from services.sandbox import run_code_in_namespace  # noqa: E402
+
+QUERIES = {
+    "read-only": "print(df.groupby('region')['revenue'].mean())",
+    "mutating": "df['revenue'] = df['revenue'] * 1.1\nprint(df['revenue'].sum())",
+}
+
+
+def legacy_execute(state: dict) -> dict:
+    # The pre-change behaviour, kept here only for comparison
+    df_clean = state['df'].copy().reset_index(drop=True)
+    output, error, _, _ = run_code_in_namespace(state['generated_code'], df_clean, None)
+    return {**state, "df": df_clean, "code_result": output, "error": error}
+
+
+def peak_per_chat(execute, df: pd.DataFrame, code: str, attempts: int = 2) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    state = {"df": df, "generated_code": code}
+    for _ in range(attempts):
+        execute(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "revenue": rng.random(rows),
+        "units": rng.integers(0, 100, rows),
+        "cost": rng.random(rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+    })
+    frame_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"frame: {rows} rows, {frame_mb:.1f} MB")
+
+    for name, code in QUERIES.items():
+        before = peak_per_chat(legacy_execute, df, code) / 1e6
+        after = peak_per_chat(execute_code_node, df, code) / 1e6
+        print(f"{name:<10} peak per chat: before={before:8.1f} MB  after={after:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
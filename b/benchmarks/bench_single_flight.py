@@ -0,0 +1,88 @@
+"""
+Coalescing and LLM connection-pool benchmark against a local stub of the Groq API
+(benchmarks.stub_llm_server), using the real ChatGroq client.
+
+  identical  N concurrent POST /chat with the same question on the same dataset:
+             one workflow run serves all of them (LLM requests stay at one run's worth)
+  distinct   N concurrent POST /chat with different questions: every chat calls the
+             LLM, but never more than LLM_MAX_CONNECTIONS at once, over reused connections
+
+    cd b && python -m benchmarks.bench_single_flight --requests 32 --max-connections 4
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+async def fire(client, session_id: str, queries: list[str]) -> tuple[float, list[str]]:
+    async def one(query: str) -> str:
+        response = await client.post("/chat", data={"session_id": session_id, "query": query})
+        return response.text
+
+    start = time.perf_counter()
+    bodies = await asyncio.gather(*(one(q) for q in queries))
+    return time.perf_counter() - start, bodies
+
+
+async def run(args, server: StubLLMServer) -> None:
+    import httpx
+    import main
+    from config.settings import aclose_llm
+
+    logging.getLogger().setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        body = "a,b\n" + "\n".join(f"{i},{'xy'[i % 2]}" for i in range(1000))
+        response = await client.post("/upload", files={"file": ("bench.csv", body, "text/csv")})
+        session_id = response.json()["session_id"]
+
+        server.reset()
+        question = "Which value of b is most common among rows with an even a?"
+        elapsed, bodies = await fire(client, session_id, [question] * args.requests)
+        stats = server.stats()
+        complete = sum('"done"' in b for b in bodies)
+        print(
+            f"identical  requests={args.requests}  completed={complete}  llm_requests={stats['requests']}  "
+            f"coalesced={main.chat_flights.coalesced}  wall={elapsed:.2f}s"
+        )
+
+        server.reset()
+        questions = [f"Which value of b is most common among rows with a above {i}?" for i in range(args.requests)]
+        elapsed, bodies = await fire(client, session_id, questions)
+        stats = server.stats()
+        complete = sum('"done"' in b for b in bodies)
+        print(
+            f"distinct   requests={args.requests}  completed={complete}  llm_requests={stats['requests']}  "
+            f"max_concurrent={stats['max_concurrent']} (limit {args.max_connections})  "
+            f"connections={stats['connections']}  wall={elapsed:.2f}s"
+        )
+    await aclose_llm()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub response time per LLM call, seconds")
+    parser.add_argument("--max-connections", type=int, default=4)
+    args = parser.parse_args()
+
+    server = StubLLMServer(latency=args.latency, code="print(df[df['a'] % 2 == 0]['b'].mode())").start()
+    # Read by config.settings at import time
+    os.environ["LLM_BASE_URL"] = server.url
+    os.environ["LLM_MAX_CONNECTIONS"] = str(args.max_connections)
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    if "config.settings" in sys.modules:
+        sys.exit("config.settings was imported before the stub URL was set")
+    try:
+        asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
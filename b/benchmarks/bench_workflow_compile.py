@@ -0,0 +1,36 @@
+"""
+Microbenchmark: per-request cost of building + compiling the LangGraph workflow
+versus reusing the shared compiled graph.
+
+    cd b && python -m benchmarks.bench_workflow_compile [iterations]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+from services.llm_workflow import build_workflow, get_workflow  # noqa: E402
+
+
+def bench(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    get_workflow()  # warm up the shared graph
+
+    per_build = bench(build_workflow, iterations)
+    per_reuse = bench(get_workflow, iterations)
+
+    print(f"build_workflow() per request: {per_build * 1e3:.3f} ms")
+    print(f"get_workflow()   per request: {per_reuse * 1e6:.3f} µs")
+    print(f"overhead removed per request: {(per_build - per_reuse) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Synthetic CSV datasets for the benchmark suite.
+
+Every dataset is deterministic for a given (rows, cols, seed), so timings from different
+commits are measured on identical bytes. Column kinds cycle through integer, float,
+low-cardinality text, free text, date and a float column with ~5% missing values, so
+profiling, dtype inference and generated code all see realistic work. Files are written
+in chunks (bounded memory even at 10M rows) and cached under the benchmark data dir.
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.getenv("BENCH_DATA_DIR", os.path.join(tempfile.gettempdir(), "chatcsv-bench-data"))
+
+# Named shapes used by benchmarks.run (--widths)
+WIDTHS = {"narrow": 8, "wide": 200, "very-wide": 1000}
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+KINDS = ("int", "float", "category", "text", "date", "float_nulls")
+CATEGORIES = np.array(["north", "south", "east", "west", "central"])
+CHUNK_ROWS = 500_000
+
+
+def column_name(i: int) -> str:
+    return f"{KINDS[i % len(KINDS)]}_{i}"
+
+
+def make_frame(rows: int, cols: int, seed: int = 0, offset: int = 0) -> pd.DataFrame:
+    """`rows` synthetic rows starting at row `offset` (chunks of one dataset never overlap)."""
+    rng = np.random.default_rng([seed, offset])
+    data = {}
+    for i in range(cols):
+        kind = KINDS[i % len(KINDS)]
+        if kind == "int":
+            values = rng.integers(0, 1_000_000, rows)
+        elif kind == "float":
+            values = np.round(rng.normal(100, 25, rows), 3)
+        elif kind == "category":
+            values = CATEGORIES[rng.integers(0, len(CATEGORIES), rows)]
+        elif kind == "text":
+            values = np.char.add("item-", (np.arange(rows) + offset).astype(str))
+        elif kind == "date":
+            days = rng.integers(0, 3650, rows).astype("timedelta64[D]")
+            values = (np.datetime64("2015-01-01") + days).astype(str)
+        else:
+            values = np.round(rng.random(rows) * 1000, 2)
+            values[rng.random(rows) < 0.05] = np.nan
+        data[column_name(i)] = values
+    return pd.DataFrame(data)
+
+
+def csv_path(rows: int, cols: int, seed: int = 0) -> str:
+    """Path of the cached CSV for this shape, generating it on first use."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"synthetic_{rows}x{cols}_s{seed}.csv")
+    if os.path.exists(path):
+        return path
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        for offset in range(0, rows, CHUNK_ROWS):
+            chunk = make_frame(min(CHUNK_ROWS, rows - offset), cols, seed, offset)
+            chunk.to_csv(f, index=False, header=offset == 0)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,71 @@
+"""Deterministic stand-in for the Groq chat model (no network, fixed latency)."""
+import asyncio
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeChatModel(BaseChatModel):
+    # Returned (inside a ```python block) for code-generation prompts.
+    code: str = "print(len(df))"
+    # Returned for every other prompt (humanize step).
+    answer: str = "The dataset contains the requested number of rows."
+    # Simulated round-trip time per call, in seconds (plus up to `jitter`, uniformly random).
+    latency: float = 0.05
+    jitter: float = 0.0
+    # Share of code-generation calls that return code which raises (to exercise retries).
+    failure_rate: float = 0.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._rng = random.Random(self.seed)
+
+    def _delay(self) -> float:
+        return self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        if "Expert Python Data Analyst" in prompt:
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                return "```python\nraise ValueError('simulated faulty program')\n```"
+            return f"```python\n{self.code}\n```"
+        return self.answer
+
+    @staticmethod
+    def _usage(messages, reply: str) -> dict:
+        # Same rough estimate as services.schema_index.estimate_tokens (~4 characters per token)
+        prompt = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion = len(reply) // 4 + 1
+        return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+    def _message(self, messages) -> AIMessage:
+        reply = self._reply(messages)
+        return AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Streams word by word; the first token arrives after `latency`.
+        await asyncio.sleep(self._delay())
+        reply = self._reply(messages)
+        for i, word in enumerate(reply.split(" ")):
+            token = word if i == 0 else f" {word}"
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        # Like providers that stream usage, report it on a final empty chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, reply)))
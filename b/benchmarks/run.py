@@ -0,0 +1,202 @@
+"""
+Offline benchmark suite for the upload and chat pipeline (no network: the LLM is
+replaced by benchmarks.fake_llm.FakeChatModel with canned code and answers).
+
+For every dataset shape it times:
+  upload        cold POST /upload (spool, parse, profile, index, store)
+  upload_dedup  the same bytes uploaded again (content-addressed attach)
+  profile       generate_dqr_and_context on the parsed frame
+  execute       execute_code_node with the canned code
+  chat          end-to-end POST /chat, until the SSE "done" event (also time to first delta)
+
+Results are written as JSON so runs from different commits can be compared:
+
+    cd b && python -m benchmarks.run --sizes 10k,100k --widths narrow,wide --output before.json
+    cd b && python -m benchmarks.run --sizes 10k,100k --widths narrow,wide --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import main
+from config.settings import set_llm
+from models.agent_state import AgentState
+from services.data_quality import generate_dqr_and_context
+from services.llm_workflow import execute_code_node
+from services.result_cache import ResultCache
+from services.session_store import create_session_backend
+from benchmarks.datasets import SIZES, WIDTHS, csv_path
+from benchmarks.fake_llm import FakeChatModel
+
+CODE = 'print(df.select_dtypes("number").mean().round(2).head())'
+ANSWER = "The averages of the first numeric columns are listed above."
+QUERY = "What is the average of each numeric column?"
+
+
+# ------------------------------------------------
+# 1. TIMING HELPERS
+# ------------------------------------------------
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": len(samples),
+    }
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ------------------------------------------------
+# 2. STAGES
+# ------------------------------------------------
+
+def upload(client: TestClient, body: bytes) -> dict:
+    response = client.post("/upload", files={"file": ("bench.csv", body, "text/csv")})
+    response.raise_for_status()
+    return response.json()
+
+
+def chat(client: TestClient, session_id: str) -> float:
+    """Streams one chat to the end; returns seconds to the first answer token."""
+    start = time.perf_counter()
+    first_delta = None
+    with client.stream("POST", "/chat", data={"session_id": session_id, "query": QUERY}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if first_delta is None and line.startswith("data: ") and '"delta"' in line:
+                first_delta = time.perf_counter() - start
+    return first_delta if first_delta is not None else time.perf_counter() - start
+
+
+def bench_dataset(client: TestClient, rows: int, cols: int, repeat: int) -> list[dict]:
+    path = csv_path(rows, cols)
+    with open(path, "rb") as f:
+        body = f.read()
+    name = f"{rows}x{cols}"
+    common = {"dataset": name, "rows": rows, "cols": cols, "csv_bytes": len(body)}
+    results = []
+
+    def cold_upload():
+        # A fresh store each time, otherwise every repeat after the first is a dedup hit
+        main.session_store = create_session_backend()
+        upload(client, body)
+
+    samples = timed(cold_upload, repeat)
+    results.append({**common, "stage": "upload", **summarize(samples),
+                    "mb_per_s": len(body) / 1e6 / statistics.median(samples)})
+
+    session_id = upload(client, body)["session_id"]
+    results.append({**common, "stage": "upload_dedup", **summarize(timed(lambda: upload(client, body), repeat))})
+
+    df = main.session_store.get(session_id)["df"]
+    results.append({**common, "stage": "profile", **summarize(timed(lambda: generate_dqr_and_context(df), repeat))})
+
+    state = AgentState(
+        user_query=QUERY, df=df, dqr_report="", code_result="", error="",
+        generated_code=CODE, retries=0, dataset_path="", stats_index=None,
+    )
+    results.append({**common, "stage": "execute", **summarize(timed(lambda: execute_code_node(state), repeat))})
+
+    first_deltas = []
+
+    def one_chat():
+        # Fresh answer cache: every repeat runs the full workflow
+        main.result_cache = ResultCache()
+        first_deltas.append(chat(client, session_id))
+
+    samples = timed(one_chat, repeat)
+    results.append({**common, "stage": "chat", **summarize(samples),
+                    "first_delta_median_s": statistics.median(first_deltas)})
+    return results
+
+
+# ------------------------------------------------
+# 3. REPORTING
+# ------------------------------------------------
+
+def print_results(results: list[dict], baseline: dict | None = None) -> None:
+    print(f"{'dataset':<14} {'stage':<13} {'median_s':>10} {'min_s':>10}" + ("  vs baseline" if baseline else ""))
+    for r in results:
+        line = f"{r['dataset']:<14} {r['stage']:<13} {r['median_s']:>10.4f} {r['min_s']:>10.4f}"
+        previous = (baseline or {}).get((r["dataset"], r["stage"]))
+        if previous:
+            line += f"  {previous['median_s'] / r['median_s']:6.2f}x"
+        print(line)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["dataset"], r["stage"]): r for r in report["results"]}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma separated, from {','.join(SIZES)}")
+    parser.add_argument("--widths", default="narrow,wide", help=f"comma separated, from {','.join(WIDTHS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cells", type=int, default=50_000_000,
+                        help="skip shapes with more rows*cols than this (0 = no limit)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    # main.py logs every request (and answer) at INFO; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    set_llm(FakeChatModel(latency=args.llm_latency, code=CODE, answer=ANSWER))
+    shapes = [(SIZES[s], WIDTHS[w]) for s in args.sizes.split(",") for w in args.widths.split(",")]
+
+    results = []
+    with TestClient(main.app) as client:
+        for rows, cols in shapes:
+            if args.max_cells and rows * cols > args.max_cells:
+                print(f"skipping {rows}x{cols} (more than --max-cells)", file=sys.stderr)
+                continue
+            results.extend(bench_dataset(client, rows, cols, args.repeat))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "cpu_count": os.cpu_count(),
+            "llm_latency": args.llm_latency,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    print_results(results, load_baseline(args.compare) if args.compare else None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
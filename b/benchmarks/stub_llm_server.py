@@ -0,0 +1,164 @@
+"""
+Local stand-in for the Groq HTTP API (OpenAI-compatible chat completions, plain and
+streamed), so the real ChatGroq client and its connection pool can be exercised offline.
+Replies like benchmarks.fake_llm: canned code for code-generation prompts, a canned
+answer otherwise. Counts requests, TCP connections and the peak of concurrent requests.
+
+    server = StubLLMServer(latency=0.2).start()
+    os.environ["LLM_BASE_URL"] = server.url   # before config.settings is imported
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive: several requests per connection, as a pooled client sends them
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.opened_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        stub.started()
+        try:
+            time.sleep(stub.latency)
+            reply = stub.reply(body.get("messages", []))
+            if body.get("stream"):
+                self._stream(body, reply)
+            else:
+                self._send_json(stub.completion(body, reply))
+        finally:
+            stub.finished()
+
+    def _send_json(self, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, body: dict, reply: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = reply.split(" ")
+        pieces = [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            self._chunk(self.server.stub.chunk(body, piece, reply if last else None))
+        self._chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, payload):
+        data = f"data: {payload if isinstance(payload, str) else json.dumps(payload)}\n\n".encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+class StubLLMServer:
+    def __init__(self, latency: float = 0.1, code: str = "print(len(df))",
+                 answer: str = "The dataset contains the requested number of rows.", port: int = 0):
+        self.latency = latency
+        self.code = code
+        self.answer = answer
+        self.requests = 0
+        self.connections = 0
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubLLMServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.connections = self.max_concurrent = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "connections": self.connections, "max_concurrent": self.max_concurrent}
+
+    # Counters (handler threads)
+    def opened_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self._concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self._concurrent)
+
+    def finished(self):
+        with self._lock:
+            self._concurrent -= 1
+
+    # Responses
+    def reply(self, messages: list) -> str:
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        if "Expert Python Data Analyst" in prompt:
+            return f"```python\n{self.code}\n```"
+        return self.answer
+
+    @staticmethod
+    def _usage(body: dict, reply: str) -> dict:
+        prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4 + 1
+        completion = len(reply) // 4 + 1
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def completion(self, body: dict, reply: str) -> dict:
+        return {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop",
+            }],
+            "usage": self._usage(body, reply),
+        }
+
+    def chunk(self, body: dict, piece: str, reply: str | None = None) -> dict:
+        last = reply is not None
+        chunk = {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "delta": {"role": "assistant", "content": piece},
+                "finish_reason": "stop" if last else None,
+            }],
+        }
+        if last:
+            # Groq reports usage on the final chunk
+            chunk["x_groq"] = {"usage": self._usage(body, reply)}
+        return chunk
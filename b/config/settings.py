@@ -1,26 +1,237 @@
 from langchain_groq import ChatGroq # type: ignore
 from dotenv import load_dotenv
+import httpx
 import os
+import tempfile
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Groq API key
+# Groq API key (checked when the model is first used, so offline tools can import settings)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY not set in environment variables!")
 
 # Model configuration
 LLM_MODEL = "llama-3.3-70b-versatile"
 
+# LLM HTTP client: one pooled, keep-alive connection pool per process. At most
+# LLM_MAX_CONNECTIONS requests are in flight; further calls wait up to LLM_POOL_TIMEOUT
+# seconds for a free connection. LLM_BASE_URL points it at a proxy or a local stub.
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 16))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 60))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", 30))
+# Retries of failed HTTP requests (connection errors, 429/5xx) inside the client.
+LLM_HTTP_RETRIES = int(os.getenv("LLM_HTTP_RETRIES", 2))
+
+def _llm_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    )
+    timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT, pool=LLM_POOL_TIMEOUT)
+    return httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout)
+
 # Lazy LLM initialization (optional caching)
 def get_llm():
     if not hasattr(get_llm, "_llm"):
+        if not GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY not set in environment variables!")
+        http_client, http_async_client = _llm_http_clients()
         get_llm._llm = ChatGroq(
             model=LLM_MODEL,
             temperature=0.0,
             groq_api_key=GROQ_API_KEY,
+            base_url=LLM_BASE_URL,
+            timeout=http_async_client.timeout,
+            max_retries=LLM_HTTP_RETRIES,
+            http_client=http_client,
+            http_async_client=http_async_client,
         )
     return get_llm._llm
 
+async def aclose_llm() -> None:
+    """
+    Closes the pooled connections of the shared model (at shutdown) and drops the model,
+    so a later app lifespan in the same process builds one with fresh clients.
+    """
+    llm = getattr(get_llm, "_llm", None)
+    closed = False
+    for client in (getattr(llm, "http_async_client", None), getattr(llm, "http_client", None)):
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
+            closed = True
+        elif isinstance(client, httpx.Client):
+            client.close()
+            closed = True
+    # A model set with set_llm() holds no pooled clients and is kept
+    if closed and getattr(get_llm, "_llm", None) is llm:
+        del get_llm._llm
+
+def set_llm(llm):
+    """Overrides the shared chat model (benchmarks / offline runs use a fake model)."""
+    get_llm._llm = llm
+
 MAX_RETRIES = 2
+
+# Speculative generation: candidate programs requested (and executed) concurrently per
+# attempt; the first one that succeeds with output wins. 1 = one program per attempt.
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", 1))
+# Sampling temperature of the extra candidates (the first one keeps the model default).
+SPECULATIVE_TEMPERATURE = float(os.getenv("SPECULATIVE_TEMPERATURE", 0.7))
+
+# /chat/batch: most questions per request, and most LLM calls of one batch in flight at once.
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 20))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+
+
+# -----------------------------
+# 📥 Upload / ingest limits
+# -----------------------------
+# Size of each chunk read from the incoming upload stream.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # 1 MiB
+# Uploads larger than this spill from memory to a temp file on disk while spooling.
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", 8 * 1024 * 1024))  # 8 MiB
+# Hard limits (0 = unlimited).
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 0))
+UPLOAD_MAX_ROWS = int(os.getenv("UPLOAD_MAX_ROWS", 0))
+# Opt-in: uploads above this size are converted to Parquet on disk and queried chunk by
+# chunk (out-of-core engine) instead of being loaded into a DataFrame. Generated code then
+# gets a ChunkedFrame (no df[...] indexing, no appends), so it is off by default (0 = never).
+OUT_OF_CORE_THRESHOLD_BYTES = int(float(os.getenv("OUT_OF_CORE_THRESHOLD_MB", 0)) * 1024 * 1024)
+OUT_OF_CORE_DIR = os.getenv("OUT_OF_CORE_DIR", os.path.join(tempfile.gettempdir(), "chatcsv-out-of-core"))
+# Rows per chunk handed to generated code by df.iter_chunks().
+OUT_OF_CORE_CHUNK_ROWS = int(os.getenv("OUT_OF_CORE_CHUNK_ROWS", 250_000))
+# Background ingest: /upload returns a session id at once and parses/profiles in the
+# background (the upload form can also ask for it). A /chat for a session that is still
+# processing waits up to INGEST_CHAT_WAIT_SECONDS, then gets 409 (0 = reject at once).
+UPLOAD_BACKGROUND = os.getenv("UPLOAD_BACKGROUND", "0") == "1"
+INGEST_CHAT_WAIT_SECONDS = float(os.getenv("INGEST_CHAT_WAIT_SECONDS", 30))
+# How long finished background jobs stay queryable.
+INGEST_JOB_TTL_SECONDS = float(os.getenv("INGEST_JOB_TTL_SECONDS", 3600))
+
+# -----------------------------
+# 🗂️ Session store
+# -----------------------------
+# "memory": sessions live in this process (one uvicorn worker).
+# "filesystem": sessions live under SESSION_DIR and are shared by every worker on the host.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(tempfile.gettempdir(), "chatcsv-shared-sessions"))
+# Opened sessions each worker keeps in its local LRU (filesystem backend).
+SESSION_LOCAL_CACHE_ENTRIES = int(os.getenv("SESSION_LOCAL_CACHE_ENTRIES", 32))
+# Memory budget for resident session DataFrames (0 = unlimited).
+# Least-recently-used sessions above the budget are spilled to SESSION_SPILL_DIR.
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_MB", 1024)) * 1024 * 1024
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", os.path.join(tempfile.gettempdir(), "chatcsv-sessions"))
+# Sessions unused for this long are deleted with their files (checked at most once per
+# SESSION_SWEEP_SECONDS, when sessions are used). 0 = never.
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 24 * 3600))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", 60))
+
+# -----------------------------
+# 🔎 Profiling (DQR)
+# -----------------------------
+# Type inference runs on a sample sized for this margin of error at ~99% confidence.
+# Set PROFILE_EXACT=1 to run it on every row instead.
+PROFILE_EXACT = os.getenv("PROFILE_EXACT", "0") == "1"
+PROFILE_MARGIN_OF_ERROR = float(os.getenv("PROFILE_MARGIN_OF_ERROR", 0.01))
+PROFILE_CONFIDENCE_Z = float(os.getenv("PROFILE_CONFIDENCE_Z", 2.576))
+# Opt-in: distinct-value sketch (HyperLogLog) per column, built from every row at upload
+# and merged on append. It costs a full hashing pass at upload, so it is off by default
+# (the schema index then estimates cardinality from its row sample).
+# 2^precision one-byte registers per column; relative error ~1.04/sqrt(2^precision).
+PROFILE_SKETCHES = os.getenv("PROFILE_SKETCHES", "0") == "1"
+CARDINALITY_SKETCH_PRECISION = int(os.getenv("CARDINALITY_SKETCH_PRECISION", 12))
+
+# -----------------------------
+# 🧬 Dtype optimization at ingest
+# -----------------------------
+# Downcast numerics, use compact strings and parse DQR-flagged datetimes before storing
+# the frame. The upload form can override it.
+OPTIMIZE_DTYPES = os.getenv("OPTIMIZE_DTYPES", "0") == "1"
+# Opt-in: text columns with at most this share of distinct (non-null) values, and at most
+# CATEGORY_MAX_UNIQUE of them, become categoricals (e.g. 0.01). Off by default (0): generated
+# code sees different results on categoricals (value_counts/groupby list categories that
+# were filtered out, with count 0, and groupby does so by default on pandas < 3).
+CATEGORY_MAX_UNIQUE_RATIO = float(os.getenv("CATEGORY_MAX_UNIQUE_RATIO", 0))
+CATEGORY_MAX_UNIQUE = int(os.getenv("CATEGORY_MAX_UNIQUE", 1000))
+
+# -----------------------------
+# 🔐 Admin
+# -----------------------------
+# Enables the /admin/* endpoints (e.g. workflow hot-swap) when set.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# -----------------------------
+# ♻️ Result cache
+# -----------------------------
+# Tier 1: (dataset content hash, normalized query) -> generated code + final answer.
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 2048))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 6 * 3600))
+# Tier 2: (schema hash, normalized query) -> generated code (re-executed on new data).
+CODE_CACHE_MAX_ENTRIES = int(os.getenv("CODE_CACHE_MAX_ENTRIES", 4096))
+CODE_CACHE_TTL_SECONDS = float(os.getenv("CODE_CACHE_TTL_SECONDS", 24 * 3600))
+
+# -----------------------------
+# 🧪 Code execution
+# -----------------------------
+# "thread": run generated code in a worker thread of the API process.
+# "process": run it in a pool of sandbox processes with CPU/wall/memory limits.
+EXEC_MODE = os.getenv("EXEC_MODE", "thread")
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", os.cpu_count() or 2))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", 30))
+SANDBOX_WALL_SECONDS = float(os.getenv("SANDBOX_WALL_SECONDS", 60))
+SANDBOX_MEMORY_BYTES = int(os.getenv("SANDBOX_MEMORY_MB", 2048)) * 1024 * 1024
+# Static analysis of generated code before it runs: row-by-row patterns with an exact
+# vectorized form are rewritten; on datasets of at least CODE_ANALYSIS_HINT_MIN_ROWS rows
+# the others are sent back to the code generator (once per chat) instead of being executed.
+CODE_ANALYSIS = os.getenv("CODE_ANALYSIS", "1") == "1"
+CODE_ANALYSIS_HINT_MIN_ROWS = int(os.getenv("CODE_ANALYSIS_HINT_MIN_ROWS", 100_000))
+# Compiled code objects kept by source hash (per process / sandbox worker).
+COMPILE_CACHE_MAX_ENTRIES = int(os.getenv("COMPILE_CACHE_MAX_ENTRIES", 512))
+
+# -----------------------------
+# 🧷 Session namespace (variables kept between chat turns)
+# -----------------------------
+# Top-level variables that generated code defines (cleaned frames, aggregates...) are kept
+# per session and are in scope for follow-up questions. Off by default; the chat form can
+# turn it on per request. Namespaces live in this process (like the result cache).
+SESSION_NAMESPACE = os.getenv("SESSION_NAMESPACE", "0") == "1"
+# Memory cap per session; least-recently-used variables above it are dropped.
+SESSION_NAMESPACE_MAX_BYTES = int(os.getenv("SESSION_NAMESPACE_MAX_MB", 256)) * 1024 * 1024
+# Cap for all sessions together; least-recently-used sessions above it are dropped.
+SESSION_NAMESPACE_TOTAL_BYTES = int(os.getenv("SESSION_NAMESPACE_TOTAL_MB", 1024)) * 1024 * 1024
+
+# -----------------------------
+# 📋 Result tables
+# -----------------------------
+# Generated code can assign a table to `result` instead of printing it. The table is kept
+# as an Arrow file under RESULT_TABLE_DIR (shared by workers on the host) and served page
+# by page by GET /results/{id}; the answer step only sees a bounded summary of it.
+RESULT_TABLE_DIR = os.getenv("RESULT_TABLE_DIR", os.path.join(tempfile.gettempdir(), "chatcsv-results"))
+# Tables are deleted after this long, and oldest first when all of them exceed the size cap.
+RESULT_TABLE_TTL_SECONDS = float(os.getenv("RESULT_TABLE_TTL_SECONDS", 3600))
+RESULT_TABLE_MAX_BYTES = int(os.getenv("RESULT_TABLE_MAX_MB", 1024)) * 1024 * 1024
+# Most rows per page of GET /results/{id}.
+RESULT_PAGE_MAX_ROWS = int(os.getenv("RESULT_PAGE_MAX_ROWS", 1000))
+# Rows (and columns) of a result table shown to the answer step.
+RESULT_SUMMARY_ROWS = int(os.getenv("RESULT_SUMMARY_ROWS", 10))
+RESULT_SUMMARY_COLUMNS = int(os.getenv("RESULT_SUMMARY_COLUMNS", 20))
+# Printed output beyond this many characters is cut before it reaches the answer step.
+RESULT_TEXT_MAX_CHARS = int(os.getenv("RESULT_TEXT_MAX_CHARS", 8000))
+
+# -----------------------------
+# 🧭 Schema context for wide datasets
+# -----------------------------
+# Approximate token budget for the data context sent with each code-generation prompt.
+# Larger contexts are replaced by a query-specific selection of columns (0 = always full).
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", 3000))
+
+# -----------------------------
+# 📈 Tracing
+# -----------------------------
+# Send a {"timings": ...} summary (per-node wall time, tokens, exec CPU/memory, attempts)
+# as the last SSE event before "done". The chat form can override it per request.
+SSE_TIMINGS = os.getenv("SSE_TIMINGS", "0") == "1"
@@ -1,21 +1,80 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException
+from fastapi import FastAPI, UploadFile, Form, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import io
 from uuid import uuid4
 from models.agent_state import AgentState
-from services.data_quality import generate_dqr_and_context
-from services.llm_workflow import build_workflow
-from fastapi.responses import StreamingResponse
+from services.data_quality import profile_dataframe, merge_profiles, render_dqr_and_context
+from services.dtype_optimizer import optimize_dtypes, MemoryReport
+from services.ingest import (
+    spool_upload,
+    parse_csv,
+    dataset_key,
+    appended_key,
+    conform_rows,
+    UploadTooLarge,
+    CsvParseError,
+    SchemaMismatch,
+)
+from services.ingest_jobs import IngestJob, IngestJobRegistry
+from services.out_of_core import convert_csv, profile_chunked
+from services.namespace_store import NamespaceStore, names_used
+from services.code_analysis import compile_cache_stats
+from services.single_flight import SingleFlight
+from services.session_store import create_session_backend, frame_nbytes
+from services.result_cache import ResultCache, schema_fingerprint, normalize_query
+from services.result_tables import ResultTableStore
+from services.fast_path import StatsIndex, fast_path_stats
+from services.schema_index import SchemaIndex, schema_index_stats
+from services.llm_workflow import (
+    get_workflow,
+    install_workflow,
+    workflow_info,
+    workflow_config,
+    speculation_stats,
+    run_batch,
+)
+from services.sandbox import get_sandbox_pool, shutdown_sandbox_pool
+from services.metrics import Trace, upload_stage, render_metrics, CHAT_SECONDS, CHAT_RETRIES
+from config.settings import (
+    get_llm,
+    aclose_llm,
+    ADMIN_TOKEN,
+    EXEC_MODE,
+    OPTIMIZE_DTYPES,
+    SSE_TIMINGS,
+    SPECULATIVE_CANDIDATES,
+    UPLOAD_BACKGROUND,
+    UPLOAD_MAX_ROWS,
+    INGEST_CHAT_WAIT_SECONDS,
+    OUT_OF_CORE_THRESHOLD_BYTES,
+    SESSION_NAMESPACE,
+    BATCH_MAX_QUERIES,
+)
+from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse, PlainTextResponse
 import asyncio
 import json
+import time
 import logging
+import secrets
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Data Analysis Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail at startup, not on the first chat, if the model is not configured
+    get_llm()
+    # Compile the LangGraph workflow once per process; all requests share it
+    get_workflow()
+    if EXEC_MODE == "process":
+        # Start the sandbox workers up front so the first chat does not pay for it
+        get_sandbox_pool()
+    yield
+    shutdown_sandbox_pool()
+    await aclose_llm()
+
+app = FastAPI(title="Data Analysis Agent API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,15 +85,64 @@ app.add_middleware(
 )
 
 # -----------------------------
-# ⚙️ Simple in-memory session cache
+# ⚙️ Session store: in-process (memory budget + LRU spill) or shared filesystem
 # -----------------------------
-session_store = {}
+session_store = create_session_backend()
+
+# ⏳ Background uploads still being parsed/profiled by this process
+ingest_jobs = IngestJobRegistry()
+# Seconds between progress events of a background upload
+INGEST_PROGRESS_INTERVAL = 0.5
+
+# ♻️ Answer/code cache keyed by dataset key (content hash) + normalized query
+result_cache = ResultCache()
+# Variables kept between chat turns (opt-in, per process)
+namespace_store = NamespaceStore()
+# Concurrent identical chats share one workflow run
+chat_flights = SingleFlight()
+# Tables generated code returned as `result`, served page by page
+result_tables = ResultTableStore()
 
 @app.get("/")
 async def health_check():
     """Health check endpoint to verify server is running."""
     return {"message": "ChatCSV API is running ✅"}
 
+@app.get("/stats")
+async def stats():
+    """Runtime counters used to size workers."""
+    return {
+        "sessions": session_store.stats(),
+        "ingest_jobs": ingest_jobs.stats(),
+        "result_cache": result_cache.stats(),
+        "result_tables": result_tables.stats(),
+        "coalescing": chat_flights.stats(),
+        "namespaces": namespace_store.stats(),
+        "fast_path": fast_path_stats(),
+        "schema_context": schema_index_stats(),
+        "sandbox": get_sandbox_pool().stats() if EXEC_MODE == "process" else None,
+        "workflow": workflow_info(),
+        "speculation": speculation_stats(),
+        "compile_cache": compile_cache_stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: node/chat/upload latency histograms, tokens, exec resources."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/workflow")
+async def swap_workflow(
+    max_retries: int = Form(...),
+    candidates: int = Form(SPECULATIVE_CANDIDATES),
+    x_admin_token: str = Header(""),
+):
+    """Hot-swaps the shared workflow for a variant. Disabled unless ADMIN_TOKEN is set."""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    await asyncio.to_thread(install_workflow, max_retries=max_retries, candidates=max(candidates, 1))
+    return workflow_info()
+
 # ----------------------------------------
 # 🧾 Phase 1: Upload CSV + Preprocess
 # ----------------------------------------
@@ -43,42 +151,353 @@ async def health_check():
 async def upload_csv(
     file: UploadFile,
     hasHeader: str = Form("yes"),
-    headerRowIndex: int = Form(0)
+    headerRowIndex: int = Form(0),
+    optimizeDtypes: str = Form(""),
+    background: str = Form(""),
 ):
+    # Determine header handling
+    header_param = 0 if hasHeader == "yes" else headerRowIndex
+    # "yes"/"no" from the form, otherwise the server default
+    optimize = optimizeDtypes == "yes" if optimizeDtypes in ("yes", "no") else OPTIMIZE_DTYPES
+    in_background = background == "yes" if background in ("yes", "no") else UPLOAD_BACKGROUND
+
     try:
-        contents = await file.read()
-
-        # Determine header handling
-        header_param = 0 if hasHeader == "yes" else headerRowIndex
-        
-        # Read CSV
-        df = pd.read_csv(io.BytesIO(contents), header=header_param)
-        
-    except Exception as e:
+        # Stream the body into a spooled temp file (hashing it on the way) instead of reading it all at once
+        with upload_stage("spool"):
+            spool, total_bytes, digest = await spool_upload(file)
+    except UploadTooLarge as e:
+        logger.error(f"Upload rejected: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+
+    key = dataset_key(digest, header_param, optimize)
+    session_id = str(uuid4())
+    await _expire_sessions()
+
+    # Same bytes + same parse options as a stored dataset: share it instead of re-parsing
+    with upload_stage("attach"):
+        dataset = await asyncio.to_thread(session_store.attach, session_id, key)
+    if dataset is not None:
+        spool.close()
+        logger.info(f"New session created: {session_id} (deduplicated dataset {key[:12]}, {total_bytes} bytes uploaded).")
+        return _upload_response(session_id, dataset, deduplicated=True)
+
+    if in_background:
+        # Answer now; parsing and profiling continue in a task (poll /upload/{id}/status or stream /upload/{id}/events)
+        job = IngestJob(session_id=session_id, bytes_total=total_bytes)
+        # Other workers (filesystem backend) learn about the upload from the session store
+        await asyncio.to_thread(session_store.set_ingest_status, session_id, job.as_dict())
+        ingest_jobs.start(job, _ingest_in_background(job, spool, key, header_param, optimize))
+        return {"status": "processing", "session_id": session_id, "bytes_total": total_bytes}
+
+    try:
+        dataset = await _ingest(spool, session_id, key, header_param, optimize, total_bytes)
+    except UploadTooLarge as e:
+        logger.error(f"Upload rejected: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except CsvParseError as e:
         logger.error(f"CSV parsing error: {e}")
         raise HTTPException(status_code=400, detail=f"CSV parsing error: {e}")
+    return _upload_response(session_id, dataset, deduplicated=False)
 
-    # Generate data quality report and context
-    DQR, context = generate_dqr_and_context(df)
-    session_id = str(uuid4())
 
-    # Store session data
-    session_store[session_id] = {
+async def _ingest(spool, session_id: str, key: str, header_param, optimize: bool, total_bytes: int, job: IngestJob | None = None) -> dict:
+    """Parses, profiles, indexes and stores the spooled CSV; closes the spool. Updates `job` if given."""
+    def stage(name: str):
+        if job is not None:
+            job.update(stage=name)
+
+    if OUT_OF_CORE_THRESHOLD_BYTES and total_bytes > OUT_OF_CORE_THRESHOLD_BYTES:
+        return await _ingest_out_of_core(spool, session_id, key, header_param, total_bytes, job, stage)
+
+    try:
+        # Read CSV (off the event loop, straight from the spooled file)
+        stage("parsing")
+        with upload_stage("parse"):
+            df = await asyncio.to_thread(parse_csv, spool, header_param, progress=job.advance if job else None)
+    finally:
+        spool.close()
+    if job is not None:
+        job.update(rows=len(df))
+
+    # Profile the data, optionally shrink its dtypes, then render the DQR and context
+    stage("profiling")
+    with upload_stage("profile"):
+        profile = await asyncio.to_thread(profile_dataframe, df)
+    stage("optimizing")
+    with upload_stage("optimize_dtypes"):
+        if optimize:
+            df, memory = await asyncio.to_thread(optimize_dtypes, df, profile)
+        else:
+            nbytes = await asyncio.to_thread(frame_nbytes, df)
+            memory = MemoryReport(before_bytes=nbytes, after_bytes=nbytes)
+    DQR, context = render_dqr_and_context(profile)
+    stage("indexing")
+    with upload_stage("schema_index"):
+        schema = await asyncio.to_thread(SchemaIndex.build, df, profile)
+
+    # Store the dataset (once per content key) and attach the session to it
+    dataset = {
+        "df": df,
+        "context": context,
+        "dqr": DQR,
+        "profile": profile,
+        "stats": StatsIndex(profile),
+        "schema": schema,
+        "fingerprint": key,
+        "schema_fingerprint": schema_fingerprint(df),
+        # Appended rows are conformed to these (see /upload/{session_id}/append)
+        "dtypes": df.dtypes,
+        "memory": memory,
+        "engine": "pandas",
+    }
+    stage("storing")
+    with upload_stage("store"):
+        await asyncio.to_thread(session_store.put, session_id, key, dataset)
+
+    logger.info(
+        f"New session created: {session_id} with {len(df)} rows ({total_bytes} bytes uploaded, "
+        f"{memory.before_bytes} -> {memory.after_bytes} bytes in memory)."
+    )
+    return dataset
+
+
+async def _ingest_out_of_core(spool, session_id: str, key: str, header_param, total_bytes: int, job: IngestJob | None, stage) -> dict:
+    """
+    _ingest for uploads above OUT_OF_CORE_THRESHOLD_BYTES: the CSV is converted to Parquet
+    on disk and the session holds a ChunkedFrame, so the data is never fully in memory.
+    Profiling and the schema index work from Parquet metadata and a row sample.
+    """
+    try:
+        stage("parsing")
+        with upload_stage("parse"):
+            df = await asyncio.to_thread(
+                convert_csv, spool, key, header_param or 0, UPLOAD_MAX_ROWS, job.advance if job else None
+            )
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        raise CsvParseError(str(e)) from e
+    finally:
+        spool.close()
+    if job is not None:
+        job.update(rows=len(df))
+
+    stage("profiling")
+    with upload_stage("profile"):
+        profile, sample = await asyncio.to_thread(profile_chunked, df)
+    DQR, context = render_dqr_and_context(profile)
+    stage("indexing")
+    with upload_stage("schema_index"):
+        schema = await asyncio.to_thread(SchemaIndex.build, sample, profile)
+
+    dataset = {
         "df": df,
         "context": context,
         "dqr": DQR,
+        "profile": profile,
+        "stats": StatsIndex(profile),
+        "schema": schema,
+        "fingerprint": key,
+        "schema_fingerprint": schema_fingerprint(df, engine="chunked"),
+        # Nothing is held in memory; dtype optimization does not apply
+        "memory": MemoryReport(before_bytes=0, after_bytes=0),
+        "engine": "chunked",
+    }
+    stage("storing")
+    with upload_stage("store"):
+        await asyncio.to_thread(session_store.put, session_id, key, dataset)
+
+    logger.info(
+        f"New out-of-core session created: {session_id} with {profile.n_rows} rows "
+        f"({total_bytes} bytes uploaded, stored at {df.path})."
+    )
+    return dataset
+
+
+async def _ingest_in_background(job: IngestJob, spool, key: str, header_param, optimize: bool) -> None:
+    try:
+        dataset = await _ingest(spool, job.session_id, key, header_param, optimize, job.bytes_total, job)
+    except Exception as e:
+        logger.error(f"Background ingest of session {job.session_id} failed: {e}")
+        if isinstance(e, UploadTooLarge):
+            job.fail(str(e))
+        else:
+            job.fail(f"CSV parsing error: {e}" if isinstance(e, CsvParseError) else f"{e.__class__.__name__}: {e}")
+    else:
+        job.finish(_upload_response(job.session_id, dataset, deduplicated=False))
+    await asyncio.to_thread(session_store.set_ingest_status, job.session_id, job.as_dict())
+
+
+@app.post("/upload/{session_id}/append")
+async def append_csv(
+    session_id: str,
+    file: UploadFile,
+    hasHeader: str = Form("yes"),
+    headerRowIndex: int = Form(0),
+):
+    """
+    Adds the rows of another CSV with the same columns to the session. Only the new rows
+    are parsed and profiled: the profile is merged from mergeable statistics (null and
+    convertible counts, distinct-value sketches), so the cost does not grow with the
+    rows already stored. Saved session variables are cleared; they describe the old rows.
+    """
+    header_param = 0 if hasHeader == "yes" else headerRowIndex
+    await _await_ingest(session_id)
+    base = await asyncio.to_thread(session_store.peek, session_id)
+    if not base:
+        raise HTTPException(status_code=404, detail="Invalid or expired session_id")
+    if base.get("engine") == "chunked":
+        raise HTTPException(status_code=409, detail="Appending to an out-of-core session is not supported; upload the combined file instead.")
+
+    try:
+        with upload_stage("spool"):
+            spool, total_bytes, digest = await spool_upload(file)
+    except UploadTooLarge as e:
+        logger.error(f"Append rejected: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+
+    profile = base["profile"]
+    remaining = UPLOAD_MAX_ROWS - profile.n_rows if UPLOAD_MAX_ROWS else None
+    try:
+        with upload_stage("append_parse"):
+            # One row over the limit is enough to know the session would exceed it
+            rows = await asyncio.to_thread(parse_csv, spool, header_param, max(remaining, 0) + 1 if remaining is not None else None)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"The session would exceed the limit of {UPLOAD_MAX_ROWS} rows.")
+    except CsvParseError as e:
+        logger.error(f"CSV parsing error: {e}")
+        raise HTTPException(status_code=400, detail=f"CSV parsing error: {e}")
+    finally:
+        spool.close()
+    if remaining is not None and len(rows) > remaining:
+        raise HTTPException(status_code=413, detail=f"The session would exceed the limit of {UPLOAD_MAX_ROWS} rows.")
+
+    dtypes = base.get("dtypes")
+    if dtypes is None:
+        # Stored before dtypes were recorded: read them off the frame
+        dtypes = (await asyncio.to_thread(session_store.get, session_id))["df"].dtypes
+    try:
+        conformed = await asyncio.to_thread(conform_rows, rows, list(dtypes.index), dtypes)
+    except SchemaMismatch as e:
+        raise HTTPException(status_code=422, detail={"message": "Rows do not match the session columns", "errors": e.errors})
+
+    with upload_stage("append_profile"):
+        profile = merge_profiles(profile, await asyncio.to_thread(profile_dataframe, rows))
+    DQR, context = render_dqr_and_context(profile)
+    memory = base["memory"]
+    added_bytes = await asyncio.to_thread(frame_nbytes, conformed)
+    updates = {
+        "context": context,
+        "dqr": DQR,
+        "profile": profile,
+        "stats": StatsIndex(profile),
+        "schema": base["schema"].updated(profile),
+        "dtypes": dtypes,
+        # A new key: cached answers were about the old rows. The schema fingerprint (and
+        # with it the cached code) stays, the columns and dtypes have not changed.
+        "fingerprint": appended_key(base["fingerprint"], digest, header_param),
+        "memory": MemoryReport(
+            before_bytes=memory.before_bytes + added_bytes,
+            after_bytes=memory.after_bytes + added_bytes,
+            conversions=memory.conversions,
+        ),
+    }
+
+    with upload_stage("append_store"):
+        appended = await asyncio.to_thread(
+            session_store.append, session_id, base["fingerprint"], updates["fingerprint"], conformed, updates
+        )
+    if not appended:
+        raise HTTPException(status_code=409, detail="The session changed during the append; retry it.")
+    namespace_store.delete(session_id)
+
+    logger.info(f"Appended {len(conformed)} rows to session {session_id} ({profile.n_rows} rows in total).")
+    return {
+        **_upload_response(session_id, {**base, **updates}, deduplicated=False),
+        "appended_rows": len(conformed),
     }
 
-    logger.info(f"New session created: {session_id} with {len(df)} rows.")
 
+@app.get("/upload/{session_id}/status")
+async def upload_status(session_id: str):
+    """Progress of a background upload (stage, bytes parsed, rows); "ready" once chat can start."""
+    status = await _ingest_status(session_id)
+    if status is not None:
+        return status
+    # No background upload: a synchronous one.
+    # peek: checking that the session exists must not reload its frame on every poll
+    if await asyncio.to_thread(session_store.peek, session_id):
+        return {"session_id": session_id, "status": "ready", "stage": "ready"}
+    raise HTTPException(status_code=404, detail="Unknown session_id")
+
+
+async def _ingest_status(session_id: str) -> dict | None:
+    """
+    The status of the session's background upload: from this worker's job, or as last
+    published by the worker running it (which only publishes the start and the outcome).
+    """
+    job = ingest_jobs.get(session_id)
+    if job is not None:
+        return job.as_dict()
+    return await asyncio.to_thread(session_store.ingest_status, session_id)
+
+
+@app.get("/upload/{session_id}/events")
+async def upload_events(session_id: str):
+    """SSE stream of upload_status updates, ending with the "ready" or "failed" one."""
+    job = ingest_jobs.get(session_id)
+    if job is None:
+        status = await upload_status(session_id)
+
+        async def published_stream():
+            # Another worker runs the upload (if any): poll what it publishes
+            nonlocal status
+            last_write = time.monotonic()
+            yield f"data: {json.dumps(status)}\n\n"
+            while status["status"] == "processing":
+                await asyncio.sleep(INGEST_PROGRESS_INTERVAL)
+                current = await upload_status(session_id)
+                if current != status:
+                    status = current
+                    yield f"data: {json.dumps(status)}\n\n"
+                    last_write = time.monotonic()
+                elif time.monotonic() - last_write > 15:
+                    yield ": keep-alive\n\n"
+                    last_write = time.monotonic()
+
+        return StreamingResponse(published_stream(), media_type="text/event-stream")
+
+    async def progress_stream():
+        sent, last_write = -1, time.monotonic()
+        while True:
+            if job.version != sent:
+                sent = job.version
+                yield f"data: {json.dumps(job.as_dict())}\n\n"
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write > 15:
+                # Long stages (e.g. profiling a wide file) send no updates; keep proxies from timing out
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+            if job.finished:
+                break
+            await job.wait(INGEST_PROGRESS_INTERVAL)
+
+    return StreamingResponse(progress_stream(), media_type="text/event-stream")
+
+
+def _upload_response(session_id: str, dataset: dict, deduplicated: bool) -> dict:
+    profile = dataset["profile"]
     return {
         "status": "ready",
         "session_id": session_id,
+        "deduplicated": deduplicated,
         "summary": {
-            "rows": len(df),
-            "columns": list(df.columns),
-            "dqr_preview": DQR[:300],
+            "rows": profile.n_rows,
+            "columns": [col.name for col in profile.columns],
+            "dqr_preview": dataset["dqr"][:300],
         },
+        "memory": dataset["memory"].as_dict(),
+        "engine": dataset.get("engine", "pandas"),
     }
 
 
@@ -86,74 +505,320 @@ async def upload_csv(
 # 💬 Phase 2: Chat and Workflow Execution
 # ----------------------------------------
 
-@app.post("/chat")
-async def chat(session_id: str = Form(...), query: str = Form(...)):
-    session = session_store.get(session_id)
+async def _await_ingest(session_id: str) -> None:
+    # Background upload still running: wait for it (bounded), then reject if not ready
+    job = ingest_jobs.get(session_id)
+    if job is not None and not job.finished:
+        await job.wait(INGEST_CHAT_WAIT_SECONDS)
+    status = await _ingest_status(session_id)
+    # Running on another worker: poll what it publishes
+    deadline = time.monotonic() + INGEST_CHAT_WAIT_SECONDS
+    while job is None and status is not None and status["status"] == "processing" and time.monotonic() < deadline:
+        await asyncio.sleep(INGEST_PROGRESS_INTERVAL)
+        status = await _ingest_status(session_id)
+    if status is not None and status["status"] == "processing":
+        raise HTTPException(status_code=409, detail={"message": "Session is still processing", **status})
+    if status is not None and status["status"] == "failed":
+        raise HTTPException(status_code=409, detail={"message": "Upload processing failed", **status})
+
+
+async def _expire_sessions() -> None:
+    # Idle sessions go with their files and saved variables (now and then, as sessions are used)
+    expired = await asyncio.to_thread(session_store.maybe_sweep)
+    for session_id in expired:
+        namespace_store.delete(session_id)
+    if expired:
+        logger.info(f"Expired {len(expired)} idle sessions.")
+
+
+async def _chat_session(session_id: str) -> dict:
+    """The session a chat runs against; waits for a background upload still processing it."""
+    await _expire_sessions()
+    await _await_ingest(session_id)
+    # May reload a spilled frame from disk, so keep it off the event loop
+    session = await asyncio.to_thread(session_store.get, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Invalid or expired session_id")
+    return session
 
-    df = session["df"]
-    context = session["context"]
 
-    # Initialize the agent state
-    state = AgentState(
+def _initial_state(session: dict, query: str, dataset_path: str, namespace: dict | None) -> AgentState:
+    return AgentState(
         user_query=query,
-        df=df,
-        dqr_report=context,
+        df=session["df"],
+        # Wide datasets: only the columns relevant to this query, within the token budget
+        dqr_report=session["schema"].context_for(query, session["context"]),
         code_result="",
         error="",
-        generated_code="",
+        # Tier 2 cache: code generated for the same question on a same-schema dataset
+        generated_code=result_cache.get_code(session["schema_fingerprint"], query) or "",
         retries=0,
+        dataset_path=dataset_path,
+        stats_index=session["stats"],
+        namespace=namespace,
+        namespace_updates={},
+        code_hint="",
+        hints_given=0,
+        result_table=None,
     )
 
-    # Build and compile the LangGraph workflow
-    workflow = build_workflow()
-    logger.info(f"Starting workflow for session {session_id} with query: {query[:50]}")
+
+def _cached_answer(session: dict, query: str) -> dict | None:
+    """Tier 1 cache hit, unless the result table it refers to has expired since."""
+    hit = result_cache.get_answer(session["fingerprint"], query)
+    if hit and hit.get("table") and not result_tables.exists(hit["table"]["id"]):
+        return None
+    return hit
+
+
+async def _remember_answer(session: dict, session_id: str, state: dict, answer: str, persist: bool) -> list[str]:
+    """
+    Caches an answered question and saves the variables its code defined (when the
+    session namespace is in use). Returns the saved variable names.
+    """
+    table = state.get("result_table")
+    # An answer computed from this session's saved variables is neither valid for other
+    # sessions on the same data nor, once the variables change, for this one
+    if answer and not names_used(state["generated_code"], state.get("namespace")):
+        result_cache.put(
+            session["fingerprint"], session["schema_fingerprint"],
+            state["user_query"], state["generated_code"], answer,
+            table=table.as_dict() if table is not None else None,
+        )
+    if table is not None:
+        # Drops expired tables now and then (here, where new ones appear)
+        await asyncio.to_thread(result_tables.maybe_sweep)
+    saved = state.get("namespace_updates") or {}
+    if persist and saved:
+        await asyncio.to_thread(namespace_store.update, session_id, saved)
+        return sorted(saved)
+    return []
+
+
+@app.post("/chat")
+async def chat(
+    session_id: str = Form(...),
+    query: str = Form(...),
+    timings: str = Form(""),
+    persistNamespace: str = Form(""),
+):
+    # "yes"/"no" from the form, otherwise the server default
+    send_timings = timings == "yes" if timings in ("yes", "no") else SSE_TIMINGS
+    persist = persistNamespace == "yes" if persistNamespace in ("yes", "no") else SESSION_NAMESPACE
+    session = await _chat_session(session_id)
+
+    # Tier 1 cache: same question on the same data -> answer without running the workflow
+    cached = _cached_answer(session, query)
+    if cached:
+        logger.info(f"Answer cache hit for session {session_id}: {query[:50]}")
+
+        async def cached_stream():
+            CHAT_SECONDS.observe(0, outcome="cached")
+            yield f"data: {json.dumps({'status': 'cached'})}\n\n"
+            yield f"data: {json.dumps({'delta': cached['answer']})}\n\n"
+            if cached.get("table"):
+                yield f"data: {json.dumps({'table': cached['table']})}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    # Identical questions on the same data already being answered share that run
+    # (per session when saved variables are in use, since they change the code)
+    key = (session["fingerprint"], normalize_query(query), session_id if persist else "")
+    events = chat_flights.stream(key, lambda: _chat_events(session, session_id, query, persist))
 
     async def event_stream():
-        """
-        Asynchronous generator (SSE) for streaming the final answer.
-        It monitors the LangGraph steps until the 'humanize_answer' node is hit.
-        """
-        final_state = None
-        
-        # Use .astream for asynchronous graph execution
-        async for step in workflow.astream(state, config={"recursion_limit": 5}):
-            final_state = step
-            
-            # We are primarily interested in the output of the humanize_answer node
-            if "humanize_answer" in step:
-                # Extract the code_result from the final node
-                final_result = step["humanize_answer"].get("code_result", "")
-                
-                # --- NEW RECTIFICATION LOGIC START ---
-                
-                # If the final result is empty, substitute a helpful message
-                if not final_result:
-                    logger.warning("Workflow finished successfully, but the final result was empty. Suggesting LLM output fix.")
-                    final_result = (
-                        "✅ The analysis code ran successfully, but the answer was blank. "
-                        "Please ensure the analysis code prints the final result."
-                    )
-                
-                logger.info(f"Final streamed result length: {len(final_result)}. Content: {final_result[:50]}...")
-                
-                # Stream the final result chunk (now guaranteed to be non-empty if successful)
-                yield f"data: {json.dumps({'delta': final_result})}\n\n"
-                    
-                # Break the loop immediately after getting the final humanized answer
-                break 
-                # --- NEW RECTIFICATION LOGIC END ---
-
-        # Handle max retries/final error state after the loop finishes
-        if final_state and final_state.get('error'):
-             error_msg = f'Error: Could not resolve the query after max retries. Last error: {final_state["error"]}'
-             yield f"data: {json.dumps({'delta': error_msg})}\n\n"
+        """Asynchronous generator (SSE) for streaming the answer of the (shared) run."""
+        async for event in events:
+            if "timings" in event and not send_timings:
+                continue
+            yield f"data: {json.dumps(event)}\n\n"
 
         # Send the final 'done' signal to the client
         yield f"data: {json.dumps({'done': True})}\n\n"
-        logger.info(f"Workflow finished for session {session_id}.")
-
 
     # This line MUST be outside the event_stream function.
     return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+async def _chat_events(session: dict, session_id: str, query: str, persist: bool):
+    """
+    One workflow run for a chat, as SSE payloads (dicts) for every request sharing it.
+    Progress ({"status": ...}) and answer tokens ({"delta": ...}) are forwarded from
+    the nodes' custom stream as they happen; node updates track the latest state.
+    A table the code returned is announced after the answer ({"table": {"id", ...}},
+    rows from GET /results/{id}). The run's {"timings": ...} summary comes last.
+    """
+    # The process sandbox memory-maps the session's Arrow file (written once, on first use)
+    dataset_path = ""
+    if EXEC_MODE == "process":
+        dataset_path = await asyncio.to_thread(session_store.dataset_path, session_id)
+
+    # Variables earlier turns saved (opt-in); the code generator is told what exists
+    namespace = namespace_store.get(session_id) if persist else None
+
+    # Initialize the agent state
+    state = _initial_state(session, query, dataset_path, namespace)
+
+    # Shared, pre-compiled LangGraph workflow (compiled once at startup)
+    workflow = get_workflow()
+    logger.info(f"Starting workflow for session {session_id} with query: {query[:50]}")
+
+    last_state = None
+    streamed_answer = False
+    outcome = "error"
+    trace = Trace()
+
+    # Use .astream for asynchronous graph execution (nodes record into the trace)
+    async for mode, chunk in workflow.astream(
+        state, config=workflow_config(trace=trace), stream_mode=["updates", "custom"]
+    ):
+        if mode == "custom":
+            streamed_answer = streamed_answer or "delta" in chunk
+            yield chunk
+            continue
+
+        node, last_state = next(iter(chunk.items()))
+
+        # Answered directly from the session statistics (no LLM calls)
+        if node == "fast_path" and last_state.get("code_result"):
+            yield {"status": "fast_path"}
+            yield {"delta": last_state["code_result"]}
+            outcome = "fast_path"
+            break
+
+        # The humanize_answer node is the last step on the success path
+        if node == "humanize_answer":
+            final_result = last_state.get("code_result", "")
+
+            # If the final result is empty, substitute a helpful message
+            if not final_result:
+                logger.warning("Workflow finished successfully, but the final result was empty. Suggesting LLM output fix.")
+                final_result = (
+                    "✅ The analysis code ran successfully, but the answer was blank. "
+                    "Please ensure the analysis code prints the final result."
+                )
+                yield {"delta": final_result}
+            else:
+                if not streamed_answer:
+                    # The model did not stream tokens; send the whole answer at once
+                    yield {"delta": final_result}
+
+            if last_state.get("result_table") is not None:
+                yield {"table": last_state["result_table"].as_dict()}
+
+            # Blank results are not cached
+            saved = await _remember_answer(session, session_id, last_state, last_state.get("code_result", ""), persist)
+            if saved:
+                yield {"saved_variables": saved}
+
+            logger.info(f"Final streamed result length: {len(final_result)}. Content: {final_result[:50]}...")
+            outcome = "answered"
+            break
+
+    # Handle max retries/final error state after the loop finishes
+    if last_state and last_state.get('error'):
+         error_msg = f'Error: Could not resolve the query after max retries. Last error: {last_state["error"]}'
+         yield {"delta": error_msg}
+
+    attempts = (last_state or {}).get("retries", 0)
+    summary = trace.summary(retries=attempts)
+    CHAT_SECONDS.observe(summary["total_seconds"], outcome=outcome)
+    if outcome != "fast_path":
+        CHAT_RETRIES.observe(attempts)
+    logger.info(f"Chat timings for session {session_id}: {json.dumps(summary)}")
+    yield {"timings": summary}
+
+    logger.info(f"Workflow finished for session {session_id}.")
+
+
+@app.post("/chat/batch")
+async def chat_batch(
+    session_id: str = Form(...),
+    queries: list[str] = Form(...),
+    timings: str = Form(""),
+    persistNamespace: str = Form(""),
+):
+    """
+    Answers several questions about one session in one request. Code generation and
+    humanizing run as batched LLM calls and the programs execute concurrently (see
+    run_batch). Every SSE event carries the "index" of its query; a final {"done": true}
+    without an index ends the stream.
+    """
+    queries = [q for q in queries if q.strip()]
+    if not queries or len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {BATCH_MAX_QUERIES} queries.")
+    send_timings = timings == "yes" if timings in ("yes", "no") else SSE_TIMINGS
+    persist = persistNamespace == "yes" if persistNamespace in ("yes", "no") else SESSION_NAMESPACE
+    session = await _chat_session(session_id)
+
+    dataset_path = ""
+    if EXEC_MODE == "process":
+        dataset_path = await asyncio.to_thread(session_store.dataset_path, session_id)
+    namespace = namespace_store.get(session_id) if persist else None
+
+    # Tier 1 cache hits are answered up front; the rest go through the batch
+    cached, indices, states = {}, [], []
+    for index, query in enumerate(queries):
+        hit = _cached_answer(session, query)
+        if hit:
+            cached[index] = hit
+        else:
+            indices.append(index)
+            states.append(_initial_state(session, query, dataset_path, namespace))
+    logger.info(f"Starting batch of {len(queries)} queries for session {session_id} ({len(cached)} cached).")
+
+    def event(index: int, payload: dict) -> str:
+        return f"data: {json.dumps({'index': index, **payload})}\n\n"
+
+    async def event_stream():
+        trace = Trace()
+        for index, hit in cached.items():
+            yield event(index, {"status": "cached"})
+            yield event(index, {"delta": hit["answer"]})
+            if hit.get("table"):
+                yield event(index, {"table": hit["table"]})
+            yield event(index, {"done": True})
+
+        fast_path = set()
+        async for position, payload in run_batch(states, trace=trace):
+            index = indices[position]
+            if payload.get("status") == "fast_path":
+                fast_path.add(position)
+            elif payload.get("done"):
+                state = states[position]
+                if position not in fast_path and not state.get("error"):
+                    if state.get("result_table") is not None:
+                        yield event(index, {"table": state["result_table"].as_dict()})
+                    saved = await _remember_answer(session, session_id, state, state.get("code_result", ""), persist)
+                    if saved:
+                        yield event(index, {"saved_variables": saved})
+            elif "error" in payload:
+                payload = {"delta": f"Error: {payload['error']}"}
+            yield event(index, payload)
+
+        attempts = sum(state.get("retries", 0) for state in states)
+        summary = trace.summary(retries=attempts)
+        CHAT_SECONDS.observe(summary["total_seconds"], outcome="batch")
+        logger.info(f"Batch timings for session {session_id}: {json.dumps(summary)}")
+        if send_timings:
+            yield f"data: {json.dumps({'timings': summary})}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# ----------------------------------------
+# 📋 Result tables
+# ----------------------------------------
+
+@app.get("/results/{table_id}")
+async def result_table_page(table_id: str, offset: int = 0, limit: int = 100):
+    """
+    Rows [offset, offset + limit) of a table a chat returned (announced by its "table"
+    SSE event). `limit` is capped at RESULT_PAGE_MAX_ROWS; "total_rows" gives the size.
+    """
+    page = await asyncio.to_thread(result_tables.page, table_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result table")
+    return page
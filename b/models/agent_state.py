@@ -1,6 +1,5 @@
 import pandas as pd
-from typing import TypedDict, Annotated
-from operator import add
+from typing import TypedDict, Any
 
 class AgentState(TypedDict):
     user_query: str
@@ -9,4 +8,20 @@ class AgentState(TypedDict):
     code_result: str
     error: str
     generated_code: str
-    retries: Annotated[int, add]
+    # Nodes return the full state ({**state, ...}), so this is a plain overwrite;
+    # an `add` reducer would re-add the current count on every node.
+    retries: int
+    # Arrow file of the session frame, used by the process sandbox (EXEC_MODE=process)
+    dataset_path: str
+    # Per-session StatsIndex used by the fast path (None disables it)
+    stats_index: Any
+    # Saved session variables in scope for generated code (None: namespace not in use)
+    namespace: Any
+    # Variables the last successful execution defined, saved by /chat once answered
+    namespace_updates: dict
+    # Performance feedback from analyze_code for the next generation ("" when none)
+    code_hint: str
+    # Hints sent back this chat (at most one, so slow code still runs eventually)
+    hints_given: int
+    # Table the last successful execution assigned to `result` (ResultTable), or None
+    result_table: Any
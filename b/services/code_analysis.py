@@ -0,0 +1,307 @@
+import ast
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+
+from config.settings import COMPILE_CACHE_MAX_ENTRIES
+from services.result_cache import TTLCache
+
+# Operators whose column-wise result matches the per-row one (floor division, modulo and
+# powers can differ between Python and numpy scalars at the edges, so they are left alone)
+ARITHMETIC_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+# Nodes under which an expression may run zero or many times
+_CONDITIONAL = (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp, ast.IfExp, ast.BoolOp)
+
+
+@dataclass
+class Finding:
+    # "iterrows", "index_loop", "row_apply", "repeated_to_datetime" or "row_to_datetime"
+    pattern: str
+    line: int
+    message: str
+    rewritten: bool = False
+    # Column of the flagged node; with `line`, identifies the node the rewriters replaced
+    col: int = 0
+
+
+@dataclass
+class CodeAnalysis:
+    code: str
+    findings: list = field(default_factory=list)
+
+    @property
+    def rewritten(self) -> bool:
+        return any(f.rewritten for f in self.findings)
+
+    @property
+    def unresolved(self) -> list:
+        return [f for f in self.findings if not f.rewritten]
+
+    def hint(self) -> str:
+        """Feedback for the code generator about the slow patterns it could not rewrite."""
+        lines = [f"- Line {f.line}: {f.message}" for f in self.unresolved]
+        return (
+            "The previous code was NOT executed: it uses row-by-row patterns that are too slow "
+            "on this dataset. Rewrite it with vectorized pandas operations.\n" + "\n".join(lines)
+        )
+
+
+# ------------------------------------------------
+# 1. DETECTION
+# ------------------------------------------------
+
+def _is_call_to(node, attr: str) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == attr
+
+def _is_axis_1(call: ast.Call) -> bool:
+    return any(
+        kw.arg == "axis" and isinstance(kw.value, ast.Constant) and kw.value.value in (1, "columns")
+        for kw in call.keywords
+    )
+
+def _is_range_len(node) -> bool:
+    # range(len(x)) / range(x.shape[0])
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range" and node.args):
+        return False
+    arg = node.args[-1] if len(node.args) > 1 else node.args[0]
+    return (
+        (isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "len")
+        or (isinstance(arg, ast.Subscript) and isinstance(arg.value, ast.Attribute) and arg.value.attr == "shape")
+    )
+
+def _contains(tree, predicate) -> bool:
+    return any(predicate(node) for node in ast.walk(tree))
+
+
+def _detect(tree: ast.Module) -> list:
+    findings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.For):
+            if _is_call_to(node.iter, "iterrows") or _is_call_to(node.iter, "itertuples"):
+                findings.append(Finding("iterrows", node.lineno, (
+                    f"`{node.iter.func.attr}()` loops over every row in Python. Use column operations, "
+                    "boolean masks, groupby/agg or merge instead."
+                ), col=node.col_offset))
+                if _contains(node, lambda n: _is_call_to(n, "to_datetime")):
+                    findings.append(Finding("row_to_datetime", node.lineno, (
+                        "`pd.to_datetime` is called once per row inside the loop. Parse the whole column once "
+                        "before using it."
+                    ), col=node.col_offset))
+            elif _is_range_len(node.iter):
+                findings.append(Finding("index_loop", node.lineno, (
+                    "`for i in range(len(...))` indexes the frame row by row. Operate on whole columns instead."
+                ), col=node.col_offset))
+        elif _is_call_to(node, "apply") and _is_axis_1(node):
+            findings.append(Finding("row_apply", node.lineno, (
+                "`.apply(..., axis=1)` calls a Python function per row. Combine whole columns with vectorized "
+                "arithmetic, `np.where`/`Series.where`, `.str` or `.dt` accessors instead."
+            ), col=node.col_offset))
+            if _contains(node, lambda n: _is_call_to(n, "to_datetime")):
+                findings.append(Finding("row_to_datetime", node.lineno, (
+                    "`pd.to_datetime` is called once per row inside `apply`. Parse the whole column once "
+                    "with `pd.to_datetime(df['col'])`."
+                ), col=node.col_offset))
+
+    calls = [n for n in ast.walk(tree) if _is_call_to(n, "to_datetime")]
+    dumps = Counter(ast.dump(n) for n in calls)
+    for dump, count in dumps.items():
+        if count > 1:
+            first = min((n for n in calls if ast.dump(n) == dump), key=lambda n: (n.lineno, n.col_offset))
+            findings.append(Finding("repeated_to_datetime", first.lineno, (
+                f"`{ast.unparse(first)}` is computed {count} times. Parse it once into a variable and reuse it."
+            ), col=first.col_offset))
+    return sorted(findings, key=lambda f: (f.line, f.col))
+
+
+# ------------------------------------------------
+# 2. SAFE REWRITES
+# ------------------------------------------------
+
+def _row_expression(body, row: str, frame: ast.expr):
+    """
+    The vectorized form of a row lambda body, or None if it is not pure arithmetic on
+    `row['col']` lookups (the only shape where column-wise evaluation gives the same values).
+    """
+    if isinstance(body, ast.BinOp) and isinstance(body.op, ARITHMETIC_OPS):
+        left, right = _row_expression(body.left, row, frame), _row_expression(body.right, row, frame)
+        return ast.BinOp(left, body.op, right) if left is not None and right is not None else None
+    if isinstance(body, ast.UnaryOp) and isinstance(body.op, (ast.USub, ast.UAdd)):
+        operand = _row_expression(body.operand, row, frame)
+        return ast.UnaryOp(body.op, operand) if operand is not None else None
+    if isinstance(body, ast.Constant) and isinstance(body.value, (int, float)) and not isinstance(body.value, bool):
+        return body
+    if (
+        isinstance(body, ast.Subscript) and isinstance(body.value, ast.Name) and body.value.id == row
+        and isinstance(body.slice, ast.Constant) and isinstance(body.slice.value, str)
+    ):
+        return ast.Subscript(ast.Name(frame.id, ast.Load()), ast.Constant(body.slice.value), ast.Load())
+    return None
+
+
+def _numeric_rows_guard(frame: str) -> ast.expr:
+    # Rows of an all-numeric frame hold numpy scalars, which divide by zero like columns do
+    # (inf, not ZeroDivisionError); on an empty frame apply returns a DataFrame, not a Series
+    return ast.parse(
+        f"len({frame}) > 0 and all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) "
+        f"for t in {frame}.dtypes)",
+        mode="eval",
+    ).body
+
+
+class _RowApplyRewriter(ast.NodeTransformer):
+    """
+    `frame.apply(lambda r: r['a'] * r['b'], axis=1)` ->
+    `(frame['a'] * frame['b']).rename(None) if <frame is non-empty and all numeric> else <the apply>`.
+    The check runs with the code: only there is the column arithmetic known to give the same values.
+    """
+
+    def __init__(self):
+        # (lineno, col_offset) of each replaced call
+        self.replaced: set = set()
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not (_is_call_to(node, "apply") and _is_axis_1(node) and isinstance(node.func.value, ast.Name)):
+            return node
+        if len(node.args) != 1 or len(node.keywords) != 1 or not isinstance(node.args[0], ast.Lambda):
+            return node
+        fn = node.args[0]
+        if len(fn.args.args) != 1 or fn.args.vararg or fn.args.kwarg or fn.args.kwonlyargs or fn.args.defaults:
+            return node
+        expression = _row_expression(fn.body, fn.args.args[0].arg, node.func.value)
+        # A constant body would broadcast differently; it must read at least one column
+        if expression is None or not _contains(expression, lambda n: isinstance(n, ast.Subscript)):
+            return node
+        self.replaced.add((node.lineno, node.col_offset))
+        # apply(axis=1) returns an unnamed Series; column arithmetic may keep a column name
+        rename = ast.Attribute(expression, "rename", ast.Load())
+        vectorized = ast.Call(rename, [ast.Constant(None)], [])
+        guarded = ast.IfExp(_numeric_rows_guard(node.func.value.id), vectorized, node)
+        return ast.copy_location(guarded, node)
+
+
+def _mutates_df(tree: ast.Module) -> bool:
+    # Any assignment/deletion whose target starts at `df`, an in-place call, or a mutating method
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Name, ast.Subscript, ast.Attribute)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            base = node
+            while isinstance(base, (ast.Subscript, ast.Attribute)):
+                base = base.value
+            if isinstance(base, ast.Name) and base.id == "df":
+                return True
+        if isinstance(node, ast.Call):
+            if any(kw.arg == "inplace" for kw in node.keywords):
+                return True
+            if (
+                isinstance(node.func, ast.Attribute) and node.func.attr in ("insert", "pop", "update")
+                and isinstance(node.func.value, ast.Name) and node.func.value.id == "df"
+            ):
+                return True
+    return False
+
+
+def _top(node, parents: dict, tree: ast.Module):
+    while parents.get(node) is not tree:
+        node = parents[node]
+    return node
+
+
+def _hoist_repeated_to_datetime(tree: ast.Module) -> set:
+    """
+    Identical `pd.to_datetime(df[...])` calls are parsed once into a variable defined just
+    before the first top-level statement that unconditionally evaluates one of them.
+    Only when the code never modifies `df`, so every call would have returned the same.
+    Returns the (lineno, col_offset) of the rewritten calls.
+    """
+    if _mutates_df(tree):
+        return set()
+    parents = {child: parent for parent in ast.walk(tree) for child in ast.iter_child_nodes(parent)}
+    calls = [
+        n for n in ast.walk(tree)
+        if _is_call_to(n, "to_datetime") and isinstance(n.func.value, ast.Name) and n.func.value.id == "pd"
+        and n.args and isinstance(n.args[0], ast.Subscript)
+        and isinstance(n.args[0].value, ast.Name) and n.args[0].value.id == "df"
+    ]
+    groups: dict = {}
+    for call in calls:
+        groups.setdefault(ast.dump(call), []).append(call)
+
+    hoisted = set()
+    for number, group in enumerate(g for g in groups.values() if len(g) > 1):
+        # Top-level statement of each call, and whether the call always runs with it
+        anchors = []
+        for call in group:
+            node, conditional = call, False
+            while parents.get(node) is not tree:
+                node = parents[node]
+                conditional = conditional or isinstance(node, _CONDITIONAL)
+            if not conditional and isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.Expr)):
+                anchors.append(tree.body.index(node))
+        first_statement = min(tree.body.index(_top(call, parents, tree)) for call in group)
+        if not anchors or min(anchors) != first_statement:
+            continue
+
+        name = f"_parsed_dates_{number}"
+        for call in group:
+            parent = parents[call]
+            for field_name, value in ast.iter_fields(parent):
+                if value is call:
+                    setattr(parent, field_name, ast.Name(name, ast.Load()))
+                elif isinstance(value, list):
+                    value[:] = [ast.Name(name, ast.Load()) if item is call else item for item in value]
+        assign = ast.Assign([ast.Name(name, ast.Store())], group[0])
+        tree.body.insert(first_statement, assign)
+        hoisted.update((call.lineno, call.col_offset) for call in group)
+        # Statement indices moved; recompute parents for the next group
+        parents = {child: parent for parent in ast.walk(tree) for child in ast.iter_child_nodes(parent)}
+    return hoisted
+
+def analyze_code(code: str, rewrite: bool = True) -> CodeAnalysis:
+    """
+    Finds known slow patterns in generated code and, with `rewrite`, replaces the cases
+    that have an exact vectorized equivalent (arithmetic row lambdas, on frames that are
+    all numeric and non-empty when the code runs; repeated date parsing of an unmodified
+    `df` column). Code that does not parse is returned unchanged; running
+    it reports the syntax error as usual.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return CodeAnalysis(code)
+    findings = _detect(tree)
+    if not findings or not rewrite:
+        return CodeAnalysis(code, findings)
+
+    rewriter = _RowApplyRewriter()
+    tree = rewriter.visit(tree)
+    hoisted = _hoist_repeated_to_datetime(tree)
+    if not (rewriter.replaced or hoisted):
+        return CodeAnalysis(code, findings)
+
+    for finding in findings:
+        position = (finding.line, finding.col)
+        if finding.pattern == "row_apply" and position in rewriter.replaced:
+            finding.rewritten = True
+        elif finding.pattern == "repeated_to_datetime" and position in hoisted:
+            finding.rewritten = True
+    return CodeAnalysis(ast.unparse(ast.fix_missing_locations(tree)), findings)
+
+
+# ------------------------------------------------
+# 3. COMPILE CACHE (by source hash)
+# ------------------------------------------------
+
+# No expiry: a code object stays valid as long as its source is the same
+_compiled = TTLCache(COMPILE_CACHE_MAX_ENTRIES, 0)
+
+def compile_cached(code: str):
+    """Code object for `code`; identical source (e.g. regenerated or from the code cache) compiles once."""
+    key = hashlib.sha256(code.encode()).hexdigest()
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = compile(code, "<generated>", "exec")
+        _compiled.put(key, compiled)
+    return compiled
+
+def compile_cache_stats() -> dict:
+    return _compiled.stats()
@@ -1,49 +1,223 @@
+import math
+import warnings
+from dataclasses import dataclass, field
+from typing import Any
+
 import pandas as pd
-import io
-
-def generate_dqr_and_context(df: pd.DataFrame) -> tuple[str, str]:
-    buffer = io.StringIO()
-    df.info(verbose=True, buf=buffer, memory_usage=False)
-    info_str = buffer.getvalue()
-    
-    # We are explicitly REMOVING the df.head(10) markdown table from the context 
-    # to eliminate the visual cue that was confusing the LLM into thinking the dataset 
-    # only contained 10 rows, despite the correct count being in the summary.
 
-    dqr_list = []
-    df_len = len(df) # <-- The correct total row count
-    numeric_threshold = 0.5
+from config.settings import PROFILE_EXACT, PROFILE_MARGIN_OF_ERROR, PROFILE_CONFIDENCE_Z, PROFILE_SKETCHES
+from services.cardinality import HyperLogLog
+
+NUMERIC_THRESHOLD = 0.5
+# Columns that are never flagged for conversion (legacy exclusions).
+EXCLUDED_COLUMNS = ["Name", "Region"]
+
+# ------------------------------------------------
+# 1. PROFILE OBJECTS
+# ------------------------------------------------
+
+@dataclass
+class ColumnProfile:
+    name: Any
+    dtype: str
+    null_count: int
+    is_text: bool = False
+    # Share of values (nulls included) that parse as numbers / datetimes.
+    # Estimated on the sample unless the profile is exact.
+    numeric_ratio: float = 0.0
+    datetime_ratio: float = 0.0
+    # Distinct-value sketch over every row (HyperLogLog), or None when not built
+    distinct: HyperLogLog | None = None
+
+    @property
+    def distinct_estimate(self) -> int | None:
+        return self.distinct.estimate() if self.distinct is not None else None
+
+    @property
+    def looks_numeric(self) -> bool:
+        return self.is_text and self.numeric_ratio > NUMERIC_THRESHOLD and self.name not in EXCLUDED_COLUMNS
+
+    @property
+    def looks_datetime(self) -> bool:
+        return (
+            self.is_text
+            and self.null_count == 0
+            and self.datetime_ratio == 1.0
+            and self.name not in EXCLUDED_COLUMNS
+        )
+
+
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    columns: list[ColumnProfile] = field(default_factory=list)
+    # Number of rows type inference ran on (== n_rows when exact).
+    sample_size: int = 0
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.columns)
+
+    @property
+    def exact(self) -> bool:
+        return self.sample_size >= self.n_rows
+
+
+# ------------------------------------------------
+# 2. PROFILING ENGINE
+# ------------------------------------------------
+
+def statistical_sample_size(
+    population: int,
+    margin_of_error: float = PROFILE_MARGIN_OF_ERROR,
+    z: float = PROFILE_CONFIDENCE_Z,
+) -> int:
+    """
+    Rows needed to estimate a proportion within `margin_of_error` at the confidence
+    level given by `z` (worst case p=0.5), with finite-population correction.
+    """
+    if population <= 0:
+        return 0
+    n0 = (z ** 2) * 0.25 / (margin_of_error ** 2)
+    n = n0 / (1 + (n0 - 1) / population)
+    return min(population, math.ceil(n))
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == "object" or isinstance(series.dtype, pd.StringDtype)
+
 
-    # DQR Logic 
-    for col in df.columns:
-        null_count = df[col].isnull().sum()
-        if null_count > 0:
+def profile_dataframe(df: pd.DataFrame, exact: bool = PROFILE_EXACT, sketches: bool = PROFILE_SKETCHES) -> DatasetProfile:
+    """
+    Builds the structured profile the DQR and LLM context are rendered from.
+    Null counts come from one vectorized pass over the whole frame; the expensive
+    numeric/datetime inference on text columns only runs on a bounded random sample
+    (or on every row when `exact` is set). With `sketches`, every column also gets a
+    distinct-value sketch (one hashing pass over all rows).
+    """
+    df_len = len(df)
+    null_counts = df_len - df.count()
+
+    text_positions = [i for i in range(df.shape[1]) if _is_text(df.iloc[:, i])]
+
+    sample_size = df_len if exact else statistical_sample_size(df_len)
+    if text_positions and sample_size < df_len:
+        sample = df.iloc[:, text_positions].sample(n=sample_size, random_state=0)
+    else:
+        sample = df.iloc[:, text_positions]
+
+    profile = DatasetProfile(n_rows=df_len, sample_size=sample_size)
+    sampled = {pos: sample.iloc[:, j] for j, pos in enumerate(text_positions)}
+
+    for i, col in enumerate(df.columns):
+        column = ColumnProfile(
+            name=col,
+            dtype=str(df.dtypes.iloc[i]),
+            null_count=int(null_counts.iloc[i]),
+            is_text=i in sampled,
+            distinct=HyperLogLog.of(df.iloc[:, i]) if sketches else None,
+        )
+        values = sampled.get(i)
+        if values is not None and len(values):
+            column.numeric_ratio = pd.to_numeric(values, errors="coerce").notna().sum() / len(values)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                column.datetime_ratio = pd.to_datetime(values, errors="coerce").notna().sum() / len(values)
+        profile.columns.append(column)
+
+    return profile
+
+
+def _convertible_counts(column: ColumnProfile, n_rows: int, as_text: bool) -> tuple[float, float]:
+    # (numeric, datetime)-convertible values of a part, estimated from its ratios. A part
+    # whose text column was parsed as numbers (e.g. only digits in the appended rows) is
+    # numeric wherever it is not null.
+    if as_text and not column.is_text:
+        return float(n_rows - column.null_count), 0.0
+    return column.numeric_ratio * n_rows, column.datetime_ratio * n_rows
+
+
+def merge_profiles(base: DatasetProfile, extra: DatasetProfile) -> DatasetProfile:
+    """
+    Profile of the `base` rows followed by the `extra` rows (same columns), computed from
+    the two profiles alone. Null counts add up; numeric/datetime-convertible counts (each
+    part's ratio times its rows, so a part's sample only speaks for that part) add up and
+    are divided by the new row count; distinct-value sketches merge. Column types stay
+    those of `base`.
+    """
+    n_rows = base.n_rows + extra.n_rows
+    profile = DatasetProfile(n_rows=n_rows, sample_size=base.sample_size + extra.sample_size)
+    for old, new in zip(base.columns, extra.columns):
+        numeric, dates = _convertible_counts(old, base.n_rows, old.is_text)
+        new_numeric, new_dates = _convertible_counts(new, extra.n_rows, old.is_text)
+        distinct = None
+        if old.distinct is not None and new.distinct is not None:
+            distinct = old.distinct.merge(new.distinct)
+        profile.columns.append(ColumnProfile(
+            name=old.name,
+            dtype=old.dtype,
+            null_count=old.null_count + new.null_count,
+            is_text=old.is_text,
+            numeric_ratio=(numeric + new_numeric) / n_rows if n_rows else 0.0,
+            datetime_ratio=(dates + new_dates) / n_rows if n_rows else 0.0,
+            distinct=distinct,
+        ))
+    return profile
+
+
+# ------------------------------------------------
+# 3. RENDERING (DQR + LLM DATA CONTEXT)
+# ------------------------------------------------
+
+def render_info(profile: DatasetProfile) -> str:
+    """Equivalent of df.info(verbose=True) built from the profile (no extra pass over the data)."""
+    lines = [
+        f"RangeIndex: {profile.n_rows} entries",
+        f"Data columns (total {profile.n_cols} columns):",
+        " #   Column  Non-Null Count  Dtype",
+        "---  ------  --------------  -----",
+    ]
+    for i, col in enumerate(profile.columns):
+        lines.append(f" {i:<3} {col.name}  {profile.n_rows - col.null_count} non-null  {col.dtype}")
+    dtype_counts = pd.Series([c.dtype for c in profile.columns]).value_counts(sort=False)
+    lines.append("dtypes: " + ", ".join(f"{d}({n})" for d, n in dtype_counts.items()))
+    return "\n".join(lines)
+
+
+def render_dqr(profile: DatasetProfile) -> str:
+    dqr_list = []
+    df_len = profile.n_rows
+    for col in profile.columns:
+        if col.null_count > 0:
             # Report nulls with respect to the total length (df_len)
-            dqr_list.append(f"Column '{col}' has {null_count} null/NaN values (out of {df_len} rows).")
+            dqr_list.append(f"Column '{col.name}' has {col.null_count} null/NaN values (out of {df_len} rows).")
+        if col.looks_numeric:
+            dqr_list.append(f"Column '{col.name}' is object but looks numeric; consider conversion.")
+        if col.looks_datetime:
+            dqr_list.append(f"Column '{col.name}' seems to be a datetime column.")
 
-        if df[col].dtype == "object":
-            numeric_convertible_count = pd.to_numeric(df[col], errors="coerce").notna().sum()
-            numeric_ratio = numeric_convertible_count / df_len
-            if numeric_ratio > numeric_threshold and col not in ["Name", "Region"]:
-                dqr_list.append(
-                    f"Column '{col}' is object but looks numeric; consider conversion."
-                )
+    return "\n".join(sorted(set(dqr_list))) or "Data appears clean."
 
-            datetime_convertible_count = pd.to_datetime(df[col], errors="coerce").notna().sum()
-            if datetime_convertible_count == df_len and col not in ["Name", "Region"]:
-                dqr_list.append(f"Column '{col}' seems to be a datetime column.")
 
-    DQR = "\n".join(sorted(set(dqr_list))) or "Data appears clean."
+def render_dqr_and_context(profile: DatasetProfile) -> tuple[str, str]:
+    # We are explicitly REMOVING the df.head(10) markdown table from the context
+    # to eliminate the visual cue that was confusing the LLM into thinking the dataset
+    # only contained 10 rows, despite the correct count being in the summary.
+    DQR = render_dqr(profile)
 
     # FIX: The DATA_CONTEXT now only includes the mandatory, accurate information.
     DATA_CONTEXT = f"""
 ### 📊 Dataset Summary
-The entire DataFrame 'df' contains **{df_len} rows** and **{len(df.columns)} columns**.
+The entire DataFrame 'df' contains **{profile.n_rows} rows** and **{profile.n_cols} columns**.
 
 ### 🚩 Data Info (Column Types and Non-Null Counts)
-{info_str}
+{render_info(profile)}
 
 ### 📈 Data Quality Report (DQR)
 {DQR}
 """
-    return DQR, DATA_CONTEXT
\ No newline at end of file
+    return DQR, DATA_CONTEXT
+
+
+def generate_dqr_and_context(df: pd.DataFrame, exact: bool = PROFILE_EXACT) -> tuple[str, str]:
+    return render_dqr_and_context(profile_dataframe(df, exact=exact, sketches=False))
@@ -0,0 +1,130 @@
+import warnings
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from config.settings import CATEGORY_MAX_UNIQUE_RATIO, CATEGORY_MAX_UNIQUE
+from services.data_quality import DatasetProfile, _is_text
+from services.session_store import frame_nbytes
+
+try:
+    import pyarrow  # noqa: F401
+    # NaN for missing values, as in object columns: a comparison with one is False, not NA
+    COMPACT_STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+except (ImportError, TypeError):
+    # TypeError: pandas < 2.3 only has the NA-valued Arrow strings
+    COMPACT_STRING_DTYPE = None
+
+
+@dataclass
+class MemoryReport:
+    before_bytes: int
+    after_bytes: int
+    # column -> "old dtype -> new dtype"
+    conversions: dict = field(default_factory=dict)
+
+    @property
+    def ratio(self) -> float:
+        return (self.before_bytes / self.after_bytes) if self.after_bytes else 1.0
+
+    def as_dict(self) -> dict:
+        return {
+            "before_bytes": self.before_bytes,
+            "after_bytes": self.after_bytes,
+            "ratio": round(self.ratio, 2),
+            "conversions": self.conversions,
+        }
+
+
+# ------------------------------------------------
+# 1. PER-COLUMN CONVERSIONS (each one lossless)
+# ------------------------------------------------
+
+def _downcast_integer(series: pd.Series) -> pd.Series:
+    # Not below 32 bits: generated code does arithmetic on these columns (e.g. price * qty)
+    # and int8/int16 would silently overflow where int64 did not
+    if series.empty or series.dtype.itemsize <= 4:
+        return series
+    info = np.iinfo(np.int32)
+    if series.min() >= info.min and series.max() <= info.max:
+        return series.astype(np.int32)
+    return series
+
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    # float32 keeps ~7 significant digits; only keep it if every value round-trips exactly
+    narrow = series.astype(np.float32)
+    if np.array_equal(narrow.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+        return narrow
+    return series
+
+
+def _parse_datetime(series: pd.Series) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(series, errors="coerce")
+    # The profile flag is sample-based; keep the text if any full-column value fails to parse
+    if parsed.isna().sum() != series.isna().sum():
+        return series
+    return parsed
+
+
+def _compact_text(series: pd.Series, max_unique_ratio: float, max_unique: int) -> pd.Series:
+    non_null = series.count()
+    if max_unique_ratio and non_null and series.nunique() <= min(non_null * max_unique_ratio, max_unique):
+        return series.astype("category")
+    if series.dtype == "object" and COMPACT_STRING_DTYPE is not None:
+        # Mixed object columns (e.g. str + numbers) are left alone rather than stringified
+        if pd.api.types.infer_dtype(series, skipna=True) == "string":
+            return series.astype(COMPACT_STRING_DTYPE)
+    return series
+
+
+# ------------------------------------------------
+# 2. FRAME PASS
+# ------------------------------------------------
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    profile: DatasetProfile,
+    max_unique_ratio: float = CATEGORY_MAX_UNIQUE_RATIO,
+    max_unique: int = CATEGORY_MAX_UNIQUE,
+) -> tuple[pd.DataFrame, MemoryReport]:
+    """
+    Returns a memory-optimized copy of the frame and a report of what changed.
+    Numeric columns are downcast, DQR-flagged datetime columns parsed and object text
+    moved to Arrow-backed strings; with `max_unique_ratio`, low-cardinality text columns
+    are made categorical instead.
+    The profile's dtypes are updated in place so the DQR/context describe the new frame.
+    """
+    report = MemoryReport(before_bytes=frame_nbytes(df), after_bytes=0)
+    converted = {}
+
+    for i, col in enumerate(profile.columns):
+        series = df.iloc[:, i]
+        if series.dtype.kind == "i":
+            new = _downcast_integer(series)
+        elif series.dtype.kind == "f" and series.dtype.itemsize > 4:
+            new = _downcast_float(series)
+        elif col.looks_datetime:
+            new = _parse_datetime(series)
+        elif _is_text(series):
+            new = _compact_text(series, max_unique_ratio, max_unique)
+        else:
+            continue
+
+        if new.dtype != series.dtype:
+            converted[i] = new
+            report.conversions[str(col.name)] = f"{series.dtype} -> {new.dtype}"
+            col.dtype = str(new.dtype)
+            if col.looks_datetime and pd.api.types.is_datetime64_any_dtype(new.dtype):
+                col.is_text = False
+
+    if converted:
+        df = df.copy(deep=False)
+        for i, new in converted.items():
+            df.isetitem(i, new)
+
+    report.after_bytes = frame_nbytes(df) if converted else report.before_bytes
+    return df, report
@@ -0,0 +1,158 @@
+import re
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from services.data_quality import DatasetProfile
+from services.out_of_core import ChunkedFrame
+from services.result_cache import normalize_query
+
+# ------------------------------------------------
+# 1. PER-SESSION STATISTICS INDEX
+# ------------------------------------------------
+
+class StatsIndex:
+    """
+    Cheap per-session statistics, built at upload from the profile. Unique counts are
+    computed on first request per column and memoized.
+    """
+
+    def __init__(self, profile: DatasetProfile):
+        self.profile = profile
+        self.columns = {str(col.name).lower(): col for col in profile.columns}
+        self._nunique: dict = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Pickled with the session metadata by the filesystem backend; locks don't pickle
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def n_rows(self) -> int:
+        return self.profile.n_rows
+
+    def find_column(self, text: str):
+        """Column profile named in `text` (case-insensitive, spaces == underscores), or None."""
+        text = text.strip(" '\"`")
+        for key in (text, text.replace(" ", "_"), text.replace("_", " ")):
+            if key in self.columns:
+                return self.columns[key]
+        return None
+
+    def nunique(self, df: pd.DataFrame, column) -> int:
+        with self._lock:
+            if column.name not in self._nunique:
+                if isinstance(df, ChunkedFrame):
+                    # Reads just this column from disk
+                    self._nunique[column.name] = int(df.nunique(column.name))
+                else:
+                    self._nunique[column.name] = int(df[column.name].nunique())
+            return self._nunique[column.name]
+
+
+# ------------------------------------------------
+# 2. INTENTS (anchored patterns only: anything with a filter/grouping falls back)
+# ------------------------------------------------
+
+_DATASET = r"(?: (?:in|of) (?:the|this|my) (?:dataset|data|file|table|csv|dataframe))?"
+_COLUMN = r"(?:the )?(?:column |field )?['\"`]?(?P<column>[\w ]+?)['\"`]?(?: column| field)?"
+
+INTENTS = [
+    ("row_count", re.compile(
+        rf"^(?:how many|number of|count of|total(?: number of)?) (?:rows|records|entries|observations)(?: (?:are|is)(?: there)?| does it have)?{_DATASET}$"
+        rf"|^(?:what is|what's) the (?:size|length|row count)(?: of (?:the|this) (?:dataset|data|file))?$"
+    )),
+    ("column_count", re.compile(
+        rf"^(?:how many|number of|count of) (?:columns|fields|variables|features)(?: (?:are|is)(?: there)?| does it have)?{_DATASET}$"
+    )),
+    ("column_names", re.compile(
+        rf"^(?:what are|list|show(?: me)?|give me|which are) (?:all )?(?:the )?(?:column names|columns|fields)(?: names)?{_DATASET}$"
+        rf"|^(?:column names|columns)$"
+    )),
+    ("dtypes", re.compile(
+        rf"^(?:what are |show(?: me)? |list )?(?:the )?(?:data ?types|dtypes|column types|types of (?:the )?columns)(?: of (?:the )?columns)?{_DATASET}$"
+    )),
+    ("null_count_column", re.compile(
+        rf"^(?:how many|number of|count of) (?:missing|null|nan|empty) (?:values|entries|rows) (?:are (?:there )?)?in {_COLUMN}$"
+    )),
+    ("null_counts", re.compile(
+        rf"^(?:how many |show(?: me)? |list |what are (?:the )?|which columns have |are there (?:any )?)?(?:missing|null|nan) (?:values|counts)(?: per column| by column| in each column)?{_DATASET}$"
+    )),
+    ("unique_count", re.compile(
+        rf"^(?:how many|number of|count of) (?:unique|distinct) (?:values (?:in|of|for) )?{_COLUMN}(?: values)?(?: are there)?{_DATASET}$"
+    )),
+]
+
+
+def _answer(intent: str, match: re.Match, stats: StatsIndex, df: pd.DataFrame) -> str | None:
+    profile = stats.profile
+    if intent == "row_count":
+        return f"The dataset contains **{profile.n_rows} rows**."
+    if intent == "column_count":
+        return f"The dataset has **{profile.n_cols} columns**."
+    if intent == "column_names":
+        names = ", ".join(f"`{col.name}`" for col in profile.columns)
+        return f"The dataset has {profile.n_cols} columns: {names}."
+    if intent == "dtypes":
+        rows = "\n".join(f"| {col.name} | {col.dtype} |" for col in profile.columns)
+        return f"The column data types are:\n\n| Column | Data Type |\n|--------|-----------|\n{rows}"
+    if intent == "null_counts":
+        missing = [col for col in profile.columns if col.null_count]
+        if not missing:
+            return "The dataset has no missing values."
+        rows = "\n".join(f"| {col.name} | {col.null_count} |" for col in missing)
+        return f"The following columns have missing values:\n\n| Column | Missing Values |\n|--------|----------------|\n{rows}"
+
+    column = stats.find_column(match.group("column"))
+    if column is None:
+        return None
+    if intent == "null_count_column":
+        return f"The column '{column.name}' has **{column.null_count}** missing values (out of {profile.n_rows} rows)."
+    if intent == "unique_count":
+        return f"The column '{column.name}' has **{stats.nunique(df, column)}** unique values."
+    return None
+
+
+# ------------------------------------------------
+# 3. ROUTER + TRAFFIC METRICS
+# ------------------------------------------------
+
+_counter_lock = threading.Lock()
+_routed = 0
+_served = Counter()
+
+def try_fast_path(query: str, stats: StatsIndex, df: pd.DataFrame) -> str | None:
+    """Deterministic answer for a recognized query shape, or None to use the LLM graph."""
+    global _routed
+    normalized = normalize_query(query)
+    answer, served_intent = None, None
+    for intent, pattern in INTENTS:
+        match = pattern.match(normalized)
+        if match:
+            answer = _answer(intent, match, stats, df)
+            if answer is not None:
+                served_intent = intent
+                break
+
+    with _counter_lock:
+        _routed += 1
+        if served_intent:
+            _served[served_intent] += 1
+    return answer
+
+def fast_path_stats() -> dict:
+    with _counter_lock:
+        served = sum(_served.values())
+        return {
+            "routed": _routed,
+            "served": served,
+            "share": (served / _routed) if _routed else 0.0,
+            "by_intent": dict(_served),
+        }
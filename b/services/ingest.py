@@ -0,0 +1,209 @@
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+
+from config.settings import (
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_SPOOL_MAX_MEMORY,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_MAX_ROWS,
+)
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the configured byte or row limit."""
+
+
+class CsvParseError(ValueError):
+    """Raised when the uploaded bytes cannot be parsed as CSV."""
+
+
+# ------------------------------------------------
+# 1. SPOOL THE UPLOAD (bounded memory, chunked)
+# ------------------------------------------------
+
+async def spool_upload(
+    file: UploadFile,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    max_bytes: int | None = UPLOAD_MAX_BYTES,
+):
+    """
+    Copies the upload into a SpooledTemporaryFile chunk by chunk.
+    Small files stay in memory, anything above UPLOAD_SPOOL_MAX_MEMORY rolls over to disk,
+    so we never hold the whole raw body in RAM next to the parsed frame.
+    The body is hashed (SHA-256) on the way through for content-addressed deduplication.
+    Returns (spool, total_bytes, digest) with the spool rewound to the start.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_MEMORY, mode="w+b")
+    digest = hashlib.sha256()
+    total_bytes = 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            total_bytes += len(chunk)
+            if max_bytes and total_bytes > max_bytes:
+                raise UploadTooLarge(
+                    f"Upload exceeds the limit of {max_bytes} bytes."
+                )
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    return spool, total_bytes, digest.hexdigest()
+
+
+def dataset_key(
+    digest: str,
+    header: int | None,
+    optimize_dtypes: bool = False,
+    max_rows: int | None = UPLOAD_MAX_ROWS,
+) -> str:
+    """
+    Content address of the parsed dataset: the same bytes parsed with the same options
+    always give the same frame, so uploads with equal keys can share one stored copy.
+    """
+    options = f"{digest}:header={header}:max_rows={max_rows or 0}:optimize_dtypes={int(optimize_dtypes)}"
+    return hashlib.sha256(options.encode()).hexdigest()
+
+
+def appended_key(base_key: str, digest: str, header: int | None) -> str:
+    """Content address of a stored dataset with the rows of another upload appended."""
+    options = f"{base_key}:append={digest}:header={header}"
+    return hashlib.sha256(options.encode()).hexdigest()
+
+
+# ------------------------------------------------
+# 2. PARSE THE SPOOLED FILE
+# ------------------------------------------------
+
+class _ProgressReader:
+    """File wrapper reporting the number of bytes handed to the parser so far."""
+
+    def __init__(self, handle, progress):
+        self._handle = handle
+        self._progress = progress
+        self._bytes = 0
+
+    def read(self, size: int = -1):
+        data = self._handle.read(size)
+        self._bytes += len(data)
+        self._progress(self._bytes)
+        return data
+
+    def __iter__(self):
+        return iter(self._handle)
+
+
+def parse_csv(
+    spool,
+    header: int | None = 0,
+    max_rows: int | None = UPLOAD_MAX_ROWS,
+    progress=None,
+) -> pd.DataFrame:
+    """
+    Parses the CSV straight from the file handle. The C parser reads the handle
+    in buffered blocks, so no intermediate bytes/BytesIO copy of the body is made.
+    A file with more than `max_rows` data rows raises UploadTooLarge (None = no limit);
+    parsing stops one row past the limit, so an oversized file is never fully read.
+    `progress(bytes_read)` is called after every block the parser reads.
+    """
+    source = _ProgressReader(spool, progress) if progress else spool
+    try:
+        df = pd.read_csv(source, header=header, nrows=max_rows + 1 if max_rows else None)
+    except Exception as e:
+        raise CsvParseError(str(e)) from e
+    if max_rows and len(df) > max_rows:
+        raise UploadTooLarge(f"Upload exceeds the limit of {max_rows} rows.")
+
+    # Normalize the index once here, so execution never has to reset_index per attempt
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(drop=True)
+    return df
+
+
+# ------------------------------------------------
+# 3. CONFORM APPENDED ROWS TO THE SESSION SCHEMA
+# ------------------------------------------------
+
+class SchemaMismatch(ValueError):
+    """Raised when appended rows do not fit the columns and types of the session data."""
+
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+def _conform_column(values: pd.Series, dtype) -> pd.Series:
+    """`values` as `dtype`, or ValueError if that would change or drop any value."""
+    if values.dtype == dtype:
+        return values
+    if isinstance(dtype, pd.CategoricalDtype):
+        # New labels are fine; combine_frames unions the categories
+        return _conform_column(values, dtype.categories.dtype).astype("category")
+    if pd.api.types.is_bool_dtype(dtype):
+        if not pd.api.types.is_bool_dtype(values.dtype):
+            raise ValueError(f"expected booleans, got {values.dtype}")
+        return values.astype(dtype)
+    if pd.api.types.is_numeric_dtype(dtype):
+        numbers = pd.to_numeric(values, errors="coerce") if not pd.api.types.is_numeric_dtype(values.dtype) else values
+        if numbers.isna().sum() != values.isna().sum():
+            raise ValueError(f"expected numbers ({dtype}), got text")
+        if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype) and numbers.isna().any():
+            raise ValueError(f"expected {dtype} values, got nulls")
+        converted = numbers.astype(dtype)
+        if not np.array_equal(converted.to_numpy(np.float64, na_value=np.nan), numbers.to_numpy(np.float64, na_value=np.nan), equal_nan=True):
+            raise ValueError(f"values do not fit {dtype}")
+        return converted
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            parsed = pd.to_datetime(values, errors="coerce")
+        if parsed.isna().sum() != values.isna().sum():
+            raise ValueError("expected dates")
+        return parsed.astype(dtype)
+    if pd.api.types.is_string_dtype(dtype):
+        # Text columns take anything (e.g. digits-only rows parsed as numbers), nulls stay null
+        if pd.api.types.is_float_dtype(values.dtype) and (values.dropna() % 1 == 0).all():
+            # Whole numbers parsed as float because of a null: "12", not "12.0"
+            values = values.astype("Int64")
+        return values.astype(dtype).where(values.notna())
+    return values.astype(dtype)
+
+
+def conform_rows(rows: pd.DataFrame, columns: list, dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Casts parsed rows to the session frame's column dtypes so they can be appended to it.
+    Raises SchemaMismatch (listing every problem) when the column labels differ or a
+    value cannot be stored in its column without loss.
+    """
+    if list(rows.columns) != list(columns):
+        missing = [c for c in columns if c not in rows.columns]
+        extra = [c for c in rows.columns if c not in columns]
+        errors = []
+        if missing:
+            errors.append(f"missing columns: {missing}")
+        if extra:
+            errors.append(f"unexpected columns: {extra}")
+        if not errors:
+            errors.append(f"columns are in a different order; expected {list(columns)}")
+        raise SchemaMismatch(errors)
+
+    conformed, errors = {}, []
+    for i, (column, dtype) in enumerate(zip(columns, dtypes)):
+        try:
+            conformed[i] = _conform_column(rows.iloc[:, i], dtype)
+        except (ValueError, TypeError) as e:
+            errors.append(f"column {column!r}: {e}")
+    if errors:
+        raise SchemaMismatch(errors)
+    frame = pd.concat(conformed, axis=1) if conformed else rows
+    frame.columns = rows.columns
+    return frame
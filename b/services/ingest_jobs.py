@@ -0,0 +1,135 @@
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+from config.settings import INGEST_JOB_TTL_SECONDS
+
+# Stages in order; "ready" and "failed" are terminal
+STAGES = ("queued", "parsing", "profiling", "optimizing", "indexing", "storing", "ready", "failed")
+
+
+# ------------------------------------------------
+# 1. BACKGROUND INGEST JOB
+# ------------------------------------------------
+
+@dataclass
+class IngestJob:
+    """
+    Progress of one background upload. Updated from the ingest task and its worker
+    threads; read by the status endpoints and by /chat while it waits for the session.
+    """
+    session_id: str
+    bytes_total: int
+    stage: str = "queued"
+    bytes_parsed: int = 0
+    rows: int | None = None
+    error: str = ""
+    # The /upload response body, once ready
+    result: dict | None = None
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    # Incremented on every change, so streams only send real updates
+    version: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in ("ready", "failed")
+
+    def update(self, **changes) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.updated = time.time()
+            self.version += 1
+
+    def advance(self, bytes_parsed: int) -> None:
+        # Called by the CSV reader for every block it reads (worker thread)
+        self.update(bytes_parsed=bytes_parsed)
+
+    def finish(self, result: dict) -> None:
+        """Marks the job ready; must run on the event loop (wakes waiting chats)."""
+        self.update(stage="ready", result=result, bytes_parsed=self.bytes_total)
+        self._done.set()
+
+    def fail(self, error: str) -> None:
+        self.update(stage="failed", error=error)
+        self._done.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Waits until the job is finished; False on timeout."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            progress = (self.bytes_parsed / self.bytes_total) if self.bytes_total else 1.0
+            status = {
+                "session_id": self.session_id,
+                "status": self.stage if self.finished else "processing",
+                "stage": self.stage,
+                "bytes_total": self.bytes_total,
+                "bytes_parsed": self.bytes_parsed,
+                "parse_progress": round(min(progress, 1.0), 4),
+                "rows": self.rows,
+                "elapsed_seconds": round(self.updated - self.created, 3),
+            }
+            if self.error:
+                status["error"] = self.error
+            if self.result:
+                status["result"] = self.result
+            return status
+
+
+# ------------------------------------------------
+# 2. REGISTRY (per process)
+# ------------------------------------------------
+
+class IngestJobRegistry:
+    """
+    Jobs of this worker process by session id. Finished jobs are kept for
+    INGEST_JOB_TTL_SECONDS so clients can still read the outcome, then dropped.
+    The running task is referenced here so it is not garbage collected mid-run.
+    Other workers read a job's start and outcome from SessionBackend.ingest_status.
+    """
+
+    def __init__(self, ttl_seconds: float = INGEST_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, IngestJob] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def start(self, job: IngestJob, coroutine) -> IngestJob:
+        self._prune()
+        with self._lock:
+            self._jobs[job.session_id] = job
+            task = asyncio.get_running_loop().create_task(coroutine)
+            self._tasks[job.session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.session_id, None))
+        return job
+
+    def get(self, session_id: str) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(session_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for session_id in [s for s, j in self._jobs.items() if j.finished and j.updated < cutoff]:
+                del self._jobs[session_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "running": sum(not j.finished for j in jobs),
+            "ready": sum(j.stage == "ready" for j in jobs),
+            "failed": sum(j.stage == "failed" for j in jobs),
+        }
@@ -189,17 +189,44 @@
 
 
 import re
-import io
-import contextlib
-import pandas as pd
+import time
+import asyncio
 # Add logging import for debugging
 import logging 
+import threading
+from collections import Counter
 
 from langgraph.graph import StateGraph, END  # type: ignore
+from langgraph.config import get_stream_writer  # type: ignore
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from config.settings import get_llm, MAX_RETRIES
+from config.settings import (
+    get_llm,
+    MAX_RETRIES,
+    EXEC_MODE,
+    SPECULATIVE_CANDIDATES,
+    SPECULATIVE_TEMPERATURE,
+    BATCH_MAX_CONCURRENCY,
+    CODE_ANALYSIS,
+    CODE_ANALYSIS_HINT_MIN_ROWS,
+)
 from models.agent_state import AgentState
+from services.sandbox import run_code_in_namespace, execution_view, get_sandbox_pool
+from services.namespace_store import names_used, execution_names, describe_namespace
+from services.fast_path import try_fast_path
+from services.out_of_core import ChunkedFrame
+from services.code_analysis import analyze_code
+from services.result_tables import ResultTable, bounded_text, discard_result
+from services.metrics import (
+    Trace,
+    TokenUsageCallback,
+    instrument_node,
+    record_execution,
+    peak_rss_bytes,
+    tracing,
+    NODE_SECONDS,
+    CODE_FINDINGS,
+)
 
 logger = logging.getLogger(__name__) # Initialize logger
 
@@ -221,7 +248,8 @@ Use the following CSV data context and user query to generate Python code.
 3. **MANDATORY FOR SIZE/COUNT:** If the user asks for the total number of rows or the size of the dataset, you **MUST** use `print(len(df))` to get the current row count. **DO NOT infer the count from the data context preview.**
 4. For all other counting tasks (e.g., unique values), always use `print(df['column'].nunique())` to ensure a clean numerical output.
 5. **DATA ACCESS:** The DataFrame is already loaded as the variable `df`. **DO NOT** use `pd.read_csv()`, `open()`, or any other file loading function.
-
+6. **LARGE TABLES:** If the answer is a table with more than a few rows (e.g. a groupby over many groups, or a list of matching records), assign it to a variable named `result` as a DataFrame instead of printing it; the complete table is shown to the user separately. Then print only a one-line description of it (e.g. `print(f"{{len(result)}} customers")`).
+{engine_rules}{namespace_rules}
 Data Context:
 {data_context}
 {error_context}
@@ -240,8 +268,31 @@ When returning tabular summaries, ALWAYS use Markdown table format like this:
 Do not use spaces or plain text tables. Always use the Markdown pipe syntax.
 """
 
-def code_generator_node(state: AgentState) -> dict:
-    llm = get_llm()  # lazy load
+CHUNKED_ENGINE_RULES = """
+### 🧱 LARGE DATASET (OVERRIDES RULES 3-5):
+The dataset is too large for memory. `df` is **not** a pandas DataFrame; it is a chunked on-disk dataset.
+- Stream it with `for chunk in df.iter_chunks(columns=[...]):` (each `chunk` is a pandas DataFrame) and **combine per-chunk partial results**: sums and counts (compute a mean as total sum / total count), `value_counts()` or `groupby(...).sum()` partials merged with `.add(other, fill_value=0)`, running min/max.
+- Always pass only the `columns` you need. `df.read(columns=[...])` loads a few columns fully; use it only for narrow selections.
+- `len(df)`, `df.columns`, `df.dtypes`, `df.shape` and `df.head(n)` are available. `df['col']`, `df.loc` and other DataFrame methods are NOT.
+"""
+
+NAMESPACE_RULES = """
+### 🧷 SESSION VARIABLES:
+Top-level variables you assign (cleaned or parsed frames, aggregates, lookups) are kept for follow-up questions in this session. Give reusable intermediate results descriptive names, and never reassign `df`.
+{saved}"""
+
+def _namespace_rules(namespace: dict | None) -> str:
+    if namespace is None:
+        return ""
+    saved = ""
+    if namespace:
+        saved = (
+            "These variables from earlier questions are already defined; reuse them instead of "
+            "recomputing when they fit the question:\n" + describe_namespace(namespace) + "\n"
+        )
+    return NAMESPACE_RULES.format(saved=saved)
+
+def build_code_prompt(state: AgentState) -> str:
     error_context = ""
     if state.get('error'):
         error_context = f"""
@@ -250,13 +301,22 @@ def code_generator_node(state: AgentState) -> dict:
         ### 📜 Previous FAILED CODE:
         {state.get('generated_code', '')}
         """
-    full_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+    elif state.get('code_hint'):
+        error_context = f"""
+        ### 🐢 PERFORMANCE FEEDBACK:
+        {state['code_hint']}
+        ### 📜 Previous SLOW CODE:
+        {state.get('generated_code', '')}
+        """
+    return SYSTEM_PROMPT_TEMPLATE.format(
         user_query=state['user_query'],
         data_context=state['dqr_report'],
-        error_context=error_context
+        error_context=error_context,
+        engine_rules=CHUNKED_ENGINE_RULES if isinstance(state.get('df'), ChunkedFrame) else "",
+        namespace_rules=_namespace_rules(state.get('namespace')),
     )
 
-    response = llm.invoke(full_prompt).content
+def extract_code(response: str) -> str:
     response_content = response.strip()
 
     # --- Code Extraction Logic ---
@@ -277,60 +337,245 @@ def code_generator_node(state: AgentState) -> dict:
 
     # Log the generated code for immediate debugging
     logger.info(f"Generated Code: {code.strip()[:150]}...")
+    return code
 
+def emit_event(event: dict) -> None:
+    """
+    Sends an event on the graph's "custom" stream (consumed by /chat as SSE).
+    A no-op when the node runs outside a streaming graph run.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer(event)
+
+def _generated_code_update(state: AgentState, code: str) -> dict:
     # Ensure we reset the error status for the next execution attempt
     return {
         **state, 
         "generated_code": code, 
         "error": "", 
+        "code_hint": "",
         "retries": state.get("retries", 0) + 1
     }
 
+def code_generator_node(state: AgentState) -> dict:
+    llm = get_llm()  # lazy load
+    response = llm.invoke(build_code_prompt(state)).content
+    return _generated_code_update(state, extract_code(response))
+
+async def acode_generator_node(state: AgentState) -> dict:
+    """Async variant: awaits the LLM instead of blocking a thread for the round trip."""
+    llm = get_llm()  # lazy load
+    emit_event({"status": "retrying" if state.get('error') or state.get('code_hint') else "generating"})
+    response = (await llm.ainvoke(build_code_prompt(state))).content
+    return _generated_code_update(state, extract_code(response))
+
 
 # ------------------------------------------------
 # 2. MODIFIED EXECUTE CODE NODE (Handles EMPTY_DATASET_RESULT)
 # ------------------------------------------------
 
-def execute_code_node(state: AgentState) -> dict:
-    # Use .copy() defensively, but reset_index is fine for state propagation
-    df_clean = state['df'].copy().reset_index(drop=True) 
-    # Use local_env for security and context
-    local_env = {'df': df_clean, 'pd': pd} 
-    output, error = "", ""
-    code = state['generated_code']
-
-    try:
-        temp_stdout = io.StringIO()
-        with contextlib.redirect_stdout(temp_stdout):
-            # Pass local_env as both global and local scope for simplicity in agent code
-            exec(code, {"__builtins__": __builtins__, "pd": pd}, local_env) 
-        
-        # Capture the output and check if it's empty
-        output = temp_stdout.getvalue().strip() 
-        
-        # CRITICAL FIX: If output is empty, it means filtering yielded no rows.
-        if not output:
-            # We don't know *why* it was empty (could be user's fault), 
-            # so we set a flag for the humanize_node to explain.
-            output = EMPTY_DATASET_RESULT
-        
-        error = ""
-        
-    except Exception as e:
-        error = f"{e.__class__.__name__}: {str(e)}"
+def _execution_update(
+    state: AgentState, output: str, error: str, saved: dict | None = None, table: ResultTable | None = None
+) -> dict:
+    # The answer step gets bounded text: long printed output is cut, and a `result`
+    # table is represented by its summary (the full table is served by /results)
+    output = bounded_text(output)
+    if table is not None:
+        output = f"{output}\n\n{table.summary}".strip()
+
+    # CRITICAL FIX: If output is empty, it means filtering yielded no rows.
+    if not error and not output:
+        # We don't know *why* it was empty (could be user's fault), 
+        # so we set a flag for the humanize_node to explain.
+        output = EMPTY_DATASET_RESULT
 
     # Log the result of the code execution 
     logger.info(f"Execution Output (code_result): {output.strip()[:100]}...")
+    return {**state, "code_result": output, "error": error, "namespace_updates": saved or {}, "result_table": table}
+
+def _execution_namespace(state: AgentState) -> dict | None:
+    # Only the saved variables the code refers to are handed over (and, for a sandbox, pickled)
+    if state.get('namespace') is None:
+        return None
+    return execution_names(names_used(state['generated_code'], state['namespace']))
+
+def execute_code_node(state: AgentState) -> dict:
+    # Copy-on-write view: the session frame is never modified, and nothing is copied
+    # unless the generated code writes to it. The index is normalized once at upload.
+    df_clean = execution_view(state['df'])
+    cpu_start = time.thread_time()
+    output, error, saved, table = run_code_in_namespace(state['generated_code'], df_clean, _execution_namespace(state))
+    record_execution(time.thread_time() - cpu_start, peak_rss_bytes(), mode="thread")
 
     # Return the clean df (in case the code modified it) and the execution result/error
-    return {**state, "df": df_clean, "code_result": output, "error": error}
+    return {**_execution_update(state, output, error, saved, table), "df": df_clean}
+
+async def _aexecute(state: AgentState) -> dict:
+    if EXEC_MODE == "process" and state.get('dataset_path'):
+        pool = get_sandbox_pool()
+        output, error, saved, table = await asyncio.to_thread(
+            pool.run_in_namespace, state['generated_code'], state['dataset_path'], _execution_namespace(state)
+        )
+        return _execution_update(state, output, error, saved, table)
+    return await asyncio.to_thread(execute_code_node, state)
+
+async def aexecute_code_node(state: AgentState) -> dict:
+    """
+    Async variant, off the event loop. With EXEC_MODE=process the code runs in the
+    sandbox pool against the session's memory-mapped Arrow file; otherwise in a thread.
+    """
+    emit_event({"status": "executing"})
+    return await _aexecute(state)
+
+# ------------------------------------------------
+# 2a. ANALYZE CODE NODE (slow patterns: rewrite, or send back a hint without executing)
+# ------------------------------------------------
+
+def _analysis_update(state: AgentState, max_retries: int) -> dict:
+    """
+    Rewrites the slow patterns of the generated code that have an exact vectorized form.
+    If others remain and the dataset is large, sets `code_hint` instead so the code is
+    regenerated without being run: once per chat, and only while an attempt is left.
+    """
+    if not CODE_ANALYSIS or not state.get('generated_code'):
+        return state
+    analysis = analyze_code(state['generated_code'])
+    if not analysis.findings:
+        return state
+
+    stats = state.get('stats_index')
+    n_rows = stats.n_rows if stats is not None else len(state['df'])
+    hint = bool(
+        analysis.unresolved
+        and n_rows >= CODE_ANALYSIS_HINT_MIN_ROWS
+        and not state.get('hints_given')
+        and state.get('retries', 0) < max_retries
+    )
+    for finding in analysis.findings:
+        action = "rewritten" if finding.rewritten else "hinted" if hint else "executed"
+        CODE_FINDINGS.inc(pattern=finding.pattern, action=action)
+
+    if hint:
+        logger.info(f"Slow patterns in generated code, asking for a vectorized version: {[f.pattern for f in analysis.unresolved]}")
+        return {**state, "code_hint": analysis.hint(), "hints_given": state.get('hints_given', 0) + 1}
+    if analysis.rewritten:
+        logger.info(f"Rewrote slow patterns in generated code: {[f.pattern for f in analysis.findings if f.rewritten]}")
+        return {**state, "generated_code": analysis.code}
+    return state
+
+def make_analyze_node(max_retries: int = MAX_RETRIES):
+    def analyze_code_node(state: AgentState) -> dict:
+        return _analysis_update(state, max_retries)
+    return analyze_code_node
+
+def route_after_analysis(state: AgentState):
+    # A hint goes back to code generation; the code was not run
+    if state.get('code_hint'):
+        return "generate_code"
+    return "execute_code"
+
+# ------------------------------------------------
+# 2b. SPECULATIVE ATTEMPT NODE (N candidates generated + executed concurrently)
+# ------------------------------------------------
+
+_speculation_lock = threading.Lock()
+_speculation_rounds = 0
+_speculation_wins = Counter()
+_speculation_cancelled = 0
+
+def make_speculative_node(candidates: int, temperature: float = SPECULATIVE_TEMPERATURE):
+    """
+    One attempt = `candidates` programs requested concurrently, each executed as soon as
+    it arrives. The first that runs without error and prints something wins and the
+    rest are cancelled. Otherwise an error-free (empty) result is preferred, else the
+    last error is returned so the normal retry routing applies.
+
+    Cancellation stops pending LLM calls; an execution already running in a thread or
+    sandbox worker finishes in the background and its result is discarded. The result
+    tables of all candidates but the returned one are deleted.
+    """
+    async def speculative_attempt_node(state: AgentState) -> dict:
+        global _speculation_rounds, _speculation_cancelled
+        llm = get_llm()  # lazy load
+        emit_event({"status": "retrying" if state.get('error') else "generating", "candidates": candidates})
+        prompt = build_code_prompt(state)
+
+        async def candidate(i: int) -> tuple[int, dict]:
+            # Candidate 0 is the regular (deterministic) program; the others are sampled
+            model = llm if i == 0 else llm.bind(temperature=temperature)
+            response = (await model.ainvoke(prompt)).content
+            # Safe rewrites only: a candidate is never sent back (the others keep running)
+            code = extract_code(response)
+            if CODE_ANALYSIS:
+                code = analyze_code(code).code
+            execution = asyncio.ensure_future(_aexecute(_generated_code_update(state, code)))
+            try:
+                return i, await asyncio.shield(execution)
+            except asyncio.CancelledError:
+                # The thread / sandbox call cannot be stopped; drop its table once it ends
+                execution.add_done_callback(_discard_late_table)
+                raise
+
+        tasks = [asyncio.create_task(candidate(i)) for i in range(candidates)]
+        winner, fallback, failure = None, None, None
+        try:
+            for finished in asyncio.as_completed(tasks):
+                try:
+                    i, result = await finished
+                except Exception as e:
+                    logger.warning(f"Speculative candidate failed: {e.__class__.__name__}: {e}")
+                    failure = e
+                    continue
+                if not result['error'] and result['code_result'] != EMPTY_DATASET_RESULT:
+                    winner = (i, result)
+                    break
+                if fallback is None or (fallback['error'] and not result['error']):
+                    fallback = result
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            for task in pending:
+                task.cancel()
+
+        with _speculation_lock:
+            _speculation_rounds += 1
+            _speculation_cancelled += len(pending)
+            _speculation_wins[winner[0] if winner else "none"] += 1
+
+        # Includes candidates that finished after the winner but before the cancellation
+        chosen = winner[1] if winner else fallback
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is None and task.result()[1] is not chosen:
+                discard_result(task.result()[1].get('result_table'))
+
+        if winner:
+            logger.info(f"Speculative candidate {winner[0]} won ({len(pending)} cancelled).")
+            return winner[1]
+        if fallback is not None:
+            return fallback
+        raise failure
+
+    return speculative_attempt_node
+
+def _discard_late_table(execution: asyncio.Future) -> None:
+    if not execution.cancelled() and execution.exception() is None:
+        discard_result(execution.result().get('result_table'))
+
+def speculation_stats() -> dict:
+    with _speculation_lock:
+        return {
+            "rounds": _speculation_rounds,
+            "wins_by_candidate": {str(k): v for k, v in _speculation_wins.items()},
+            "cancelled_candidates": _speculation_cancelled,
+        }
 
 # ------------------------------------------------
 # 3. MODIFIED HUMANIZE NODE (Handles EMPTY_DATASET_RESULT)
 # ------------------------------------------------
 
-def humanize_node(state: AgentState) -> dict:
-    llm = get_llm()  # lazy load
+def build_humanize_prompt(state: AgentState) -> ChatPromptTemplate:
     code_result = state['code_result']
     original_query = state['user_query']
 
@@ -343,67 +588,347 @@ def humanize_node(state: AgentState) -> dict:
             "Generate a single, concise, and definitive sentence explaining this to the user. "
             "Example: 'The dataset does not contain any information for [specific filter term], resulting in no data for the analysis.'"
         )
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", system_prompt_text),
             ("human", f"The query was: {original_query}")
         ])
         
-    else:
-        # Case 2: Normal execution. Humanize the result using the standard persona.
-        logger.info("Handling successful code result.")
-        system_prompt_text = (
-            "You are a professional Data Scientist presenting the final result of an analysis to a stakeholder. "
-            "**Be highly concise, direct, and definitive in your answer, providing only the necessary finding.** "
-            "Do not mention the underlying code, execution, or the technical name 'df'. "
-            "Instead, refer to the data or the dataset. "
-            "If the result is numerical (e.g., '45'), frame it in a single, confident sentence (e.g., 'The average revenue for the dataset is $45.00'). "
-            "If the result is a table, present the table clearly with a brief, introductory sentence."
+    # Case 2: Normal execution. Humanize the result using the standard persona.
+    logger.info("Handling successful code result.")
+    system_prompt_text = (
+        "You are a professional Data Scientist presenting the final result of an analysis to a stakeholder. "
+        "**Be highly concise, direct, and definitive in your answer, providing only the necessary finding.** "
+        "Do not mention the underlying code, execution, or the technical name 'df'. "
+        "Instead, refer to the data or the dataset. "
+        "If the result is numerical (e.g., '45'), frame it in a single, confident sentence (e.g., 'The average revenue for the dataset is $45.00'). "
+        "If the result is a table, present the table clearly with a brief, introductory sentence."
+    )
+    if state.get('result_table') is not None:
+        system_prompt_text += (
+            " The result includes a RESULT TABLE summary: the complete table is displayed to the user right after "
+            "your answer, so do not reproduce it. Describe what it contains and point out its key figures, "
+            "using only the rows and aggregates given."
         )
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt_text),
-            ("human", f"Original Query: {original_query}\n\nFinal Code Result:\n{code_result}")
-        ])
-    
-    chain = prompt | llm | StrOutputParser()
-    final_answer = chain.invoke(state)
-    
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt_text),
+        ("human", f"Original Query: {original_query}\n\nFinal Code Result:\n{code_result}")
+    ])
+
+def _humanized_update(state: AgentState, final_answer: str) -> dict:
     # Log the final answer content for client-side debugging
     logger.info(f"Final Humanized Answer: {final_answer.strip()[:100]}...")
     
     return {**state, "code_result": final_answer}
 
+def humanize_node(state: AgentState) -> dict:
+    llm = get_llm()  # lazy load
+    chain = build_humanize_prompt(state) | llm | StrOutputParser()
+    return _humanized_update(state, chain.invoke(state))
+
+async def ahumanize_node(state: AgentState) -> dict:
+    """
+    Async variant of humanize_node. Streams the answer token by token: every chunk is
+    emitted as a {"delta": ...} event as soon as the model produces it.
+    """
+    llm = get_llm()  # lazy load
+    emit_event({"status": "answering"})
+    chain = build_humanize_prompt(state) | llm | StrOutputParser()
+
+    parts = []
+    async for token in chain.astream(state):
+        if token:
+            parts.append(token)
+            emit_event({"delta": token})
+    return _humanized_update(state, "".join(parts))
+
 # ------------------------------------------------
-# 4. CONDITIONAL & WORKFLOW BUILD (Unchanged)
+# 3b. FAST PATH NODE (answers from the session statistics index, no LLM)
 # ------------------------------------------------
 
-def decide_next_step(state: AgentState):
-    if state.get('error'):
-        # Check if the error is the empty dataset flag, which should proceed to humanize
-        if state['code_result'] == EMPTY_DATASET_RESULT:
-             return "humanize_answer"
-        
-        # Otherwise, if it's a true Python error, retry code generation
-        if state.get('retries', 0) >= MAX_RETRIES:
-            return END
-        return "generate_code"
-    
-    # Normal path
-    return "humanize_answer"
+async def fast_path_node(state: AgentState) -> dict:
+    stats = state.get('stats_index')
+    if stats is None:
+        return state
+    answer = await asyncio.to_thread(try_fast_path, state['user_query'], stats, state['df'])
+    if answer is None:
+        return state
+    logger.info(f"Fast path answer: {answer[:100]}...")
+    return {**state, "code_result": answer}
+
+# ------------------------------------------------
+# 4. CONDITIONAL & WORKFLOW BUILD
+# ------------------------------------------------
+
+def make_decide_next_step(max_retries: int = MAX_RETRIES):
+    def decide_next_step(state: AgentState):
+        if state.get('error'):
+            # Check if the error is the empty dataset flag, which should proceed to humanize
+            if state['code_result'] == EMPTY_DATASET_RESULT:
+                 return "humanize_answer"
+
+            # Otherwise, if it's a true Python error, retry code generation
+            if state.get('retries', 0) >= max_retries:
+                return END
+            return "generate_code"
+
+        # Normal path
+        return "humanize_answer"
+    return decide_next_step
+
+decide_next_step = make_decide_next_step()
+
+def route_entry(state: AgentState):
+    # Code supplied up front (e.g. from the code cache) skips generation on the first attempt
+    if state.get('generated_code') and not state.get('retries'):
+        return "analyze_code"
+    return "generate_code"
+
+def route_after_fast_path(state: AgentState):
+    # An answer from the fast path ends the run; otherwise continue into the LLM graph
+    if state.get('code_result'):
+        return END
+    return route_entry(state)
+
+def build_workflow(
+    max_retries: int = MAX_RETRIES,
+    nodes: dict | None = None,
+    candidates: int = SPECULATIVE_CANDIDATES,
+):
+    """
+    Builds and compiles the graph. `nodes` overrides individual node callables by
+    name (e.g. {"humanize_answer": my_node}) to build graph variants. With
+    `candidates` > 1 each attempt is a single "speculate" node that generates and
+    executes that many programs concurrently (see make_speculative_node).
+    """
+    node_fns = {
+        "fast_path": fast_path_node,
+        "generate_code": acode_generator_node,
+        "analyze_code": make_analyze_node(max_retries),
+        "execute_code": aexecute_code_node,
+        "humanize_answer": ahumanize_node,
+    }
+    node_fns.update(nodes or {})
+
+    attempt = "generate_code"
+    if candidates > 1:
+        attempt = "speculate"
+        del node_fns["generate_code"]
+        node_fns["speculate"] = make_speculative_node(candidates)
 
-def build_workflow():
     graph = StateGraph(AgentState)
-    graph.add_node("generate_code", code_generator_node)
-    graph.add_node("execute_code", execute_code_node)
-    graph.add_node("humanize_answer", humanize_node)
-    graph.set_entry_point("generate_code")
-    graph.add_edge("generate_code", "execute_code")
-    graph.add_conditional_edges("execute_code", decide_next_step, {
-        "generate_code": "generate_code",
-        "humanize_answer": "humanize_answer",
+    for name, fn in node_fns.items():
+        # Every node is timed (see services.metrics); overrides included
+        graph.add_node(name, instrument_node(name, fn))
+    graph.set_entry_point("fast_path")
+    graph.add_conditional_edges("fast_path", route_after_fast_path, {
+        "generate_code": attempt,
+        "analyze_code": "analyze_code",
         END: END
     })
+    graph.add_conditional_edges("analyze_code", route_after_analysis, {
+        "generate_code": attempt,
+        "execute_code": "execute_code",
+    })
+    retry_routes = {
+        "generate_code": attempt,
+        "humanize_answer": "humanize_answer",
+        END: END
+    }
+    if attempt == "generate_code":
+        graph.add_edge("generate_code", "analyze_code")
+    else:
+        # A speculative attempt already executed its winner
+        graph.add_conditional_edges("speculate", make_decide_next_step(max_retries), retry_routes)
+    graph.add_conditional_edges("execute_code", make_decide_next_step(max_retries), retry_routes)
     
     # Add an edge from the humanize node to the END state
     graph.add_edge("humanize_answer", END) 
     
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
+
+# ------------------------------------------------
+# 5. SHARED COMPILED WORKFLOW (built once, hot-swappable)
+# ------------------------------------------------
+# A compiled graph keeps no per-run data (that lives in AgentState), so one instance
+# is shared by all requests. Swapping installs a new graph atomically; runs already
+# in flight keep the graph they started with.
+
+_workflow_lock = threading.Lock()
+_active_workflow = None
+_active_options: dict = {}
+_workflow_version = 0
+
+def install_workflow(**options):
+    """Compiles a graph variant with build_workflow(**options) and makes it the active one."""
+    global _active_workflow, _active_options, _workflow_version
+    compiled = build_workflow(**options)
+    with _workflow_lock:
+        _active_workflow = compiled
+        _active_options = options
+        _workflow_version += 1
+        version = _workflow_version
+    logger.info(f"Installed workflow v{version} with options {sorted(options)}")
+    return compiled
+
+def get_workflow():
+    """Returns the shared compiled workflow, building the default one on first use."""
+    if _active_workflow is None:
+        install_workflow()
+    return _active_workflow
+
+def recursion_limit(max_retries: int) -> int:
+    # Steps of the longest run: fast path, cached code (analyze + execute), generate +
+    # analyze + execute per attempt, humanize, and one more because LangGraph stops
+    # when the step count reaches the limit
+    return 3 * max_retries + 5
+
+def workflow_config(trace: Trace | None = None) -> dict:
+    """
+    Run config for the active graph (see recursion_limit). With a `trace`, node timings,
+    LLM token usage and execution resources of the run are recorded into it.
+    """
+    max_retries = _active_options.get("max_retries", MAX_RETRIES)
+    config = {"recursion_limit": recursion_limit(max_retries)}
+    if trace is not None:
+        config["callbacks"] = [TokenUsageCallback(trace)]
+        config["configurable"] = {"trace": trace}
+    return config
+
+def workflow_info() -> dict:
+    return {
+        "version": _workflow_version,
+        "max_retries": _active_options.get("max_retries", MAX_RETRIES),
+        "candidates": _active_options.get("candidates", SPECULATIVE_CANDIDATES),
+        "node_overrides": sorted((_active_options.get("nodes") or {}).keys()),
+    }
+
+# ------------------------------------------------
+# 6. BATCHED RUN (many questions about one session, stage by stage)
+# ------------------------------------------------
+
+def _batch_config(trace: Trace | None, node: str) -> dict:
+    # Token usage is attributed by the "langgraph_node" metadata, as inside a graph run
+    config = {"max_concurrency": BATCH_MAX_CONCURRENCY, "metadata": {"langgraph_node": node}}
+    if trace is not None:
+        config["callbacks"] = [TokenUsageCallback(trace)]
+    return config
+
+def _observe_stage(trace: Trace | None, node: str, start: float, size: int) -> None:
+    seconds = time.perf_counter() - start
+    NODE_SECONDS.observe(seconds, node=node)
+    if trace is not None:
+        trace.add_span(node, seconds=round(seconds, 4), batch_size=size)
+
+async def run_batch(states: list, max_retries: int | None = None, trace: Trace | None = None):
+    """
+    Answers several questions about one session without a graph run per question: each
+    stage runs for all pending questions at once. The fast path is tried first; then every
+    code prompt goes to the model in one batched call, the programs execute concurrently,
+    failed ones are regenerated together in the next round (up to `max_retries`), and each
+    round's successes are humanized in one batched call.
+
+    Async generator of (index, event) pairs: {"status": ...}, {"delta": answer},
+    {"error": ...} and a final {"done": True} per question. `states` is updated in place,
+    so states[index] is that question's final state once its "done" event is out.
+    """
+    llm = get_llm()  # lazy load
+    max_retries = _active_options.get("max_retries", MAX_RETRIES) if max_retries is None else max_retries
+
+    # Fast path: questions the session statistics answer need no LLM at all
+    pending = []
+    for i, state in enumerate(states):
+        answer = None
+        if state.get('stats_index') is not None:
+            answer = await asyncio.to_thread(try_fast_path, state['user_query'], state['stats_index'], state['df'])
+        if answer is None:
+            pending.append(i)
+            continue
+        states[i] = {**state, "code_result": answer}
+        yield i, {"status": "fast_path"}
+        yield i, {"delta": answer}
+        yield i, {"done": True}
+
+    while pending:
+        # Code from the code cache skips generation on the first attempt; like
+        # decide_next_step, any failed program (cached or not) is regenerated
+        generate = [
+            i for i in pending
+            if states[i].get('code_hint') or states[i].get('error') or not states[i].get('generated_code')
+        ]
+        if generate:
+            for i in generate:
+                yield i, {"status": "retrying" if states[i].get('error') or states[i].get('code_hint') else "generating"}
+            start = time.perf_counter()
+            responses = await llm.abatch(
+                [build_code_prompt(states[i]) for i in generate],
+                config=_batch_config(trace, "generate_code"),
+                return_exceptions=True,
+            )
+            _observe_stage(trace, "generate_code", start, len(generate))
+            for i, response in zip(generate, responses):
+                if isinstance(response, Exception):
+                    logger.warning(f"Batched code generation failed for query {i}: {response}")
+                    # Counts as an attempt; the next round asks again
+                    states[i] = {
+                        **states[i], "generated_code": "", "code_result": "",
+                        "error": f"{response.__class__.__name__}: {response}",
+                        "retries": states[i].get("retries", 0) + 1,
+                    }
+                else:
+                    states[i] = _generated_code_update(states[i], extract_code(response.content))
+
+        for i in pending:
+            states[i] = _analysis_update(states[i], max_retries)
+        runnable = [i for i in pending if states[i].get('generated_code') and not states[i].get('code_hint')]
+        for i in runnable:
+            yield i, {"status": "executing"}
+
+        async def execute(i: int) -> dict:
+            with tracing(trace):
+                return await _aexecute(states[i])
+
+        if runnable:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(execute(i) for i in runnable))
+            _observe_stage(trace, "execute_code", start, len(runnable))
+            for i, result in zip(runnable, results):
+                if result.get('error') and not result.get('retries'):
+                    # Failed code from the code cache: that attempt counts against max_retries
+                    result = {**result, "retries": 1}
+                states[i] = result
+
+        ready, still_pending = [], []
+        for i in pending:
+            state = states[i]
+            if state.get('code_hint'):
+                # Sent back for a vectorized version; regenerated next round
+                still_pending.append(i)
+            elif not state.get('error') or state['code_result'] == EMPTY_DATASET_RESULT:
+                ready.append(i)
+            elif state.get('retries', 0) >= max_retries:
+                yield i, {"error": f"Could not resolve the query after max retries. Last error: {state['error']}"}
+                yield i, {"done": True}
+            else:
+                still_pending.append(i)
+        pending = still_pending
+
+        if ready:
+            for i in ready:
+                yield i, {"status": "answering"}
+            start = time.perf_counter()
+            answers = await llm.abatch(
+                [build_humanize_prompt(states[i]).invoke(states[i]) for i in ready],
+                config=_batch_config(trace, "humanize_answer"),
+                return_exceptions=True,
+            )
+            _observe_stage(trace, "humanize_answer", start, len(ready))
+            for i, answer in zip(ready, answers):
+                if isinstance(answer, Exception):
+                    # The computed result is still worth returning unpolished
+                    logger.warning(f"Batched humanize failed for query {i}: {answer}")
+                    text = states[i]['code_result']
+                else:
+                    text = answer.content
+                states[i] = _humanized_update(states[i], text)
+                yield i, {"delta": text}
+                yield i, {"done": True}
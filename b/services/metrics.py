@@ -0,0 +1,254 @@
+import time
+import inspect
+import resource
+import threading
+import contextlib
+import contextvars
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# ------------------------------------------------
+# 1. PROMETHEUS PRIMITIVES (text exposition format, no client library needed)
+# ------------------------------------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+MEMORY_BUCKETS = tuple(2 ** p * 1024 * 1024 for p in range(5, 15))  # 32 MiB .. 16 GiB
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    # Label values may not hold a raw backslash, double quote or newline
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name, self.help_text, self.labelnames = name, help_text, labelnames
+        self._values: dict = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help_text, self.labelnames = name, help_text, labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                buckets = [(f'le="{bound}"', count) for bound, count in zip(self.buckets, series)]
+                for le, count in buckets + [('le="+Inf"', series[-1])]:
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text format (served by GET /metrics)."""
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+NODE_SECONDS = Histogram("chatcsv_node_duration_seconds", "Wall time per workflow node run.", ("node",))
+LLM_TOKENS = Counter("chatcsv_llm_tokens_total", "LLM tokens used, by node and kind (prompt/completion).", ("node", "kind"))
+EXEC_CPU_SECONDS = Histogram("chatcsv_exec_cpu_seconds", "CPU time of each generated-code execution.", ("mode",))
+EXEC_PEAK_RSS = Histogram(
+    "chatcsv_exec_peak_rss_bytes",
+    "Peak RSS of the executing process (API process or sandbox worker) after each execution.",
+    ("mode",), MEMORY_BUCKETS,
+)
+CHAT_SECONDS = Histogram("chatcsv_chat_duration_seconds", "End-to-end /chat stream duration.", ("outcome",))
+CHAT_COALESCED = Counter("chatcsv_chat_coalesced_total", "Chats that joined an identical in-flight run instead of starting one.")
+CHAT_RETRIES = Histogram("chatcsv_chat_code_attempts", "Code-generation attempts per chat.", (), COUNT_BUCKETS)
+UPLOAD_STAGE_SECONDS = Histogram("chatcsv_upload_stage_duration_seconds", "Wall time per /upload stage.", ("stage",))
+CODE_FINDINGS = Counter(
+    "chatcsv_code_findings_total",
+    "Slow patterns found in generated code before execution, by pattern and action (rewritten/hinted/executed).",
+    ("pattern", "action"),
+)
+
+
+# ------------------------------------------------
+# 2. PER-CHAT TRACE
+# ------------------------------------------------
+
+class Trace:
+    """Timings of one chat: a span per node run plus LLM token usage per node."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: list[dict] = []
+        self.tokens: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, node: str, **fields) -> None:
+        with self._lock:
+            self.spans.append({"node": node, **fields})
+
+    def add_tokens(self, node: str, prompt: int, completion: int) -> None:
+        with self._lock:
+            usage = self.tokens.setdefault(node, {"prompt_tokens": 0, "completion_tokens": 0})
+            usage["prompt_tokens"] += prompt
+            usage["completion_tokens"] += completion
+
+    def summary(self, retries: int = 0) -> dict:
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.start, 4),
+                "code_attempts": retries,
+                "nodes": list(self.spans),
+                "tokens": dict(self.tokens),
+            }
+
+
+_current_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("chatcsv_trace", default=None)
+
+
+@contextlib.contextmanager
+def tracing(trace: Trace | None):
+    """Makes `trace` the current one for the block; asyncio.to_thread calls inherit it."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Collects prompt/completion tokens of every chat-model call in a graph run, by node."""
+
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._nodes: dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._nodes[run_id] = (metadata or {}).get("langgraph_node", "unknown")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        node = self._nodes.pop(run_id, "unknown")
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+        if not (prompt or completion):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+        LLM_TOKENS.inc(prompt, node=node, kind="prompt")
+        LLM_TOKENS.inc(completion, node=node, kind="completion")
+        self.trace.add_tokens(node, prompt, completion)
+
+
+# ------------------------------------------------
+# 3. INSTRUMENTATION HELPERS
+# ------------------------------------------------
+
+def instrument_node(name: str, fn):
+    """
+    Wraps a graph node so every run is timed into NODE_SECONDS and, when the run config
+    carries one ({"configurable": {"trace": ...}}), into that chat's trace. The trace is
+    also made current while the node runs, so code it calls (threads included) can add to it.
+    """
+
+    def record(start: float, state: dict, trace: Trace | None):
+        seconds = time.perf_counter() - start
+        NODE_SECONDS.observe(seconds, node=name)
+        if trace is not None:
+            # `retries` counts generated attempts; generation is about to produce the next one
+            fields = {}
+            if name in ("generate_code", "speculate"):
+                fields["attempt"] = state.get("retries", 0) + 1
+            elif name == "execute_code":
+                fields["attempt"] = state.get("retries", 0)
+            trace.add_span(name, seconds=round(seconds, 4), **fields)
+
+    def trace_of(config) -> Trace | None:
+        return ((config or {}).get("configurable") or {}).get("trace")
+
+    # LangGraph passes the run config to nodes that declare a `config` parameter
+    if inspect.iscoroutinefunction(fn):
+        async def timed_node(state, config):
+            trace, start = trace_of(config), time.perf_counter()
+            try:
+                with tracing(trace):
+                    return await fn(state)
+            finally:
+                record(start, state, trace)
+    else:
+        def timed_node(state, config):
+            trace, start = trace_of(config), time.perf_counter()
+            try:
+                with tracing(trace):
+                    return fn(state)
+            finally:
+                record(start, state, trace)
+
+    timed_node.__name__ = getattr(fn, "__name__", name)
+    return timed_node
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def record_execution(cpu_seconds: float, peak_rss: int, mode: str) -> None:
+    """Resource usage of one generated-code execution (histograms + the current trace)."""
+    EXEC_CPU_SECONDS.observe(cpu_seconds, mode=mode)
+    EXEC_PEAK_RSS.observe(peak_rss, mode=mode)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span("exec", mode=mode, cpu_seconds=round(cpu_seconds, 4), peak_rss_bytes=peak_rss)
+
+
+@contextlib.contextmanager
+def upload_stage(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        UPLOAD_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
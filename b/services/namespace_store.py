@@ -0,0 +1,218 @@
+import ast
+import sys
+import pickle
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config.settings import SESSION_NAMESPACE_MAX_BYTES, SESSION_NAMESPACE_TOTAL_BYTES
+
+# Names the execution environment provides itself, and the per-question result table; never saved
+RESERVED_NAMES = frozenset({"df", "pd", "result", "__builtins__"})
+
+_SCALARS = (int, float, complex, bool, str, bytes, type(None), np.generic,
+            datetime.date, datetime.datetime, datetime.timedelta, pd.Timestamp, pd.Timedelta)
+_CONTAINERS = (list, tuple, dict, set, frozenset)
+
+
+# ------------------------------------------------
+# 1. WHAT GETS SAVED
+# ------------------------------------------------
+
+def value_nbytes(value) -> int | None:
+    """Approximate memory of a saveable value, or None if it cannot be kept (e.g. not picklable)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes) if value.dtype != object else None
+    if isinstance(value, _SCALARS):
+        return sys.getsizeof(value)
+    if isinstance(value, _CONTAINERS):
+        # Arbitrary contents: the pickle both proves it can cross to a sandbox worker and sizes it
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return None
+    # Modules, functions, classes, open files, ChunkedFrames...
+    return None
+
+
+def _bound_names(code: str) -> tuple[set, set]:
+    """
+    (explicit, loop) names of `code`: those a top-level statement assigns, and those
+    bound by a loop (its target or anything assigned in its body).
+    """
+    explicit, loop = set(), set()
+
+    def targets(node) -> set:
+        return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+
+    def visit(statements, in_loop: bool):
+        for statement in statements:
+            if isinstance(statement, (ast.For, ast.AsyncFor, ast.While)):
+                loop.update(targets(statement))
+                continue
+            if isinstance(statement, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                (loop if in_loop else explicit).update(targets(statement))
+            # Top-level if/try/with blocks still count as top level
+            for field in ("body", "orelse", "finalbody"):
+                visit(getattr(statement, field, []), in_loop)
+            for handler in getattr(statement, "handlers", []):
+                visit(handler.body, in_loop)
+
+    try:
+        visit(ast.parse(code).body, False)
+    except SyntaxError:
+        pass
+    return explicit, loop
+
+
+def capture_names(local_env: dict, df, code: str) -> dict:
+    """
+    The variables from an execution worth keeping. Data the code named at top level
+    (frames, series, arrays, scalars, plain containers) is kept, and so is any other
+    frame, series or array it left behind. Loop variables and loop temporaries (`i`,
+    `row`, ...) are dropped unless also assigned at top level. The session frame itself
+    is skipped.
+    """
+    explicit, loop = _bound_names(code)
+    saved = {}
+    for name, value in local_env.items():
+        if name in RESERVED_NAMES or name.startswith("_") or value is df:
+            continue
+        if name not in explicit and (name in loop or not isinstance(value, (pd.DataFrame, pd.Series, np.ndarray))):
+            continue
+        if value_nbytes(value) is not None:
+            saved[name] = value
+    return saved
+
+
+def names_used(code: str, namespace: dict) -> dict:
+    """The saved variables `code` refers to (only these are handed to an execution)."""
+    if not namespace:
+        return {}
+    try:
+        referenced = {node.id for node in ast.walk(ast.parse(code)) if isinstance(node, ast.Name)}
+    except SyntaxError:
+        return {}
+    return {name: value for name, value in namespace.items() if name in referenced}
+
+
+def execution_names(namespace: dict) -> dict:
+    """
+    Saved variables as handed to generated code. pandas objects are shallow (copy-on-write)
+    copies, so code that modifies one in place does not change the saved value.
+    """
+    return {
+        name: value.copy(deep=False) if isinstance(value, (pd.DataFrame, pd.Series)) else value
+        for name, value in namespace.items()
+    }
+
+
+def describe_value(value) -> str:
+    if isinstance(value, pd.DataFrame):
+        columns = ", ".join(str(c) for c in value.columns[:12])
+        more = f", ... (+{len(value.columns) - 12})" if len(value.columns) > 12 else ""
+        return f"DataFrame {value.shape[0]} rows x {value.shape[1]} columns [{columns}{more}]"
+    if isinstance(value, pd.Series):
+        return f"Series '{value.name}' of {len(value)} values, dtype {value.dtype}"
+    if isinstance(value, np.ndarray):
+        return f"ndarray shape {value.shape}, dtype {value.dtype}"
+    if isinstance(value, _CONTAINERS):
+        return f"{type(value).__name__} of {len(value)} items"
+    text = repr(value)
+    return f"{type(value).__name__} = {text if len(text) <= 60 else text[:57] + '...'}"
+
+
+def describe_namespace(namespace: dict) -> str:
+    """One line per saved variable, for the code-generation prompt."""
+    return "\n".join(f"- `{name}`: {describe_value(value)}" for name, value in namespace.items())
+
+
+# ------------------------------------------------
+# 2. STORE (per process, LRU within and across sessions)
+# ------------------------------------------------
+
+class NamespaceStore:
+    """
+    Saved variables by session id. Each session is capped at `max_session_bytes` (its
+    least-recently-written variables go first); all sessions together at `max_total_bytes`
+    (least-recently-used sessions go first). A variable larger than the session cap is not kept.
+    """
+
+    def __init__(
+        self,
+        max_session_bytes: int = SESSION_NAMESPACE_MAX_BYTES,
+        max_total_bytes: int = SESSION_NAMESPACE_TOTAL_BYTES,
+    ):
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        # session_id -> OrderedDict[name -> (value, nbytes)]
+        self._sessions: "OrderedDict[str, OrderedDict]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.rejected = 0
+        self.evicted_variables = 0
+        self.evicted_sessions = 0
+
+    def get(self, session_id: str) -> dict:
+        with self._lock:
+            names = self._sessions.get(session_id)
+            if names is None:
+                return {}
+            self._sessions.move_to_end(session_id)
+            return {name: value for name, (value, _) in names.items()}
+
+    def update(self, session_id: str, values: dict) -> None:
+        """Saves (or replaces) variables of a session; blocking (sizes text columns deeply)."""
+        sized = {name: (value, value_nbytes(value)) for name, value in values.items()}
+        with self._lock:
+            names = self._sessions.setdefault(session_id, OrderedDict())
+            self._sessions.move_to_end(session_id)
+            for name, (value, nbytes) in sized.items():
+                if nbytes is None or (self.max_session_bytes and nbytes > self.max_session_bytes):
+                    self.rejected += 1
+                    continue
+                if name in names:
+                    self._total_bytes -= names.pop(name)[1]
+                names[name] = (value, nbytes)
+                self._total_bytes += nbytes
+                self.saved += 1
+
+            if self.max_session_bytes:
+                while sum(n for _, n in names.values()) > self.max_session_bytes:
+                    self._total_bytes -= names.popitem(last=False)[1][1]
+                    self.evicted_variables += 1
+            if not names:
+                del self._sessions[session_id]
+
+            while self.max_total_bytes and self._total_bytes > self.max_total_bytes and len(self._sessions) > 1:
+                _, dropped = self._sessions.popitem(last=False)
+                self._total_bytes -= sum(n for _, n in dropped.values())
+                self.evicted_sessions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            names = self._sessions.pop(session_id, None)
+            if names:
+                self._total_bytes -= sum(n for _, n in names.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "variables": sum(len(names) for names in self._sessions.values()),
+                "bytes": self._total_bytes,
+                "max_session_bytes": self.max_session_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "saved": self.saved,
+                "rejected": self.rejected,
+                "evicted_variables": self.evicted_variables,
+                "evicted_sessions": self.evicted_sessions,
+            }
@@ -0,0 +1,269 @@
+import os
+import re
+import shutil
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config.settings import OUT_OF_CORE_DIR, OUT_OF_CORE_CHUNK_ROWS, PROFILE_MARGIN_OF_ERROR, PROFILE_CONFIDENCE_Z
+from services.data_quality import ColumnProfile, DatasetProfile, profile_dataframe, statistical_sample_size
+from services.ingest import UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = "data.parquet"
+# CSV block parsed per step during conversion (also the type-inference window)
+CSV_BLOCK_SIZE = 64 * 1024 * 1024
+# Parquet row-group size: small enough that profiling can sample many parts of the file
+ROW_GROUP_ROWS = 64 * 1024
+# Row groups the profile sample is drawn from (evenly spaced; all of them if fewer)
+SAMPLE_ROW_GROUPS = 16
+
+
+def _to_pandas(data) -> pd.DataFrame:
+    # CSV dates arrive as Arrow date32; give code datetime64 columns like pandas would after parsing
+    return data.to_pandas(date_as_object=False)
+
+
+# ------------------------------------------------
+# 1. CHUNKED FRAME (what generated code sees as `df` for large sessions)
+# ------------------------------------------------
+
+class ChunkedFrame:
+    """
+    Read-only handle on a session stored on disk as Parquet. Stands in for the pandas
+    DataFrame in AgentState["df"] when the dataset is too large for memory: generated
+    code streams it with `iter_chunks()` and combines partial results.
+    Pickles as a path, so sessions and sandbox workers share it without copying data.
+    """
+
+    def __init__(self, path: str, chunk_rows: int = OUT_OF_CORE_CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+
+    @property
+    def file(self) -> str:
+        return os.path.join(self.path, DATA_FILE)
+
+    def _parquet(self) -> pq.ParquetFile:
+        return pq.ParquetFile(self.file, memory_map=True)
+
+    # -- DataFrame-like metadata -------------------------------------------
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self._parquet().schema_arrow.names)
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return _to_pandas(self._parquet().schema_arrow.empty_table()).dtypes
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        metadata = self._parquet().metadata
+        return metadata.num_rows, metadata.num_columns
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        rows, cols = self.shape
+        return f"<ChunkedFrame {rows} rows x {cols} columns (on disk, use df.iter_chunks())>"
+
+    # -- data access --------------------------------------------------------
+
+    def iter_chunks(self, columns: list | None = None, chunk_rows: int | None = None):
+        """Yields the dataset as pandas DataFrames of at most `chunk_rows` rows."""
+        columns = [str(c) for c in columns] if columns is not None else None
+        for batch in self._parquet().iter_batches(batch_size=chunk_rows or self.chunk_rows, columns=columns):
+            yield _to_pandas(batch)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        for batch in self._parquet().iter_batches(batch_size=max(n, 1)):
+            return _to_pandas(batch).head(n)
+        return _to_pandas(self._parquet().schema_arrow.empty_table())
+
+    def read(self, columns: list) -> pd.DataFrame:
+        """Loads only `columns` fully into memory (for a few narrow columns)."""
+        return _to_pandas(self._parquet().read(columns=[str(c) for c in columns]))
+
+    def nunique(self, column) -> int:
+        return pc.count_distinct(self._parquet().read(columns=[str(column)]).column(0)).as_py()
+
+    def copy(self, deep: bool = False) -> "ChunkedFrame":
+        # Read-only: an execution "copy" is the same handle
+        return self
+
+    def __getitem__(self, key):
+        raise TypeError(
+            "df is a chunked on-disk dataset, not a pandas DataFrame. "
+            "Use `for chunk in df.iter_chunks(columns=[...]):` and combine per-chunk results, "
+            "or df.read(columns=[...]) for a few columns."
+        )
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        raise AttributeError(
+            f"ChunkedFrame has no attribute '{name}'. df is a chunked on-disk dataset: "
+            "use df.iter_chunks(columns=[...]), df.read(columns=[...]), df.head(n), len(df), df.columns or df.dtypes."
+        )
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def open_session_frame(path: str):
+    """The frame a session path refers to: a chunked dataset directory or an Arrow file."""
+    if os.path.isdir(path):
+        return ChunkedFrame(path)
+    from services.session_store import read_frame
+    return read_frame(path)
+
+
+# ------------------------------------------------
+# 2. CSV -> PARQUET CONVERSION (streaming, bounded memory)
+# ------------------------------------------------
+
+_CONVERSION_ERROR = re.compile(r"In CSV column #(\d+): .*CSV conversion error to (\w+)")
+
+
+def convert_csv(
+    spool,
+    dataset_key: str,
+    header: int = 0,
+    max_rows: int | None = None,
+    progress=None,
+    root: str = OUT_OF_CORE_DIR,
+) -> ChunkedFrame:
+    """
+    Streams the spooled CSV into `<root>/<dataset_key>/data.parquet` one parsed block at
+    a time (in row groups of ROW_GROUP_ROWS), so memory stays around one block
+    regardless of the file size.
+    Column types are inferred from the first block; a column that later fails to
+    convert is widened (int -> float64, anything else -> string) and the file re-read.
+    A file with more than `max_rows` data rows raises UploadTooLarge.
+    """
+    path = os.path.join(root, dataset_key)
+    os.makedirs(path, exist_ok=True)
+    column_types: dict = {}
+
+    # On errors nothing but this call's temp file is removed: a concurrent conversion of
+    # the same upload (thread or worker) shares the directory and its data.parquet
+    while True:
+        spool.seek(0)
+        try:
+            rows = _write_parquet(spool, path, header, max_rows, column_types, progress)
+            break
+        except pa.ArrowInvalid as e:
+            match = _CONVERSION_ERROR.search(str(e))
+            if not match:
+                raise
+            index, failed_type = int(match.group(1)), match.group(2)
+            name = _column_names(spool, header)[index]
+            if column_types.get(name) == pa.string():
+                raise
+            column_types[name] = pa.float64() if failed_type.startswith(("int", "uint")) else pa.string()
+            logger.info(f"Out-of-core conversion: widening column '{name}' to {column_types[name]} and re-reading.")
+
+    logger.info(f"Converted CSV to {path} ({rows} rows).")
+    return ChunkedFrame(path)
+
+
+def _column_names(spool, header: int) -> list[str]:
+    spool.seek(0)
+    reader = pa_csv.open_csv(spool, read_options=pa_csv.ReadOptions(skip_rows=header, block_size=1 << 20))
+    return reader.schema.names
+
+
+def _write_parquet(spool, path: str, header: int, max_rows, column_types: dict, progress) -> int:
+    reader = pa_csv.open_csv(
+        spool,
+        read_options=pa_csv.ReadOptions(skip_rows=header, block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    # Unique per thread: identical concurrent uploads in one worker convert into the same directory
+    tmp_file = os.path.join(path, f"{DATA_FILE}.{os.getpid()}.{threading.get_ident()}.tmp")
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_file, reader.schema) as writer:
+            for batch in reader:
+                rows += batch.num_rows
+                if max_rows and rows > max_rows:
+                    raise UploadTooLarge(f"Upload exceeds the limit of {max_rows} rows.")
+                writer.write_batch(batch, row_group_size=ROW_GROUP_ROWS)
+                if progress:
+                    progress(spool.tell())
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except FileNotFoundError:
+            pass
+        raise
+    os.replace(tmp_file, os.path.join(path, DATA_FILE))
+    return rows
+
+
+# ------------------------------------------------
+# 3. PROFILE FROM PARQUET METADATA + A ROW SAMPLE
+# ------------------------------------------------
+
+def profile_chunked(frame: ChunkedFrame) -> tuple[DatasetProfile, pd.DataFrame]:
+    """
+    Builds the same DatasetProfile as profile_dataframe without loading the data:
+    row and null counts come from the Parquet row-group statistics, dtypes from the
+    schema, and numeric/datetime inference runs on random rows from row groups spread
+    across the file. Returns (profile, sample) — the sample also feeds the schema index.
+    """
+    parquet = frame._parquet()
+    metadata = parquet.metadata
+    n_rows = metadata.num_rows
+
+    null_counts = [0] * metadata.num_columns
+    for g in range(metadata.num_row_groups):
+        group = metadata.row_group(g)
+        for c in range(metadata.num_columns):
+            stats = group.column(c).statistics
+            if stats is not None and stats.has_null_count:
+                null_counts[c] += stats.null_count
+            else:
+                # No statistics for this chunk: count it
+                null_counts[c] += parquet.read_row_group(g, columns=[c]).column(0).null_count
+
+    # Evenly spaced row groups (at least SAMPLE_ROW_GROUPS, more if the sample size needs
+    # them), with the same number of random rows from each
+    wanted = statistical_sample_size(n_rows, PROFILE_MARGIN_OF_ERROR, PROFILE_CONFIDENCE_Z)
+    groups = metadata.num_row_groups
+    picks = []
+    if groups:
+        needed = min(groups, max(SAMPLE_ROW_GROUPS, -(-wanted // max(1, n_rows // groups))))
+        picks = sorted({int(i * groups / needed) for i in range(needed)})
+    per_group = -(-wanted // len(picks)) if picks else 0
+    tables = []
+    for g in picks:
+        table = parquet.read_row_group(g)
+        if table.num_rows > per_group:
+            rows = np.random.default_rng(g).choice(table.num_rows, per_group, replace=False)
+            table = table.take(np.sort(rows))
+        tables.append(table)
+    sample = _to_pandas(pa.concat_tables(tables) if tables else parquet.schema_arrow.empty_table())
+
+    # A sketch of the sample would not describe the file; out-of-core profiles have none
+    sampled = profile_dataframe(sample, exact=True, sketches=False)
+    profile = DatasetProfile(n_rows=n_rows, sample_size=len(sample))
+    for col, nulls in zip(sampled.columns, null_counts):
+        profile.columns.append(ColumnProfile(
+            name=col.name,
+            dtype=col.dtype,
+            null_count=int(nulls),
+            is_text=col.is_text,
+            numeric_ratio=col.numeric_ratio,
+            datetime_ratio=col.datetime_ratio,
+        ))
+    return profile, sample
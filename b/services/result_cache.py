@@ -0,0 +1,125 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config.settings import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+    CODE_CACHE_MAX_ENTRIES,
+    CODE_CACHE_TTL_SECONDS,
+)
+
+
+# ------------------------------------------------
+# 1. CACHE KEYS
+# ------------------------------------------------
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace/trailing-punctuation insensitive form of the user query."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" ?.!")
+
+
+def schema_fingerprint(df: pd.DataFrame, engine: str = "pandas") -> str:
+    """
+    Hash of column labels and dtypes: code that ran on one frame runs on any frame with it.
+    Code written for the chunked engine only runs there, so the engine is part of the key.
+    """
+    schema = "|".join(f"{col!r}:{dtype}" for col, dtype in df.dtypes.items())
+    if engine != "pandas":
+        schema = f"{engine}|{schema}"
+    return hashlib.sha256(schema.encode()).hexdigest()
+
+
+# ------------------------------------------------
+# 2. TTL + LRU CACHE
+# ------------------------------------------------
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if self.ttl_seconds and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ------------------------------------------------
+# 3. TWO-TIER RESULT CACHE
+# ------------------------------------------------
+
+class ResultCache:
+    """
+    Tier 1 (answers): (dataset fingerprint, normalized query) -> {"code", "answer", "table"}.
+        A hit skips the whole workflow ("table": the stored result table, if any).
+    Tier 2 (code):    (schema fingerprint, normalized query) -> generated code.
+        A hit skips code generation; the code is re-executed on the current data.
+    """
+
+    def __init__(self):
+        self.answers = TTLCache(ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS)
+        self.code = TTLCache(CODE_CACHE_MAX_ENTRIES, CODE_CACHE_TTL_SECONDS)
+
+    def get_answer(self, dataset_fp: str, query: str) -> dict | None:
+        return self.answers.get((dataset_fp, normalize_query(query)))
+
+    def get_code(self, schema_fp: str, query: str) -> str | None:
+        return self.code.get((schema_fp, normalize_query(query)))
+
+    def put(
+        self, dataset_fp: str, schema_fp: str, query: str, code: str, answer: str,
+        table: dict | None = None,
+    ) -> None:
+        normalized = normalize_query(query)
+        self.answers.put((dataset_fp, normalized), {"code": code, "answer": answer, "table": table})
+        self.code.put((schema_fp, normalized), code)
+
+    def stats(self) -> dict:
+        return {"answers": self.answers.stats(), "code": self.code.stats()}
@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from services.session_store import write_frame, COLUMNS_METADATA_KEY
+from config.settings import (
+    RESULT_TABLE_DIR,
+    RESULT_TABLE_TTL_SECONDS,
+    RESULT_TABLE_MAX_BYTES,
+    RESULT_PAGE_MAX_ROWS,
+    RESULT_SUMMARY_ROWS,
+    RESULT_SUMMARY_COLUMNS,
+    RESULT_TEXT_MAX_CHARS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Variable generated code assigns a table to
+RESULT_NAME = "result"
+
+_TABLE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class ResultTable:
+    """A table generated code returned: stored as Arrow, summarized for the answer step."""
+    id: str
+    rows: int
+    columns: list
+    summary: str
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "rows": self.rows, "columns": self.columns}
+
+
+# ------------------------------------------------
+# 1. FROM `result` TO A FLAT TABLE
+# ------------------------------------------------
+
+def _label(column) -> str:
+    # MultiIndex columns (pivot/agg) -> "sales sum"
+    if isinstance(column, tuple):
+        return " ".join(str(part) for part in column if str(part))
+    return str(column)
+
+
+def as_table(value) -> pd.DataFrame | None:
+    """
+    The DataFrame/Series `result` as a flat frame with string column labels, or None for
+    anything else. A meaningful index (named, non-integer or multi-level, e.g. groupby
+    keys) becomes leading columns; a plain row-number index is dropped.
+    """
+    if isinstance(value, pd.Series):
+        value = value.to_frame(name=value.name if value.name is not None else "value")
+    if not isinstance(value, pd.DataFrame):
+        return None
+    index = value.index
+    keep_index = (
+        index.nlevels > 1
+        or any(name is not None for name in index.names)
+        or not pd.api.types.is_integer_dtype(index.dtype)
+    )
+    table = value.reset_index(drop=not keep_index, allow_duplicates=True)
+    table.columns = [_label(c) for c in table.columns]
+    return table
+
+
+def summarize(table: pd.DataFrame, max_rows: int = RESULT_SUMMARY_ROWS, max_columns: int = RESULT_SUMMARY_COLUMNS) -> str:
+    """Bounded text for the answer step: shape, column types, first rows, numeric aggregates."""
+    n_rows, n_columns = table.shape
+    lines = [f"RESULT TABLE: {n_rows} rows x {n_columns} columns (the complete table is shown to the user below the answer)."]
+    dtypes = ", ".join(f"{c} ({dtype})" for c, dtype in list(table.dtypes.items())[:max_columns])
+    more = f", ... (+{n_columns - max_columns} more)" if n_columns > max_columns else ""
+    lines.append(f"Columns: {dtypes}{more}")
+
+    shown = table.iloc[:max_rows, :max_columns]
+    lines.append("All rows:" if n_rows <= max_rows else f"First {max_rows} rows:")
+    lines.append(shown.to_string(index=False, max_colwidth=40))
+
+    numeric = table.iloc[:, :max_columns].select_dtypes("number")
+    if n_rows > max_rows and not numeric.empty:
+        aggregates = numeric.agg(["sum", "mean", "min", "max"]).T
+        lines.append("Aggregates of the numeric columns over all rows:")
+        lines.append(aggregates.to_string(float_format=lambda x: f"{x:,.2f}"))
+    return bounded_text("\n".join(lines))
+
+
+def bounded_text(text: str, max_chars: int = RESULT_TEXT_MAX_CHARS) -> str:
+    """Cuts printed output that would flood the answer prompt."""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}\n... (output truncated: {len(text)} characters in total)"
+
+
+# ------------------------------------------------
+# 2. WRITING (thread or sandbox worker)
+# ------------------------------------------------
+
+def table_path(table_id: str, root: str = RESULT_TABLE_DIR) -> str | None:
+    # Ids come from clients; only our own hex names map to a file
+    if not _TABLE_ID.match(table_id):
+        return None
+    return os.path.join(root, f"{table_id}.arrow")
+
+
+def save_result(value, root: str = RESULT_TABLE_DIR) -> ResultTable | None:
+    """
+    Stores the `result` of an execution as an Arrow file and returns its ResultTable, or
+    None if it is not a table or has no rows (the printed output then stands alone).
+    """
+    table = as_table(value)
+    if table is None or table.empty:
+        return None
+    table_id = uuid.uuid4().hex
+    path = table_path(table_id, root)
+    try:
+        os.makedirs(root, exist_ok=True)
+        try:
+            write_frame(table, path)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed-type object columns have no Arrow type; keep them as text
+            table = table.astype({c: str for c in table.select_dtypes("object").columns})
+            write_frame(table, path)
+    except (pa.ArrowException, TypeError, ValueError, OSError) as e:
+        logger.warning(f"Could not store result table: {e.__class__.__name__}: {e}")
+        return None
+    return ResultTable(table_id, len(table), list(table.columns), summarize(table))
+
+
+def discard_result(table: ResultTable | None, root: str = RESULT_TABLE_DIR) -> None:
+    """Deletes a stored table that will never be served (e.g. a losing speculative candidate)."""
+    if table is None:
+        return
+    try:
+        os.remove(table_path(table.id, root))
+    except FileNotFoundError:
+        pass
+
+
+# ------------------------------------------------
+# 3. SERVING + EXPIRY (API process)
+# ------------------------------------------------
+
+class ResultTableStore:
+    """
+    Serves stored result tables page by page, straight from the memory-mapped file, so
+    any worker on the host can serve any table. Files older than `ttl_seconds` are
+    deleted, and the oldest go first while all of them exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        root: str = RESULT_TABLE_DIR,
+        ttl_seconds: float = RESULT_TABLE_TTL_SECONDS,
+        max_bytes: int = RESULT_TABLE_MAX_BYTES,
+        sweep_interval: float = 60,
+    ):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self.pages_served = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def exists(self, table_id: str) -> bool:
+        path = table_path(table_id, self.root)
+        return path is not None and os.path.exists(path)
+
+    def page(self, table_id: str, offset: int = 0, limit: int = 100) -> dict | None:
+        """Rows [offset, offset + limit) as JSON-ready lists, or None if the table is gone."""
+        path = table_path(table_id, self.root)
+        if path is None:
+            return None
+        limit = max(0, min(limit, RESULT_PAGE_MAX_ROWS))
+        offset = max(0, offset)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, pa.ArrowException):
+            return None
+        columns = json.loads(table.schema.metadata[COLUMNS_METADATA_KEY])
+        # Only the requested rows are converted (and read from disk)
+        rows = table.slice(offset, limit).to_pandas()
+        rows.columns = pd.Index(range(len(columns)))
+        with self._lock:
+            self.pages_served += 1
+        return {
+            "id": table_id,
+            "columns": columns,
+            "total_rows": table.num_rows,
+            "offset": offset,
+            "limit": limit,
+            "rows": json.loads(rows.to_json(orient="values", date_format="iso")),
+        }
+
+    def maybe_sweep(self) -> None:
+        """sweep(), at most once per `sweep_interval` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        self.sweep()
+
+    def sweep(self) -> None:
+        files = []
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    # Includes tables whose chat never finished, which nobody references
+                    if entry.name.endswith(".arrow") and entry.is_file():
+                        st = entry.stat()
+                        files.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            return
+        files.sort()
+        cutoff = time.time() - self.ttl_seconds
+        total = sum(size for _, size, _ in files)
+        expired = evicted = 0
+        for mtime, size, path in files:
+            if self.ttl_seconds and mtime < cutoff:
+                expired += 1
+            elif self.max_bytes and total > self.max_bytes:
+                evicted += 1
+            else:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self.expired += expired
+            self.evicted += evicted
+
+    def stats(self) -> dict:
+        try:
+            with os.scandir(self.root) as entries:
+                sizes = [e.stat().st_size for e in entries if e.name.endswith(".arrow")]
+        except FileNotFoundError:
+            sizes = []
+        with self._lock:
+            return {
+                "tables": len(sizes),
+                "bytes": sum(sizes),
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "pages_served": self.pages_served,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
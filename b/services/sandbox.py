@@ -0,0 +1,317 @@
+import io
+import os
+import sys
+import queue
+import signal
+import logging
+import resource
+import threading
+import contextlib
+import multiprocessing
+from collections import OrderedDict
+
+import pandas as pd
+
+from services.metrics import record_execution
+from services.namespace_store import capture_names
+from services.result_tables import save_result, ResultTable, RESULT_NAME
+from services.code_analysis import compile_cached
+from config.settings import (
+    SANDBOX_WORKERS,
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_WALL_SECONDS,
+    SANDBOX_MEMORY_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+# pandas >= 3 always uses copy-on-write; 2.x needs the opt-in. With it, a shallow
+# copy of the session frame is a cheap view that only materializes the columns the
+# generated code actually modifies.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+def execution_view(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy-on-write view of the session frame for generated code (no data is copied up front)."""
+    return df.copy(deep=False)
+
+# ------------------------------------------------
+# 1. RUNNING GENERATED CODE
+# ------------------------------------------------
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """
+    sys.stdout proxy that routes writes to the calling thread's capture buffer.
+    contextlib.redirect_stdout swaps the process-global sys.stdout, so two executions
+    running in executor threads would interleave their output; this keeps them apart.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, "buffer", None) or self._default
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def writable(self):
+        return True
+
+    @contextlib.contextmanager
+    def capture(self, buffer):
+        previous = getattr(self._local, "buffer", None)
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = previous
+
+_stdout_lock = threading.Lock()
+
+def _capture_stdout(buffer):
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStdout):
+            sys.stdout = _ThreadLocalStdout(sys.stdout)
+    return sys.stdout.capture(buffer)
+
+def run_code_in_namespace(
+    code: str, df: pd.DataFrame, namespace: dict | None
+) -> tuple[str, str, dict, ResultTable | None]:
+    """
+    Executes generated code with `df`, `pd` and the saved session variables (`namespace`)
+    in scope. Returns (stdout, error, saved, table): `error` is "" on success, otherwise
+    "ExceptionName: message"; on success `saved` holds the data variables the code
+    defined or rebound, to keep for follow-up questions (see namespace_store), and
+    `table` the frame it assigned to `result`, stored for paging (see result_tables).
+    """
+    namespace = namespace or {}
+    # Use local_env for security and context
+    local_env = {**namespace, 'df': df, 'pd': pd}
+    temp_stdout = io.StringIO()
+    try:
+        with _capture_stdout(temp_stdout):
+            # Pass local_env as both global and local scope for simplicity in agent code
+            exec(compile_cached(code), {"__builtins__": __builtins__, "pd": pd}, local_env)
+    except Exception as e:
+        return "", f"{e.__class__.__name__}: {str(e)}", {}, None
+    saved = {
+        name: value for name, value in capture_names(local_env, df, code).items()
+        if value is not namespace.get(name)
+    }
+    return temp_stdout.getvalue().strip(), "", saved, save_result(local_env.get(RESULT_NAME))
+
+
+# ------------------------------------------------
+# 2. WORKER PROCESS
+# ------------------------------------------------
+
+class CpuTimeExceeded(BaseException):
+    # BaseException so `except Exception` in generated code cannot swallow it
+    pass
+
+def _on_sigxcpu(signum, frame):
+    raise CpuTimeExceeded()
+
+def _worker_main(conn, memory_bytes: int) -> None:
+    # Imported here so the parent does not pay for it; the worker only needs the reader.
+    from services.out_of_core import open_session_frame
+
+    if memory_bytes:
+        # RLIMIT_DATA covers heap/anonymous memory but not the memory-mapped dataset file
+        _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+        resource.setrlimit(resource.RLIMIT_DATA, (memory_bytes, hard))
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+
+    # Memory-mapped frames by file path (a few recent sessions)
+    frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+    conn.send("ready")
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        code, dataset_path, cpu_seconds, namespace = message
+
+        output, error, saved, table = "", "", {}, None
+        _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+        before = resource.getrusage(resource.RUSAGE_SELF)
+        try:
+            df = frames.get(dataset_path)
+            if df is None:
+                df = open_session_frame(dataset_path)
+                frames[dataset_path] = df
+                while len(frames) > 4:
+                    frames.popitem(last=False)
+            frames.move_to_end(dataset_path)
+
+            # RLIMIT_CPU is cumulative for the process, so the budget is relative to usage so far
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(used.ru_utime + used.ru_stime) + cpu_seconds
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard))
+
+            output, error, saved, table = run_code_in_namespace(code, execution_view(df), namespace)
+        except CpuTimeExceeded:
+            error = f"TimeoutError: Execution exceeded the CPU time limit of {cpu_seconds}s."
+        except MemoryError:
+            error = f"MemoryError: Execution exceeded the memory limit of {memory_bytes // (1024 * 1024)} MB."
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {str(e)}"
+        finally:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        usage = {
+            "cpu_seconds": (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime),
+            "peak_rss_bytes": after.ru_maxrss * 1024,
+        }
+        try:
+            conn.send((output, error, usage, saved, table))
+        except Exception:
+            # A saved variable that does not pickle; the result itself still counts
+            conn.send((output, error, usage, {}, table))
+
+
+# ------------------------------------------------
+# 3. POOL (per-call CPU / wall / memory limits)
+# ------------------------------------------------
+
+class _Worker:
+    def __init__(self, ctx, memory_bytes: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float = 120) -> None:
+        # Spawned workers import pandas/pyarrow first; that must not count against a call's wall time
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                raise OSError("Sandbox worker failed to start.")
+            self.conn.recv()
+            self.ready = True
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pool of worker processes that execute generated code against a session's Arrow file.
+
+    The frame is shared through the memory-mapped file written by the session store, so
+    nothing is pickled per call. Each call gets a CPU time budget (RLIMIT_CPU), a memory
+    cap (RLIMIT_DATA, per worker) and a wall-clock timeout; a worker that hits the wall
+    timeout or dies is killed and replaced, so runaway code cannot freeze the API.
+    """
+
+    def __init__(
+        self,
+        size: int = SANDBOX_WORKERS,
+        cpu_seconds: int = SANDBOX_CPU_SECONDS,
+        wall_seconds: float = SANDBOX_WALL_SECONDS,
+        memory_bytes: int = SANDBOX_MEMORY_BYTES,
+    ):
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = memory_bytes
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = [self._spawn() for _ in range(size)]
+        for worker in self._workers:
+            self._idle.put(worker)
+
+        # Updated from every request thread that runs code
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.memory_bytes)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        fresh = self._spawn()
+        self._workers[self._workers.index(worker)] = fresh
+        return fresh
+
+    def run_in_namespace(
+        self, code: str, dataset_path: str, namespace: dict | None
+    ) -> tuple[str, str, dict, ResultTable | None]:
+        """Blocking call: returns (stdout, error, saved, table) like run_code_in_namespace()."""
+        worker = self._idle.get()
+        with self._stats_lock:
+            self.calls += 1
+        try:
+            worker.wait_ready()
+            worker.conn.send((code, dataset_path, self.cpu_seconds, namespace))
+            if not worker.conn.poll(self.wall_seconds):
+                with self._stats_lock:
+                    self.timeouts += 1
+                worker = self._replace(worker)
+                return "", f"TimeoutError: Execution exceeded the wall time limit of {self.wall_seconds}s.", {}, None
+            output, error, usage, saved, table = worker.conn.recv()
+            record_execution(usage["cpu_seconds"], usage["peak_rss_bytes"], mode="process")
+            return output, error, saved, table
+        except (EOFError, OSError, BrokenPipeError):
+            # The worker died (e.g. killed by the OS); replace it and report the failure
+            with self._stats_lock:
+                self.crashes += 1
+            worker = self._replace(worker)
+            return "", "RuntimeError: The execution sandbox crashed while running the code.", {}, None
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.stop()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": len(self._workers),
+                "idle_workers": self._idle.qsize(),
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+            }
+
+
+_pool: SandboxPool | None = None
+_pool_lock = threading.Lock()
+
+def get_sandbox_pool() -> SandboxPool:
+    """Process-wide pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+            logger.info(f"Started sandbox pool with {len(_pool._workers)} workers (pid {os.getpid()}).")
+        return _pool
+
+def shutdown_sandbox_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
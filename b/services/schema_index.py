@@ -0,0 +1,213 @@
+import re
+import threading
+from dataclasses import dataclass, field, replace
+
+import pandas as pd
+
+from config.settings import SCHEMA_TOKEN_BUDGET
+from services.data_quality import ColumnProfile, DatasetProfile
+
+# Rows sampled at upload for example values and cardinality estimates
+SCHEMA_SAMPLE_ROWS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/code)."""
+    return len(text) // 4 + 1
+
+
+def _tokens(text) -> list[str]:
+    # "totalRevenue_2023" -> ["total", "revenue", "2023"]
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return [w for w in re.split(r"[^0-9a-zA-Z]+", text.lower()) if w]
+
+
+def _words(text) -> set[str]:
+    return set(_tokens(text))
+
+
+def _contains_phrase(tokens: list[str], phrase: tuple[str, ...]) -> bool:
+    """Whether `phrase` occurs in `tokens` as consecutive whole tokens."""
+    n = len(phrase)
+    return bool(n) and any(tuple(tokens[i:i + n]) == phrase for i in range(len(tokens) - n + 1))
+
+
+# ------------------------------------------------
+# 1. PER-COLUMN SCHEMA ENTRIES
+# ------------------------------------------------
+
+def _notes(col: ColumnProfile) -> list[str]:
+    notes = []
+    if col.looks_numeric:
+        notes.append("text that looks numeric")
+    if col.looks_datetime:
+        notes.append("looks like datetime")
+    return notes
+
+
+@dataclass
+class ColumnEntry:
+    name: object
+    dtype: str
+    non_null: int
+    distinct_in_sample: int
+    sample_rows: int
+    examples: list[str] = field(default_factory=list)
+    notes: list[str] = field(default_factory=list)
+    # Over all rows, from the profile's distinct-value sketch (None: sample only)
+    distinct_estimate: int | None = None
+
+    def render(self) -> str:
+        if self.distinct_estimate is not None:
+            cardinality = f"~{self.distinct_estimate} distinct"
+        elif self.sample_rows and self.distinct_in_sample >= self.sample_rows // 2:
+            cardinality = "high cardinality"
+        else:
+            cardinality = f"~{self.distinct_in_sample} distinct"
+        line = f"- `{self.name}` ({self.dtype}, {self.non_null} non-null, {cardinality})"
+        if self.examples:
+            line += " e.g. " + ", ".join(repr(e) for e in self.examples)
+        if self.notes:
+            line += " — " + "; ".join(self.notes)
+        return line
+
+
+# ------------------------------------------------
+# 2. SCHEMA INDEX (built at upload, queried per chat)
+# ------------------------------------------------
+
+class SchemaIndex:
+    """
+    Compact, searchable description of every column. For datasets whose full context
+    exceeds the token budget, `context_for(query)` renders only the columns relevant to
+    the query (by name and example-value overlap) plus a list of the remaining names.
+    """
+
+    def __init__(self, profile: DatasetProfile, entries: list[ColumnEntry]):
+        self.profile = profile
+        self.entries = entries
+        self._phrases = [tuple(_tokens(e.name)) for e in entries]
+        self._names = [set(phrase) for phrase in self._phrases]
+        self._values = [set().union(*(_words(v) for v in e.examples)) if e.examples else set() for e in entries]
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, profile: DatasetProfile) -> "SchemaIndex":
+        sample = df.sample(n=min(len(df), SCHEMA_SAMPLE_ROWS), random_state=0) if len(df) else df
+        entries = []
+        for i, col in enumerate(profile.columns):
+            values = sample.iloc[:, i].dropna()
+            counts = values.astype(str).value_counts()
+            entries.append(ColumnEntry(
+                name=col.name,
+                dtype=col.dtype,
+                non_null=profile.n_rows - col.null_count,
+                distinct_in_sample=len(counts),
+                sample_rows=len(sample),
+                examples=[v[:30] for v in counts.index[:3]],
+                notes=_notes(col),
+                distinct_estimate=col.distinct_estimate,
+            ))
+        return cls(profile, entries)
+
+    def updated(self, profile: DatasetProfile) -> "SchemaIndex":
+        """
+        The index for `profile` after rows were appended: counts, notes and cardinality
+        come from the new profile; the sampled example values are kept.
+        """
+        entries = [
+            replace(
+                entry,
+                non_null=profile.n_rows - col.null_count,
+                notes=_notes(col),
+                distinct_estimate=col.distinct_estimate,
+            )
+            for entry, col in zip(self.entries, profile.columns)
+        ]
+        return SchemaIndex(profile, entries)
+
+    def rank(self, query: str) -> list[int]:
+        """Column positions ordered by relevance to the query (ties keep file order)."""
+        query_tokens = _tokens(query)
+        query_words = set(query_tokens)
+        scores = []
+        for i in range(len(self.entries)):
+            score = 0.0
+            # Whole tokens only: a short name like `a` or `id` must not match inside other words
+            if _contains_phrase(query_tokens, self._phrases[i]):
+                score += 10
+            score += 3 * len(self._names[i] & query_words)
+            score += len(self._values[i] & query_words)
+            scores.append((-score, i))
+        return [i for score, i in sorted(scores) if score < 0]
+
+    def render_compact(self, query: str, token_budget: int = SCHEMA_TOKEN_BUDGET) -> str:
+        header = (
+            f"\n### 📊 Dataset Summary\n"
+            f"The entire DataFrame 'df' contains **{self.profile.n_rows} rows** and "
+            f"**{self.profile.n_cols} columns**. Only the columns most relevant to the question "
+            f"are described below; other column names are listed at the end.\n\n"
+            f"### 🚩 Relevant Columns\n"
+        )
+        budget = token_budget - estimate_tokens(header)
+
+        lines, chosen = [], set()
+        for i in self.rank(query):
+            line = self.entries[i].render()
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            lines.append(line)
+            chosen.add(i)
+            budget -= cost
+
+        others, truncated = [], 0
+        for i, entry in enumerate(self.entries):
+            if i in chosen:
+                continue
+            name = f"`{entry.name}`"
+            cost = estimate_tokens(name) + 1
+            if cost > budget:
+                truncated += 1
+                continue
+            others.append(name)
+            budget -= cost
+
+        text = header + ("\n".join(lines) or "(no column names match the question)")
+        if others or truncated:
+            text += "\n\n### 📋 Other Columns\n" + ", ".join(others)
+            if truncated:
+                text += f", ... ({truncated} more)"
+        return text + "\n"
+
+    def context_for(self, query: str, full_context: str, token_budget: int = SCHEMA_TOKEN_BUDGET) -> str:
+        """The full context when it fits the budget, otherwise the query-specific compact one."""
+        full_tokens = estimate_tokens(full_context)
+        if not token_budget or full_tokens <= token_budget:
+            return full_context
+        compact = self.render_compact(query, token_budget)
+        _record_saving(full_tokens - estimate_tokens(compact))
+        return compact
+
+
+# ------------------------------------------------
+# 3. METRICS
+# ------------------------------------------------
+
+_metrics_lock = threading.Lock()
+_compact_contexts = 0
+_prompt_tokens_saved = 0
+
+def _record_saving(tokens: int) -> None:
+    global _compact_contexts, _prompt_tokens_saved
+    with _metrics_lock:
+        _compact_contexts += 1
+        _prompt_tokens_saved += max(tokens, 0)
+
+def schema_index_stats() -> dict:
+    with _metrics_lock:
+        return {
+            "compact_contexts": _compact_contexts,
+            # Per chat; each code-generation attempt of that chat saves this much again
+            "prompt_tokens_saved": _prompt_tokens_saved,
+            "token_budget": SCHEMA_TOKEN_BUDGET,
+        }
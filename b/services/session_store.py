@@ -0,0 +1,787 @@
+import os
+import json
+import time
+import fcntl
+import contextlib
+import shutil
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+import pyarrow.feather as feather
+
+from services.out_of_core import ChunkedFrame
+from config.settings import (
+    INGEST_JOB_TTL_SECONDS,
+    SESSION_BACKEND,
+    SESSION_DIR,
+    SESSION_LOCAL_CACHE_ENTRIES,
+    SESSION_MEMORY_BUDGET_BYTES,
+    SESSION_SPILL_DIR,
+    SESSION_SWEEP_SECONDS,
+    SESSION_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Deep memory usage of a DataFrame (object/string payloads included)."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def combine_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    The frames' rows in order, as one frame with a fresh RangeIndex (parts of a session
+    with appended rows, see ingest.conform_rows). Categorical columns keep the category
+    dtype with the union of the parts' categories, where concat would fall back to text.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    for i, dtype in enumerate(frames[0].dtypes):
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(combined.dtypes.iloc[i], pd.CategoricalDtype):
+            combined.isetitem(i, union_categoricals([frame.iloc[:, i] for frame in frames]))
+    return combined
+
+
+# ------------------------------------------------
+# 1. COLUMNAR SPILL FORMAT (Arrow IPC / Feather v2)
+# ------------------------------------------------
+
+COLUMNS_METADATA_KEY = b"chatcsv.columns"
+
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    """
+    Writes the frame as an uncompressed Arrow IPC file so it can be memory-mapped back.
+    Arrow requires string field names, so columns are stored positionally and the
+    original labels (str or int, as parsed from the CSV) go in the schema metadata.
+    """
+    positional = df.reset_index(drop=True).set_axis([str(i) for i in range(df.shape[1])], axis=1)
+    table = pa.Table.from_pandas(positional, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), COLUMNS_METADATA_KEY: json.dumps(list(df.columns)).encode()}
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Memory-maps the Arrow file and restores the original column labels."""
+    table = feather.read_table(path, memory_map=True)
+    columns = json.loads(table.schema.metadata[COLUMNS_METADATA_KEY])
+    df = table.to_pandas(split_blocks=True)
+    df.columns = pd.Index(columns)
+    return df
+
+
+# ------------------------------------------------
+# 2. BACKEND INTERFACE
+# ------------------------------------------------
+
+class SessionBackend:
+    """
+    Where sessions live. Parsed data is stored once per *dataset* (keyed by the upload's
+    content hash, see ingest.dataset_key) and sessions reference it: a repeat upload of
+    the same file attaches a new session to the existing dataset (reference counted)
+    instead of re-parsing and storing another copy.
+
+    A dataset entry is a dict: {"df", "context", "dqr", ...}. All methods are blocking
+    (they may touch disk); call them off the event loop.
+
+    Sessions not used (stored, attached or read with get) for `ttl_seconds` expire:
+    maybe_sweep() deletes them, which drops their dataset with its last session.
+    """
+
+    ttl_seconds: float = 0
+    sweep_interval: float = 0
+    _last_sweep: float = 0.0
+
+    def put(self, session_id: str, dataset_key: str, dataset: dict) -> None:
+        """Stores a freshly parsed dataset and attaches `session_id` to it."""
+        raise NotImplementedError
+
+    def attach(self, session_id: str, dataset_key: str) -> dict | None:
+        """Attaches `session_id` to an existing dataset; None if the key is unknown."""
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def peek(self, session_id: str) -> dict | None:
+        """
+        The session's dataset entry without (re)loading its frame: "df" may be None or
+        lack appended rows. For reading the profile and other metadata.
+        """
+        raise NotImplementedError
+
+    def append(self, session_id: str, dataset_key: str, new_key: str, rows: pd.DataFrame, updates: dict) -> bool:
+        """
+        Stores the session's dataset plus `rows` (already conformed to its dtypes) under
+        `new_key`, with `updates` (profile, context, ...) replacing those entries, and
+        moves the session there. Other sessions keep the dataset they had. The cost is
+        proportional to `rows`: the parts are only combined when the frame is next read.
+        Returns False if the session is no longer on `dataset_key` (a concurrent append).
+        """
+        raise NotImplementedError
+
+    def dataset_path(self, session_id: str) -> str | None:
+        """
+        Arrow file holding the session frame (or the Parquet directory of an out-of-core
+        session), for memory-mapping from other processes; see out_of_core.open_session_frame.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """Detaches the session; the dataset is dropped with its last session."""
+        raise NotImplementedError
+
+    def set_ingest_status(self, session_id: str, status: dict) -> None:
+        """
+        Publishes the status of a background upload (see ingest_jobs) to the other
+        workers. Backends used by a single worker need not keep it.
+        """
+
+    def ingest_status(self, session_id: str) -> dict | None:
+        """The status last published for the session's background upload, if any."""
+        return None
+
+    def sweep(self) -> list[str]:
+        """Deletes the sessions idle for longer than `ttl_seconds`; returns their ids."""
+        raise NotImplementedError
+
+    def maybe_sweep(self) -> list[str]:
+        """sweep(), at most once per `sweep_interval` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if not self.ttl_seconds or now - self._last_sweep < self.sweep_interval:
+                return []
+            self._last_sweep = now
+        return self.sweep()
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+# ------------------------------------------------
+# 3. IN-PROCESS BACKEND (byte budget + LRU spill)
+# ------------------------------------------------
+
+class InMemorySessionBackend(SessionBackend):
+    """
+    Keeps datasets in memory under a byte budget (single worker only).
+
+    When the resident DataFrames exceed `budget_bytes`, the least-recently-used datasets
+    are written to SESSION_SPILL_DIR in Arrow format and their frame is dropped from RAM.
+    The next `get()` reloads it lazily (memory-mapped) and marks it most-recently-used.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int = SESSION_MEMORY_BUDGET_BYTES,
+        spill_dir: str = SESSION_SPILL_DIR,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        sweep_interval: float = SESSION_SWEEP_SECONDS,
+    ):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        os.makedirs(spill_dir, exist_ok=True)
+
+        self._datasets: "OrderedDict[str, dict]" = OrderedDict()
+        self._sessions: dict[str, str] = {}  # session_id -> dataset_key
+        self._last_used: dict[str, float] = {}  # session_id -> time.time()
+        self._lock = threading.RLock()
+        self._resident_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.dedup_hits = 0
+        self.appends = 0
+        self.expired = 0
+        self.spills = 0
+        self.reloads = 0
+        self.reload_seconds_total = 0.0
+        self.reload_seconds_max = 0.0
+
+    # -- public API --------------------------------------------------------
+
+    def put(self, session_id: str, dataset_key: str, dataset: dict) -> None:
+        with self._lock:
+            if dataset_key not in self._datasets:
+                df = dataset["df"]
+                chunked = isinstance(df, ChunkedFrame)
+                entry = {
+                    **dataset,
+                    # Out-of-core sessions hold no data in memory and already live on disk
+                    "nbytes": 0 if chunked else frame_nbytes(df),
+                    "spill_path": df.path if chunked else None,
+                    "refs": 0,
+                }
+                self._datasets[dataset_key] = entry
+                self._resident_bytes += entry["nbytes"]
+            self._attach(session_id, dataset_key)
+            self._enforce_budget(keep=dataset_key)
+
+    def attach(self, session_id: str, dataset_key: str) -> dict | None:
+        with self._lock:
+            if dataset_key not in self._datasets:
+                return None
+            self.dedup_hits += 1
+            self._attach(session_id, dataset_key)
+            return self._datasets[dataset_key]
+
+    def get(self, session_id: str) -> dict | None:
+        with self._lock:
+            dataset_key = self._sessions.get(session_id)
+            if dataset_key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._last_used[session_id] = time.time()
+            entry = self._datasets[dataset_key]
+            self._datasets.move_to_end(dataset_key)
+            if entry["df"] is None:
+                self._reload(dataset_key, entry)
+            self._combine(entry)
+            return entry
+
+    def peek(self, session_id: str) -> dict | None:
+        with self._lock:
+            dataset_key = self._sessions.get(session_id)
+            return self._datasets[dataset_key] if dataset_key is not None else None
+
+    def append(self, session_id: str, dataset_key: str, new_key: str, rows: pd.DataFrame, updates: dict) -> bool:
+        with self._lock:
+            if self._sessions.get(session_id) != dataset_key:
+                return False
+            if new_key not in self._datasets:
+                old = self._datasets[dataset_key]
+                if old["df"] is None:
+                    # Memory-mapped, so this does not read the spilled frame
+                    self._reload(dataset_key, old)
+                added = frame_nbytes(rows)
+                # The old frame is shared, not copied (the rows wait in "pending"), so its
+                # bytes are charged once: moved here if this session was its only user,
+                # otherwise left on the old entry until the parts are combined
+                owned = old["nbytes"] if old["refs"] == 1 else 0
+                entry = {
+                    **old,
+                    **updates,
+                    "pending": [*old.get("pending", []), rows],
+                    "nbytes": owned + added,
+                    "borrowed_nbytes": old.get("borrowed_nbytes", 0) + old["nbytes"] - owned,
+                    "spill_path": None,
+                    "refs": 0,
+                }
+                old["nbytes"] -= owned
+                self._datasets[new_key] = entry
+                self._resident_bytes += added
+            self.appends += 1
+            self._attach(session_id, new_key)
+            self._enforce_budget(keep=new_key)
+            return True
+
+    def dataset_path(self, session_id: str) -> str | None:
+        """
+        Path of the dataset's Arrow file, writing it on first request. Worker processes
+        memory-map this file instead of receiving a pickled copy of the frame.
+        """
+        with self._lock:
+            dataset_key = self._sessions.get(session_id)
+            if dataset_key is None:
+                return None
+            entry = self._datasets[dataset_key]
+            if entry["spill_path"]:
+                return entry["spill_path"]
+            self._combine(entry)
+            df = entry["df"]
+
+        path = self._path_for(dataset_key)
+        write_frame(df, path)
+        with self._lock:
+            entry["spill_path"] = path
+        return path
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            dataset_key = self._sessions.pop(session_id, None)
+            self._last_used.pop(session_id, None)
+            if dataset_key is None:
+                return
+            entry = self._datasets[dataset_key]
+            entry["refs"] -= 1
+            if entry["refs"] <= 0:
+                self._drop(dataset_key)
+
+    def sweep(self) -> list[str]:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [s for s, used in self._last_used.items() if used < cutoff]
+            for session_id in expired:
+                self.delete(session_id)
+            self.expired += len(expired)
+        return expired
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = sum(1 for e in self._datasets.values() if e["df"] is not None)
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "datasets": len(self._datasets),
+                "resident_datasets": resident,
+                "spilled_datasets": len(self._datasets) - resident,
+                "resident_bytes": self._resident_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "dedup_hits": self.dedup_hits,
+                "appends": self.appends,
+                "expired": self.expired,
+                "spills": self.spills,
+                "reloads": self.reloads,
+                "reload_seconds_avg": (self.reload_seconds_total / self.reloads) if self.reloads else 0.0,
+                "reload_seconds_max": self.reload_seconds_max,
+            }
+
+    # -- internals ---------------------------------------------------------
+
+    def _attach(self, session_id: str, dataset_key: str) -> None:
+        if session_id in self._sessions:
+            self.delete(session_id)
+        self._sessions[session_id] = dataset_key
+        self._last_used[session_id] = time.time()
+        self._datasets[dataset_key]["refs"] += 1
+        self._datasets.move_to_end(dataset_key)
+
+    def _path_for(self, dataset_key: str) -> str:
+        return os.path.join(self.spill_dir, f"{dataset_key}.arrow")
+
+    def _enforce_budget(self, keep: str | None = None) -> None:
+        if not self.budget_bytes:
+            return
+        for dataset_key in list(self._datasets):
+            if self._resident_bytes <= self.budget_bytes:
+                break
+            entry = self._datasets[dataset_key]
+            if dataset_key == keep or entry["df"] is None or not entry["nbytes"]:
+                continue
+            self._spill(dataset_key, entry)
+
+    def _combine(self, entry: dict) -> None:
+        # Appended rows are concatenated on the first read after the append, not per append
+        if entry.get("pending"):
+            entry["df"] = combine_frames([entry["df"], *entry["pending"]])
+            entry["pending"] = []
+            # The combined frame is a copy: the borrowed rows are now this entry's own
+            self._resident_bytes += entry["borrowed_nbytes"]
+            entry["nbytes"] += entry["borrowed_nbytes"]
+            entry["borrowed_nbytes"] = 0
+
+    def _spill(self, dataset_key: str, entry: dict) -> None:
+        path = entry["spill_path"] or self._path_for(dataset_key)
+        if not entry["spill_path"]:
+            # The frame never changes after upload (appends make a new dataset), so it only has to be written once.
+            self._combine(entry)
+            write_frame(entry["df"], path)
+            entry["spill_path"] = path
+        entry["df"] = None
+        self._resident_bytes -= entry["nbytes"]
+        self.spills += 1
+        logger.info(f"Spilled dataset {dataset_key[:12]} ({entry['nbytes']} bytes) to {path}")
+
+    def _reload(self, dataset_key: str, entry: dict) -> None:
+        start = time.perf_counter()
+        entry["df"] = read_frame(entry["spill_path"])
+        elapsed = time.perf_counter() - start
+
+        self.reloads += 1
+        self.reload_seconds_total += elapsed
+        self.reload_seconds_max = max(self.reload_seconds_max, elapsed)
+        self._resident_bytes += entry["nbytes"]
+        logger.info(f"Reloaded dataset {dataset_key[:12]} from disk in {elapsed:.3f}s")
+        self._enforce_budget(keep=dataset_key)
+
+    def _drop(self, dataset_key: str) -> None:
+        entry = self._datasets.pop(dataset_key)
+        if isinstance(entry["df"], ChunkedFrame):
+            entry["df"].remove()
+            return
+        if entry["df"] is not None:
+            self._resident_bytes -= entry["nbytes"]
+        if entry["spill_path"]:
+            try:
+                os.remove(entry["spill_path"])
+            except OSError:
+                pass
+
+
+# ------------------------------------------------
+# 4. SHARED LOCAL-FILESYSTEM BACKEND (multi-worker)
+# ------------------------------------------------
+
+class FileSystemSessionBackend(SessionBackend):
+    """
+    Sessions shared by every uvicorn worker on the host through a local directory:
+
+        <root>/datasets/<key>/frame.arrow      the DataFrame, stored once (Arrow IPC, memory-mapped)
+        <root>/datasets/<key>/part-*.arrow     after an append: the previous frame (hard-linked)
+                                               and the new rows; frame.arrow is combined from
+                                               them on first load
+        <root>/datasets/<key>/meta.pkl         everything else (context, DQR, profile, indexes)
+        <root>/datasets/<key>/refs/<session>   one file per attached session (the refcount)
+        <root>/sessions/<session>              the dataset key of the session (mtime: last use)
+        <root>/ingest/<session>.json           status of a background upload, for the workers
+                                               that did not take it
+        <root>/locks/<xx>.lock                 flock serializing attach/detach of the datasets
+                                               whose key starts with <xx>
+
+    Any worker can serve any session: frames are memory-mapped, so the OS page cache
+    shares their pages between workers instead of each holding a private copy.
+    Each worker keeps a small LRU of opened datasets to skip re-reading the metadata.
+    The metadata is pickled, so the directory must only be writable by this service.
+    """
+
+    FRAME_FILE = "frame.arrow"
+    META_FILE = "meta.pkl"
+
+    def __init__(
+        self,
+        root: str = SESSION_DIR,
+        cache_entries: int = SESSION_LOCAL_CACHE_ENTRIES,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        sweep_interval: float = SESSION_SWEEP_SECONDS,
+    ):
+        self.root = root
+        self.cache_entries = cache_entries
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        os.makedirs(os.path.join(root, "datasets"), exist_ok=True)
+        os.makedirs(os.path.join(root, "sessions"), exist_ok=True)
+        os.makedirs(os.path.join(root, "locks"), exist_ok=True)
+        os.makedirs(os.path.join(root, "ingest"), exist_ok=True)
+
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()  # dataset_key -> entry
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.dedup_hits = 0
+        self.appends = 0
+        self.expired = 0
+        self.loads = 0
+        self.load_seconds_total = 0.0
+        self.load_seconds_max = 0.0
+
+    # -- paths (ids are server-generated; never let one escape the root) ---
+
+    @staticmethod
+    def _checked(name: str) -> str:
+        if not name or os.sep in name or name in (".", ".."):
+            raise KeyError(name)
+        return name
+
+    def _dataset_dir(self, dataset_key: str) -> str:
+        return os.path.join(self.root, "datasets", self._checked(dataset_key))
+
+    def _session_file(self, session_id: str) -> str:
+        return os.path.join(self.root, "sessions", self._checked(session_id))
+
+    def _ingest_file(self, session_id: str) -> str:
+        return os.path.join(self.root, "ingest", f"{self._checked(session_id)}.json")
+
+    def _key_for(self, session_id: str) -> str | None:
+        try:
+            with open(self._session_file(session_id)) as f:
+                return f.read().strip()
+        except (KeyError, FileNotFoundError):
+            return None
+
+    @contextlib.contextmanager
+    def _dataset_lock(self, dataset_key: str):
+        """
+        Exclusive lock (across workers) for changing which sessions reference a dataset,
+        so the last detach cannot delete the directory while another worker attaches to it.
+        Keys share 256 lock files (by their first two characters), which are never deleted.
+        """
+        path = os.path.join(self.root, "locks", f"{self._checked(dataset_key)[:2]}.lock")
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # -- public API --------------------------------------------------------
+
+    def put(self, session_id: str, dataset_key: str, dataset: dict) -> None:
+        directory = self._dataset_dir(dataset_key)
+        with self._dataset_lock(dataset_key):
+            os.makedirs(os.path.join(directory, "refs"), exist_ok=True)
+            if isinstance(dataset["df"], ChunkedFrame):
+                # Already on disk (out-of-core): the pickled handle is just its path
+                frame_path = dataset["df"].path
+                meta = dict(dataset)
+            else:
+                frame_path = os.path.join(directory, self.FRAME_FILE)
+                write_frame(dataset["df"], frame_path)
+                meta = {k: v for k, v in dataset.items() if k != "df"}
+            self._write_meta(directory, meta)
+            self._attach(session_id, dataset_key)
+
+        with self._lock:
+            self._remember(dataset_key, {**dataset, "spill_path": frame_path})
+
+    def attach(self, session_id: str, dataset_key: str) -> dict | None:
+        with self._dataset_lock(dataset_key):
+            if not os.path.exists(os.path.join(self._dataset_dir(dataset_key), self.META_FILE)):
+                return None
+            # Once the ref exists, no detach can delete the dataset
+            self._attach(session_id, dataset_key)
+        with self._lock:
+            self.dedup_hits += 1
+        return self._load(dataset_key)
+
+    def get(self, session_id: str) -> dict | None:
+        dataset_key = self._key_for(session_id)
+        entry = self._load(dataset_key) if dataset_key else None
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            # Every worker sees the last use, for expiry
+            os.utime(self._session_file(session_id))
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def peek(self, session_id: str) -> dict | None:
+        dataset_key = self._key_for(session_id)
+        if dataset_key is None:
+            return None
+        with self._lock:
+            entry = self._cache.get(dataset_key)
+        return entry if entry is not None else self._read_meta(dataset_key)
+
+    def append(self, session_id: str, dataset_key: str, new_key: str, rows: pd.DataFrame, updates: dict) -> bool:
+        if self._key_for(session_id) != dataset_key:
+            return False
+        directory = self._dataset_dir(new_key)
+        with self._dataset_lock(new_key):
+            if not os.path.exists(os.path.join(directory, self.META_FILE)):
+                # The session still references the old dataset, so its files stay put
+                meta = self._read_meta(dataset_key)
+                if meta is None or isinstance(meta.get("df"), ChunkedFrame):
+                    return False
+                old_directory = self._dataset_dir(dataset_key)
+                # The previous frame is hard-linked, not copied; only the new rows are written
+                if os.path.exists(os.path.join(old_directory, self.FRAME_FILE)):
+                    previous = [self.FRAME_FILE]
+                else:
+                    previous = meta["parts"]
+                os.makedirs(os.path.join(directory, "refs"), exist_ok=True)
+                parts = []
+                for name in previous:
+                    parts.append(f"part-{len(parts):05d}.arrow")
+                    _link(os.path.join(old_directory, name), os.path.join(directory, parts[-1]))
+                parts.append(f"part-{len(parts):05d}.arrow")
+                write_frame(rows, os.path.join(directory, parts[-1]))
+                self._write_meta(directory, {**meta, **updates, "parts": parts})
+            self._attach(session_id, new_key)
+
+        self._detach(session_id, dataset_key)
+        with self._lock:
+            self.appends += 1
+        return True
+
+    def dataset_path(self, session_id: str) -> str | None:
+        dataset_key = self._key_for(session_id)
+        if dataset_key is None:
+            return None
+        path = os.path.join(self._dataset_dir(dataset_key), self.FRAME_FILE)
+        if os.path.exists(path):
+            return path
+        entry = self._load(dataset_key)
+        return entry["spill_path"] if entry else None
+
+    def delete(self, session_id: str) -> None:
+        dataset_key = self._key_for(session_id)
+        if dataset_key is None:
+            return
+        for path in (self._session_file(session_id), self._ingest_file(session_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._detach(session_id, dataset_key)
+
+    def sweep(self) -> list[str]:
+        cutoff = time.time() - self.ttl_seconds
+        expired = []
+        with os.scandir(os.path.join(self.root, "sessions")) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".tmp") and entry.stat().st_mtime < cutoff:
+                    expired.append(entry.name)
+        # Other workers may sweep at the same time; deleting twice is harmless
+        for session_id in expired:
+            self.delete(session_id)
+        with self._lock:
+            self.expired += len(expired)
+        return expired
+
+    def set_ingest_status(self, session_id: str, status: dict) -> None:
+        path = self._ingest_file(session_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp_path, path)
+
+    def ingest_status(self, session_id: str) -> dict | None:
+        try:
+            path = self._ingest_file(session_id)
+            with open(path) as f:
+                status = json.load(f)
+            # Like IngestJobRegistry: a finished upload's outcome stays readable for a while
+            if status["status"] != "processing" and os.path.getmtime(path) < time.time() - INGEST_JOB_TTL_SECONDS:
+                os.remove(path)
+                return None
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+        return status
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "filesystem",
+                "root": self.root,
+                "cached_datasets": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "dedup_hits": self.dedup_hits,
+                "appends": self.appends,
+                "expired": self.expired,
+                "loads": self.loads,
+                "load_seconds_avg": (self.load_seconds_total / self.loads) if self.loads else 0.0,
+                "load_seconds_max": self.load_seconds_max,
+            }
+
+    # -- internals ---------------------------------------------------------
+
+    def _detach(self, session_id: str, dataset_key: str) -> None:
+        directory = self._dataset_dir(dataset_key)
+        with self._dataset_lock(dataset_key):
+            try:
+                os.remove(os.path.join(directory, "refs", session_id))
+            except FileNotFoundError:
+                pass
+            try:
+                # rmdir only succeeds once no session references the dataset any more
+                os.rmdir(os.path.join(directory, "refs"))
+            except OSError:
+                return
+            meta = self._read_meta(dataset_key)
+            if meta and isinstance(meta.get("df"), ChunkedFrame):
+                meta["df"].remove()
+            with self._lock:
+                self._cache.pop(dataset_key, None)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _attach(self, session_id: str, dataset_key: str) -> None:
+        # Caller holds _dataset_lock(dataset_key)
+        open(os.path.join(self._dataset_dir(dataset_key), "refs", self._checked(session_id)), "w").close()
+        tmp_path = f"{self._session_file(session_id)}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(dataset_key)
+        os.replace(tmp_path, self._session_file(session_id))
+
+    def _write_meta(self, directory: str, meta: dict) -> None:
+        tmp_path = os.path.join(directory, f"{self.META_FILE}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # meta.pkl appears last, so a dataset is only visible once it is complete
+        os.replace(tmp_path, os.path.join(directory, self.META_FILE))
+
+    def _read_meta(self, dataset_key: str) -> dict | None:
+        try:
+            with open(os.path.join(self._dataset_dir(dataset_key), self.META_FILE), "rb") as f:
+                return pickle.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def _load(self, dataset_key: str) -> dict | None:
+        with self._lock:
+            entry = self._cache.get(dataset_key)
+            if entry is not None:
+                self._cache.move_to_end(dataset_key)
+                self.hits += 1
+                return entry
+
+        try:
+            directory = self._dataset_dir(dataset_key)
+            start = time.perf_counter()
+            with open(os.path.join(directory, self.META_FILE), "rb") as f:
+                meta = pickle.load(f)
+            if isinstance(meta.get("df"), ChunkedFrame):
+                entry = {**meta, "spill_path": meta["df"].path}
+            else:
+                frame_path = os.path.join(directory, self.FRAME_FILE)
+                if not os.path.exists(frame_path):
+                    # First load after an append; the parts stay, other workers may be reading them
+                    frames = [read_frame(os.path.join(directory, part)) for part in meta["parts"]]
+                    write_frame(combine_frames(frames), frame_path)
+                entry = {**meta, "df": read_frame(frame_path), "spill_path": frame_path}
+            elapsed = time.perf_counter() - start
+        except (KeyError, FileNotFoundError):
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.loads += 1
+            self.load_seconds_total += elapsed
+            self.load_seconds_max = max(self.load_seconds_max, elapsed)
+            self._remember(dataset_key, entry)
+        logger.info(f"Loaded shared dataset {dataset_key[:12]} in {elapsed:.3f}s")
+        return entry
+
+    def _remember(self, dataset_key: str, entry: dict) -> None:
+        self._cache[dataset_key] = entry
+        self._cache.move_to_end(dataset_key)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+
+def _link(source: str, target: str) -> None:
+    # Hard link (no copy) where the filesystem allows it; replaces a leftover of a failed append
+    try:
+        os.remove(target)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def create_session_backend(kind: str = SESSION_BACKEND) -> SessionBackend:
+    """SESSION_BACKEND=memory (default, single worker) or filesystem (shared by all workers)."""
+    if kind == "memory":
+        return InMemorySessionBackend()
+    if kind == "filesystem":
+        return FileSystemSessionBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND: {kind!r}")
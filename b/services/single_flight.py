@@ -0,0 +1,99 @@
+import asyncio
+import logging
+
+from services.metrics import CHAT_COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------
+# 1. ONE IN-FLIGHT RUN
+# ------------------------------------------------
+
+class Flight:
+    """
+    A run in progress and every event it has produced so far. Subscribers replay from
+    the start, so one that joins late still receives the complete stream.
+    """
+
+    def __init__(self):
+        self.events: list = []
+        self.finished = False
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    async def follow(self):
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > sent or self.finished)
+                pending, finished = self.events[sent:], self.finished
+            sent += len(pending)
+            for event in pending:
+                yield event
+            if finished and sent == len(self.events):
+                return
+
+
+# ------------------------------------------------
+# 2. SINGLE-FLIGHT GROUP (per process, one event loop)
+# ------------------------------------------------
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests: the first one for a key starts the run
+    (`producer()`, an async generator) in its own task, and requests arriving while it
+    is in flight subscribe to the same events instead of starting another. The run does
+    not depend on any single client, so a disconnecting first caller cancels nothing.
+    Once it finishes the key is free again (later repeats are served by the result cache).
+    """
+
+    def __init__(self):
+        self._flights: dict = {}
+        self.runs = 0
+        self.coalesced = 0
+
+    def stream(self, key, producer):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.get_running_loop().create_task(self._run(key, flight, producer))
+            self.runs += 1
+        else:
+            self.coalesced += 1
+            CHAT_COALESCED.inc()
+        flight.subscribers += 1
+        return flight.follow()
+
+    async def _run(self, key, flight: Flight, producer) -> None:
+        try:
+            async for event in producer():
+                await flight.publish(event)
+        except Exception as e:
+            logger.error(f"Coalesced run failed: {e.__class__.__name__}: {e}")
+            await flight.publish({"delta": f"Error: {e.__class__.__name__}: {e}"})
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            await flight.finish()
+            if flight.subscribers > 1:
+                logger.info(f"Coalesced run served {flight.subscribers} requests.")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+        }
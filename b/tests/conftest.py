@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app builds the real model at startup (get_llm), which needs a key; no test talks to the real API
+os.environ.setdefault("GROQ_API_KEY", "test-placeholder")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
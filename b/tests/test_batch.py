@@ -0,0 +1,63 @@
+import asyncio
+
+import pandas as pd
+
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import set_llm
+from services.llm_workflow import run_batch
+
+BROKEN_CODE = "print(df['missing'].sum())"
+
+
+def _state(generated_code: str) -> dict:
+    return {
+        "user_query": "What is the total of the missing column?",
+        "df": pd.DataFrame({"a": [1, 2, 3]}),
+        "dqr_report": "",
+        "code_result": "",
+        "error": "",
+        "generated_code": generated_code,
+        "retries": 0,
+        "dataset_path": "",
+        "stats_index": None,
+        "namespace": None,
+        "namespace_updates": {},
+        "code_hint": "",
+        "hints_given": 0,
+        "result_table": None,
+    }
+
+
+async def _collect(states: list, max_retries: int) -> list:
+    events = []
+    async for index, event in run_batch(states, max_retries=max_retries):
+        events.append((index, event))
+        # A loop that never ends would otherwise hang the test
+        assert len(events) < 100, events
+    return events
+
+
+def test_failing_cached_code_is_regenerated_and_ends_with_error():
+    llm = FakeChatModel(latency=0.0, code=BROKEN_CODE)
+    set_llm(llm)
+    states = [_state(BROKEN_CODE)]
+
+    events = asyncio.run(_collect(states, max_retries=2))
+
+    statuses = [e["status"] for _, e in events if "status" in e]
+    assert statuses.count("executing") == 2  # the cached attempt + one regeneration
+    assert statuses.count("retrying") == 1
+    assert "error" in events[-2][1] and "KeyError" in events[-2][1]["error"]
+    assert events[-1] == (0, {"done": True})
+    assert states[0]["retries"] == 2
+
+
+def test_failing_cached_code_recovers_with_generated_code():
+    set_llm(FakeChatModel(latency=0.0, code="print(df['a'].sum())", answer="The total is 6."))
+    states = [_state(BROKEN_CODE)]
+
+    events = asyncio.run(_collect(states, max_retries=2))
+
+    assert (0, {"delta": "The total is 6."}) in events
+    assert events[-1] == (0, {"done": True})
+    assert not states[0]["error"]
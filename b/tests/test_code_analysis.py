@@ -0,0 +1,57 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.code_analysis import analyze_code
+
+CODE = "out = df.apply(lambda r: r['a'] / r['b'], axis=1)"
+
+
+def _run(code: str, df: pd.DataFrame):
+    env = {"df": df, "pd": pd}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        exec(code, env)
+    return env["out"]
+
+
+def test_row_apply_is_rewritten():
+    analysis = analyze_code(CODE)
+    assert analysis.rewritten
+    assert "df['a'] / df['b']" in analysis.code
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"a": [1, 2, 3], "b": [1, 0, 4]}),
+    pd.DataFrame({"a": [1.5, np.nan], "b": [0.0, 2.0]}),
+    pd.DataFrame({"a": [1, 2], "b": [2, 0]}, dtype=object),
+    pd.DataFrame({"a": [1, 2], "b": [1, 0], "label": ["x", "y"]}),
+    pd.DataFrame({"a": [True, False], "b": [1, 0]}),
+    pd.DataFrame({"a": pd.Series([], dtype="int64"), "b": pd.Series([], dtype="int64")}),
+])
+def test_rewritten_apply_behaves_like_the_original(df):
+    rewritten = analyze_code(CODE).code
+    try:
+        expected = _run(CODE, df)
+    except ZeroDivisionError:
+        with pytest.raises(ZeroDivisionError):
+            _run(rewritten, df)
+        return
+    result = _run(rewritten, df)
+    assert type(result) is type(expected)
+    if isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(result, expected, check_dtype=False)
+    else:
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_only_the_replaced_apply_on_a_line_is_marked_rewritten():
+    code = "out = df.apply(lambda r: r['a'] * 2, axis=1) + df.apply(lambda r: str(r['b']), axis=1)"
+    analysis = analyze_code(code)
+    applies = [f for f in analysis.findings if f.pattern == "row_apply"]
+    assert len(applies) == 2 and applies[0].line == applies[1].line
+    assert [f.rewritten for f in applies] == [True, False]
+    assert analysis.unresolved == [applies[1]]
+    assert "Line 1:" in analysis.hint()
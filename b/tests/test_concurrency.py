@@ -0,0 +1,40 @@
+import time
+import asyncio
+
+import httpx
+
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import set_llm
+
+LATENCY = 0.3
+CHATS = 8
+
+
+async def _concurrent_chats() -> tuple[float, list[str]]:
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        body = "a,b\n" + "\n".join(f"{i},{'xy'[i % 2]}" for i in range(100))
+        response = await client.post("/upload", files={"file": ("data.csv", body, "text/csv")})
+        session_id = response.json()["session_id"]
+
+        async def chat(i: int) -> str:
+            query = f"Which value of b is most common among rows with a above {i}?"
+            response = await client.post("/chat", data={"session_id": session_id, "query": query})
+            return response.text
+
+        start = time.perf_counter()
+        bodies = await asyncio.gather(*(chat(i) for i in range(CHATS)))
+        return time.perf_counter() - start, bodies
+
+
+def test_concurrent_chats_do_not_block_the_event_loop():
+    set_llm(FakeChatModel(latency=LATENCY, code="print(df['b'].mode()[0])", answer="x"))
+
+    elapsed, bodies = asyncio.run(_concurrent_chats())
+
+    assert all('"done"' in body and '"error"' not in body for body in bodies)
+    # Each chat makes two LLM calls (code + answer): 2 * LATENCY alone. Run one after
+    # another, the chats would take CHATS * 2 * LATENCY (4.8s); overlapped, about 0.6s.
+    assert elapsed < CHATS * LATENCY / 2, f"{CHATS} chats took {elapsed:.2f}s"
@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from services.data_quality import profile_dataframe, render_dqr, statistical_sample_size
+
+
+def _legacy_dqr(df: pd.DataFrame) -> str:
+    """The per-column DQR the profiling engine replaced, run on every row."""
+    dqr_list = []
+    df_len = len(df)
+    for col in df.columns:
+        null_count = df[col].isnull().sum()
+        if null_count > 0:
+            dqr_list.append(f"Column '{col}' has {null_count} null/NaN values (out of {df_len} rows).")
+        if df[col].dtype == "object":
+            numeric_ratio = pd.to_numeric(df[col], errors="coerce").notna().sum() / df_len
+            if numeric_ratio > 0.5 and col not in ["Name", "Region"]:
+                dqr_list.append(f"Column '{col}' is object but looks numeric; consider conversion.")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                datetime_count = pd.to_datetime(df[col], errors="coerce").notna().sum()
+            if datetime_count == df_len and col not in ["Name", "Region"]:
+                dqr_list.append(f"Column '{col}' seems to be a datetime column.")
+    return "\n".join(sorted(set(dqr_list))) or "Data appears clean."
+
+
+def _mixed(rows: int, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    kind = rng.choice(4, size=rows, p=[0.55, 0.25, 0.15, 0.05])
+    mixed = np.where(
+        kind == 0, rng.integers(0, 1000, rows).astype(str),
+        np.where(kind == 1, "2024-03-15", np.where(kind == 2, "unknown", None)),
+    )
+    i = np.arange(rows)
+    return pd.DataFrame({
+        "mixed": pd.Series(mixed, dtype=object),
+        "amount": pd.Series([str(v) if v % 4 else "-" for v in i], dtype=object),
+        "day": pd.Series([f"2024-01-{v % 28 + 1:02d}" for v in i], dtype=object),
+        "Name": pd.Series([str(v) for v in i], dtype=object),
+        "score": np.where(i % 9 == 0, np.nan, i * 0.1),
+    })
+
+
+def test_exact_profile_matches_the_legacy_dqr():
+    df = _mixed(2000)
+    df.loc[df.index % 11 == 0, "day"] = None
+    assert render_dqr(profile_dataframe(df, exact=True)) == _legacy_dqr(df)
+    # Without nulls in "day", it is also reported as a datetime column
+    clean = _mixed(2000).drop(columns=["mixed"])
+    assert render_dqr(profile_dataframe(clean, exact=True)) == _legacy_dqr(clean)
+
+
+def test_sampled_ratios_stay_within_the_margin():
+    df = _mixed(100_000)
+    sampled = profile_dataframe(df, exact=False)
+    exact = profile_dataframe(df, exact=True)
+    assert sampled.sample_size == statistical_sample_size(len(df)) < len(df)
+    assert not sampled.exact
+
+    for estimate, truth in zip(sampled.columns, exact.columns):
+        assert abs(estimate.numeric_ratio - truth.numeric_ratio) <= 0.01, estimate.name
+        assert abs(estimate.datetime_ratio - truth.datetime_ratio) <= 0.01, estimate.name
+
+
+def test_null_counts_are_exact_on_a_sampled_profile():
+    df = _mixed(100_000)
+    profile = profile_dataframe(df, exact=False)
+    assert profile.sample_size < len(df)
+    assert [c.null_count for c in profile.columns] == df.isna().sum().tolist()
+
+
+def test_sample_size_bounds():
+    assert statistical_sample_size(0) == 0
+    assert statistical_sample_size(1) == 1
+    assert statistical_sample_size(500) <= 500
+    assert statistical_sample_size(10**9) == statistical_sample_size(10**9 + 1) < 17_000
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from services.data_quality import profile_dataframe
+from services.dtype_optimizer import optimize_dtypes
+
+
+def _frame(rows: int = 2000) -> pd.DataFrame:
+    i = np.arange(rows)
+    return pd.DataFrame({
+        "id": i.astype(np.int64),
+        "price": (i % 50) * 0.25,
+        "ratio": i / 7,
+        "region": pd.Series(["north", "south", "east", "west"] * (rows // 4), dtype=object),
+        "name": pd.Series([f"customer {v}" for v in i], dtype=object),
+        "day": pd.Series([f"2024-03-{v % 28 + 1:02d}" for v in i], dtype=object),
+    })
+
+
+def _optimize(df: pd.DataFrame, **kwargs) -> tuple[pd.DataFrame, dict]:
+    optimized, report = optimize_dtypes(df, profile_dataframe(df, exact=True), **kwargs)
+    return optimized, report.conversions
+
+
+def test_every_conversion_round_trips():
+    df = _frame()
+
+    optimized, conversions = _optimize(df)
+
+    assert set(conversions) == {"id", "price", "region", "name", "day"}
+    assert "category" not in " ".join(conversions.values())
+    for column in ["id", "price", "ratio", "region", "name"]:
+        restored = optimized[column].astype(df[column].dtype)
+        pd.testing.assert_series_equal(restored, df[column])
+    assert optimized["day"].dt.strftime("%Y-%m-%d").tolist() == df["day"].tolist()
+
+
+def test_text_nulls_stay_nulls_that_compare_false():
+    df = pd.DataFrame({"city": pd.Series(["Oslo", None, "Rome"] * 10, dtype=object)})
+
+    optimized, conversions = _optimize(df)
+
+    assert "city" in conversions
+    assert optimized["city"].isna().tolist() == df["city"].isna().tolist()
+    # Filtering on a column with nulls must not raise (an NA mask would)
+    assert len(optimized[optimized["city"] == "Oslo"]) == 10
+
+
+def test_groupby_and_sort_after_a_filter_are_unchanged():
+    df = _frame()
+    optimized, _ = _optimize(df)
+
+    def query(frame: pd.DataFrame):
+        kept = frame[frame["region"] != "west"]
+        counts = kept.groupby("region")["price"].sum()
+        first = kept.sort_values(["region", "id"])["id"].head(5).tolist()
+        return counts.to_dict(), kept["region"].value_counts().to_dict(), first
+
+    assert query(optimized) == query(df)
+
+
+def test_categoricals_are_opt_in_and_capped():
+    df = _frame()
+
+    _, conversions = _optimize(df, max_unique_ratio=0.01, max_unique=1000)
+    assert conversions["region"].endswith("category")
+    assert not conversions["name"].endswith("category")
+
+    # Four regions, but the cap is lower
+    _, conversions = _optimize(df, max_unique_ratio=0.01, max_unique=3)
+    assert not conversions["region"].endswith("category")
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from services.data_quality import profile_dataframe
+from services.fast_path import StatsIndex, try_fast_path
+
+FRAME = pd.DataFrame({
+    "revenue": [10.0, 20.0, 20.0, np.nan, 5.0],
+    "total revenue": [1, 1, 3, 4, 4],
+    "unit_price": [1.5, 2.5, 3.5, 4.5, 5.5],
+    "region": ["north", None, "south", "north", None],
+})
+
+
+@pytest.fixture
+def stats() -> StatsIndex:
+    return StatsIndex(profile_dataframe(FRAME))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("How many rows?", "**5 rows**"),
+    ("How many rows are in the dataset?", "**5 rows**"),
+    ("number of records in this file", "**5 rows**"),
+    ("What's the size of the dataset", "**5 rows**"),
+    ("How many columns does it have?", "**4 columns**"),
+    ("how many columns are there", "**4 columns**"),
+    ("List the columns", "`revenue`, `total revenue`, `unit_price`, `region`"),
+    ("What are the column names?", "`revenue`, `total revenue`, `unit_price`, `region`"),
+    ("what are the data types", "| total revenue | int64 |"),
+    ("Show missing values per column", "| region | 2 |"),
+    ("How many missing values are in region?", "'region' has **2** missing values (out of 5 rows)"),
+    ("how many null values in the revenue column", "'revenue' has **1** missing values"),
+    ("How many unique values in revenue?", "'revenue' has **3** unique values"),
+    ("How many distinct revenue values are there?", "'revenue' has **3** unique values"),
+])
+def test_intents_answer_from_the_stats_index(stats, query, expected):
+    answer = try_fast_path(query, stats, FRAME)
+    assert answer is not None and expected in answer
+
+
+@pytest.mark.parametrize("query, column, unique", [
+    # Contains another column's name
+    ("How many unique values in total revenue?", "total revenue", 3),
+    ("how many distinct values in the total revenue column", "total revenue", 3),
+    ("How many unique values in revenue?", "revenue", 3),
+    # Spaces for underscores, and the other way round
+    ("number of unique values in unit price", "unit_price", 5),
+    ("number of unique values in total_revenue", "total revenue", 3),
+    ("How many unique values in `Region`?", "region", 2),
+])
+def test_column_names_are_resolved(stats, query, column, unique):
+    assert try_fast_path(query, stats, FRAME) == f"The column '{column}' has **{unique}** unique values."
+
+
+@pytest.mark.parametrize("query", [
+    "How many rows where region is north?",
+    "How many rows per region?",
+    "How many unique values in revenue for the north region?",
+    "How many missing values in revenue by region",
+    "How many unique values in cost?",  # no such column
+    "What is the total revenue?",
+])
+def test_filters_and_grouping_fall_through(stats, query):
+    assert try_fast_path(query, stats, FRAME) is None
+
+
+def test_chat_routes_to_code_generation_unless_answered_and_stats_report_the_share():
+    import main
+    from benchmarks.fake_llm import FakeChatModel
+    from config.settings import set_llm
+
+    set_llm(FakeChatModel(latency=0.0, code="print(len(df[df['region'] == 'north']))", answer="Two rows."))
+    client = TestClient(main.app)
+    session_id = client.post("/upload", files={"file": ("a.csv", FRAME.to_csv(index=False))}).json()["session_id"]
+    before = client.get("/stats").json()["fast_path"]
+
+    fast = client.post("/chat", data={"session_id": session_id, "query": "How many columns are there?"}).text
+    slow = client.post("/chat", data={"session_id": session_id, "query": "How many rows are in the north region?"}).text
+
+    assert '"fast_path"' in fast and "**4 columns**" in fast and '"generating"' not in fast
+    assert '"generating"' in slow and '"fast_path"' not in slow
+    after = client.get("/stats").json()["fast_path"]
+    assert (after["routed"] - before["routed"], after["served"] - before["served"]) == (2, 1)
+    assert after["share"] == pytest.approx(after["served"] / after["routed"])
+    assert after["by_intent"]["column_count"] == before["by_intent"].get("column_count", 0) + 1
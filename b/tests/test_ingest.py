@@ -0,0 +1,45 @@
+import io
+import time
+import functools
+
+import pytest
+
+from services.ingest import parse_csv, UploadTooLarge
+
+BODY = b"a,b\n1,2\n3,4\n5,6\n"
+
+
+def test_parse_csv_rejects_rows_over_the_limit():
+    assert len(parse_csv(io.BytesIO(BODY), max_rows=3)) == 3
+    with pytest.raises(UploadTooLarge, match="limit of 2 rows"):
+        parse_csv(io.BytesIO(BODY), max_rows=2)
+
+
+def test_convert_csv_rejects_rows_over_the_limit(tmp_path):
+    from services.out_of_core import convert_csv
+
+    assert len(convert_csv(io.BytesIO(BODY), "k1", header=0, max_rows=3, root=str(tmp_path))) == 3
+    with pytest.raises(UploadTooLarge, match="limit of 2 rows"):
+        convert_csv(io.BytesIO(BODY), "k2", header=0, max_rows=2, root=str(tmp_path))
+    assert list((tmp_path / "k2").iterdir()) == []
+
+
+def test_upload_over_the_row_limit_is_rejected(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "parse_csv", functools.partial(parse_csv, max_rows=2))
+    with TestClient(main.app) as client:
+        response = client.post("/upload", files={"file": ("a.csv", BODY)})
+        assert response.status_code == 413
+        assert "limit of 2 rows" in response.json()["detail"]
+
+        # Background ingest reports the same error through the job status
+        session_id = client.post("/upload", files={"file": ("b.csv", BODY + b"7,8\n")}, data={"background": "yes"}).json()["session_id"]
+        for _ in range(100):
+            status = client.get(f"/upload/{session_id}/status").json()
+            if status["status"] != "processing":
+                break
+            time.sleep(0.05)
+        assert status["status"] == "failed" and "limit of 2 rows" in status["error"]
@@ -0,0 +1,73 @@
+import json
+import time
+import asyncio
+
+import httpx
+
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import set_llm
+from services.ingest import parse_csv, CsvParseError
+from services.ingest_jobs import IngestJobRegistry
+from services.session_store import FileSystemSessionBackend
+
+BODY = "a,b\n" + "\n".join(f"{i},{'xy'[i % 2]}" for i in range(20)) + "\n"
+
+
+def _slow_parse(*args, **kwargs):
+    time.sleep(0.5)
+    return parse_csv(*args, **kwargs)
+
+
+def _failing_parse(*args, **kwargs):
+    raise CsvParseError("bad quoting")
+
+
+async def _upload_on_another_worker(main, session_store) -> list:
+    """Uploads in the background, then reads the session as a worker without the job would."""
+    this_worker = main.ingest_jobs
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        upload = await client.post("/upload", files={"file": ("a.csv", BODY)}, data={"background": "yes"})
+        session_id = upload.json()["session_id"]
+
+        # Same session directory, no job in memory
+        main.ingest_jobs, main.session_store = IngestJobRegistry(), FileSystemSessionBackend(root=session_store.root)
+        try:
+            status = (await client.get(f"/upload/{session_id}/status")).json()
+            chat = await client.post("/chat", data={"session_id": session_id, "query": "Which b is most common?"})
+            events = (await client.get(f"/upload/{session_id}/events")).text
+            final = (await client.get(f"/upload/{session_id}/status")).json()
+        finally:
+            main.ingest_jobs = this_worker
+        return [status, chat, events, final]
+
+
+def test_other_workers_see_a_background_upload(tmp_path, monkeypatch):
+    import main
+
+    session_store = FileSystemSessionBackend(root=str(tmp_path))
+    monkeypatch.setattr(main, "session_store", session_store)
+    monkeypatch.setattr(main, "parse_csv", _slow_parse)
+    set_llm(FakeChatModel(latency=0.0, code="print(df['b'].mode()[0])", answer="x is the most common."))
+
+    status, chat, events, final = asyncio.run(_upload_on_another_worker(main, session_store))
+
+    assert status["status"] == "processing"
+    # The chat waited for the upload instead of answering 404
+    assert chat.status_code == 200 and "common." in chat.text and "error" not in chat.text
+    assert json.loads(events.strip().splitlines()[-1][len("data: "):])["status"] == "ready"
+    assert final["status"] == "ready" and final["result"]["summary"]["rows"] == 20
+
+
+def test_other_workers_see_a_failed_background_upload(tmp_path, monkeypatch):
+    import main
+
+    session_store = FileSystemSessionBackend(root=str(tmp_path))
+    monkeypatch.setattr(main, "session_store", session_store)
+    monkeypatch.setattr(main, "parse_csv", _failing_parse)
+
+    status, chat, _, final = asyncio.run(_upload_on_another_worker(main, session_store))
+
+    assert chat.status_code == 409
+    assert chat.json()["detail"]["message"] == "Upload processing failed"
+    assert final["status"] == "failed" and "bad quoting" in final["error"]
@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from services import metrics
+from services.metrics import Counter, Histogram
+
+
+@pytest.fixture
+def registry():
+    """Metrics created by a test are registered for its duration only."""
+    before = list(metrics._registry)
+    yield
+    metrics._registry[:] = before
+
+
+def test_counter_lines_and_label_escaping(registry):
+    counter = Counter("test_events_total", "Events seen.", ("kind",))
+    counter.inc(kind="plain")
+    counter.inc(2, kind='say "hi"\\now\nnext')
+    counter.inc(kind="plain")
+
+    assert counter.render() == [
+        "# HELP test_events_total Events seen.",
+        "# TYPE test_events_total counter",
+        'test_events_total{kind="plain"} 2',
+        'test_events_total{kind="say \\"hi\\"\\\\now\\nnext"} 2',
+    ]
+
+
+def test_counter_without_labels(registry):
+    counter = Counter("test_plain_total", "Plain.")
+    counter.inc()
+    assert counter.render()[-1] == "test_plain_total 1"
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = Histogram("test_seconds", "Durations.", ("node",), buckets=(1, 0.1, 10))
+    for value in (0.05, 0.1, 0.5, 3, 30):
+        histogram.observe(value, node="n")
+
+    assert histogram.render() == [
+        "# HELP test_seconds Durations.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{node="n",le="0.1"} 2',
+        'test_seconds_bucket{node="n",le="1"} 3',
+        'test_seconds_bucket{node="n",le="10"} 4',
+        'test_seconds_bucket{node="n",le="+Inf"} 5',
+        'test_seconds_sum{node="n"} 33.65',
+        'test_seconds_count{node="n"} 5',
+    ]
+
+
+def test_histogram_series_per_label_value(registry):
+    histogram = Histogram("test_bytes", "Sizes.", ("mode",), buckets=(10,))
+    histogram.observe(5, mode="a")
+    histogram.observe(50, mode="b")
+    lines = histogram.render()
+    assert 'test_bytes_bucket{mode="a",le="10"} 1' in lines
+    assert 'test_bytes_bucket{mode="b",le="10"} 0' in lines
+    assert 'test_bytes_count{mode="b"} 1' in lines
+
+
+def test_metrics_endpoint_serves_the_registry(registry):
+    import main
+
+    Counter("test_endpoint_total", "Endpoint.", ("path",)).inc(path='a"b')
+    Histogram("test_endpoint_seconds", "Endpoint time.", (), buckets=(1,)).observe(0.5)
+
+    response = TestClient(main.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert 'test_endpoint_total{path="a\\"b"} 1' in lines
+    assert 'test_endpoint_seconds_bucket{le="1"} 1' in lines
+    assert 'test_endpoint_seconds_bucket{le="+Inf"} 1' in lines
+    assert "test_endpoint_seconds_sum 0.5" in lines
+    assert "test_endpoint_seconds_count 1" in lines
+    assert "# TYPE chatcsv_node_duration_seconds histogram" in lines
@@ -0,0 +1,83 @@
+import json
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from services.namespace_store import capture_names
+
+CODE = """
+totals = df.groupby("b")["a"].sum()
+threshold = 2
+for i, row in df.iterrows():
+    x = row["a"] * 2
+big = [v for v in df["a"] if v > threshold]
+if len(big):
+    best = max(big)
+values = np.arange(3)
+print(totals)
+"""
+
+
+def test_capture_names_keeps_named_data_and_drops_loop_temporaries():
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "x"]})
+    local_env = {"df": df, "pd": pd, "np": np}
+    exec(CODE, local_env)
+
+    saved = capture_names(local_env, df, CODE)
+
+    assert set(saved) == {"totals", "threshold", "big", "best", "values"}
+
+
+def test_capture_names_keeps_frames_bound_without_a_plain_assignment():
+    df = pd.DataFrame({"a": [1, 2]})
+    code = "print(len(df))"
+    local_env = {"df": df, "pd": pd, "head": df.head(1), "i": 3}
+
+    saved = capture_names(local_env, df, code)
+
+    # `head` was bound some other way (e.g. globals()[...]) but holds a frame; `i` is a stray scalar
+    assert set(saved) == {"head"}
+
+
+async def _saved_variable_chats() -> list[list[dict]]:
+    import httpx
+
+    import main
+    from benchmarks.fake_llm import FakeChatModel
+    from config.settings import set_llm
+
+    def events(body: str) -> list[dict]:
+        return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        body = "a,b\n" + "\n".join(f"{i},{'xy'[i % 2]}" for i in range(30)) + "\n"
+
+        async def chat(session_id: str, query: str, persist: str) -> list[dict]:
+            data = {"session_id": session_id, "query": query, "persistNamespace": persist}
+            return events((await client.post("/chat", data=data)).text)
+
+        session_a = (await client.post("/upload", files={"file": ("a.csv", body)})).json()["session_id"]
+        set_llm(FakeChatModel(latency=0.0, code="top = df.head(7)\nprint(len(top))", answer="Kept 7 rows."))
+        await chat(session_a, "Keep the first rows as top", "yes")
+
+        set_llm(FakeChatModel(latency=0.0, code="print(top['a'].sum())", answer="The sum of a in top is 21."))
+        query = "Describe the saved top selection"
+        runs = [await chat(session_a, query, "yes"), await chat(session_a, query, "yes")]
+
+        # The same data in a session without saved variables
+        session_b = (await client.post("/upload", files={"file": ("b.csv", body)})).json()["session_id"]
+        runs.append(await chat(session_b, query, "no"))
+        return runs
+
+
+def test_answers_from_saved_variables_are_not_cached():
+    first, again, other_session = asyncio.run(_saved_variable_chats())
+
+    assert not any("error" in e for e in first) and {"status": "cached"} not in first
+    # Recomputed from the current `top`, not served from the answer cache
+    assert {"status": "cached"} not in again
+    # Session B has no `top`: its code fails instead of returning session A's answer
+    assert {"status": "cached"} not in other_session
+    assert "Could not resolve" in "".join(e.get("delta", "") for e in other_session)
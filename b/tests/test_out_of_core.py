@@ -0,0 +1,52 @@
+import io
+import os
+
+import pandas as pd
+
+from services.out_of_core import convert_csv, profile_chunked, ROW_GROUP_ROWS
+
+
+def test_profile_sample_covers_the_whole_file(tmp_path):
+    # Text in the first rows, numbers everywhere after: a head-only sample would miss them
+    rows = 20 * ROW_GROUP_ROWS
+    values = ["text"] * ROW_GROUP_ROWS + [str(i) for i in range(rows - ROW_GROUP_ROWS)]
+    body = pd.DataFrame({"id": range(rows), "value": values}).to_csv(index=False).encode()
+
+    frame = convert_csv(io.BytesIO(body), "k1", header=0, root=str(tmp_path))
+    profile, sample = profile_chunked(frame)
+
+    assert frame._parquet().metadata.num_row_groups == 20
+    assert profile.n_rows == rows
+    assert sample["id"].max() > rows // 2
+    value = profile.columns[1]
+    assert value.is_text and 0.8 < value.numeric_ratio < 1.0
+
+
+def test_identical_concurrent_conversions_do_not_collide(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    body = pd.DataFrame({"a": range(200_000), "b": ["x", "y"] * 100_000}).to_csv(index=False).encode()
+
+    def convert(_):
+        return len(convert_csv(io.BytesIO(body), "same-key", header=0, root=str(tmp_path)))
+
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(convert, range(4))) == [200_000] * 4
+
+
+def test_a_failed_conversion_keeps_the_shared_directory(tmp_path):
+    import pytest
+
+    from services.ingest import UploadTooLarge
+
+    body = pd.DataFrame({"a": range(1000)}).to_csv(index=False).encode()
+    frame = convert_csv(io.BytesIO(body), "shared", header=0, root=str(tmp_path))
+
+    # Another upload of the same key fails (here: over the row limit) after the first finished
+    with pytest.raises(UploadTooLarge):
+        convert_csv(io.BytesIO(body), "shared", header=0, max_rows=10, root=str(tmp_path))
+    with pytest.raises(Exception):
+        convert_csv(io.BytesIO(b"a,b\n1,2\n3\n"), "shared", header=0, root=str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path / "shared")) == ["data.parquet"]
+    assert len(frame) == 1000
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from services.cardinality import HyperLogLog
+from services.data_quality import profile_dataframe, merge_profiles
+from services.ingest import conform_rows, SchemaMismatch
+
+
+def _frame(rows: int, start: int = 0) -> pd.DataFrame:
+    i = np.arange(start, start + rows)
+    return pd.DataFrame({
+        "id": i,
+        "price": np.where(i % 7 == 0, np.nan, i * 0.5),
+        "code": pd.Series([str(v) if v % 5 else "n/a" for v in i], dtype=object),
+        "day": pd.Series([f"2024-01-{v % 28 + 1:02d}" if v % 3 else None for v in i], dtype=object),
+    })
+
+
+def test_merged_profile_equals_the_profile_of_the_concatenated_frame():
+    base, extra = _frame(3000), _frame(1200, start=2500)
+    whole = pd.concat([base, extra], ignore_index=True)
+
+    merged = merge_profiles(
+        profile_dataframe(base, exact=True, sketches=True),
+        profile_dataframe(extra, exact=True, sketches=True),
+    )
+    expected = profile_dataframe(whole, exact=True, sketches=True)
+
+    assert merged.n_rows == expected.n_rows
+    for got, want in zip(merged.columns, expected.columns):
+        assert (got.name, got.dtype, got.null_count, got.is_text) == (want.name, want.dtype, want.null_count, want.is_text)
+        assert got.numeric_ratio == pytest.approx(want.numeric_ratio)
+        assert got.datetime_ratio == pytest.approx(want.datetime_ratio)
+        assert np.array_equal(got.distinct.registers, want.distinct.registers)
+
+
+@pytest.mark.parametrize("distinct", [100, 10_000, 200_000])
+def test_hyperloglog_estimate_is_within_the_expected_error(distinct):
+    sketch = HyperLogLog.of(pd.Series(np.arange(distinct)), p=12)
+    # 1.04 / sqrt(4096) = 1.6% standard error; allow three of them
+    assert abs(sketch.estimate() - distinct) <= 3 * 0.0163 * distinct + 1
+
+
+def test_merged_sketches_equal_the_sketch_of_the_union():
+    left = pd.Series(np.arange(0, 60_000))
+    right = pd.Series(np.arange(40_000, 90_000).astype(float))
+
+    merged = HyperLogLog.of(left).merge(HyperLogLog.of(right))
+
+    union = HyperLogLog.of(pd.concat([left.astype(float), right]))
+    assert np.array_equal(merged.registers, union.registers)
+    assert merged.estimate() == union.estimate()
+    with pytest.raises(ValueError):
+        HyperLogLog.of(left, p=10).merge(HyperLogLog.of(right, p=12))
+
+
+def test_conform_rows_rejects_lossy_casts_and_lists_every_problem():
+    target = pd.DataFrame({"n": pd.Series([1, 2], dtype="int64"), "x": [0.5, 1.5], "when": pd.to_datetime(["2024-01-01", "2024-01-02"])})
+    rows = pd.DataFrame({"n": [1.5, 2.0], "x": ["1.0", "abc"], "when": ["2024-02-01", "soon"]})
+
+    with pytest.raises(SchemaMismatch) as raised:
+        conform_rows(rows, list(target.columns), target.dtypes)
+
+    assert len(raised.value.errors) == 3
+    assert [e.split(":")[0] for e in raised.value.errors] == ["column 'n'", "column 'x'", "column 'when'"]
+
+    # Nulls cannot go into a numpy int column; whole floats can
+    with pytest.raises(SchemaMismatch, match="got nulls"):
+        conform_rows(pd.DataFrame({"n": [1.0, None]}), ["n"], target.dtypes[["n"]])
+    conformed = conform_rows(pd.DataFrame({"n": [3.0, 4.0]}), ["n"], target.dtypes[["n"]])
+    assert conformed["n"].dtype == "int64" and conformed["n"].tolist() == [3, 4]
+
+
+@pytest.mark.parametrize("body, problems", [
+    ("b,a\n2,1\n", ["columns are in a different order; expected ['a', 'b']"]),
+    ("a,c\n1,2\n", ["missing columns: ['b']", "unexpected columns: ['c']"]),
+])
+def test_append_with_other_columns_is_rejected_with_every_problem(body, problems):
+    import main
+
+    client = TestClient(main.app)
+    session_id = client.post("/upload", files={"file": ("a.csv", "a,b\n1,2\n3,4\n")}).json()["session_id"]
+
+    response = client.post(f"/upload/{session_id}/append", files={"file": ("rows.csv", body)})
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["errors"] == problems
@@ -0,0 +1,87 @@
+import time
+import asyncio
+
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import set_llm
+from services.llm_workflow import build_workflow, recursion_limit
+from services.metrics import Trace
+from services.result_cache import ResultCache, TTLCache, normalize_query
+from tests.test_batch import BROKEN_CODE, _state
+
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_zero_ttl_never_expires():
+    cache = TTLCache(max_entries=10, ttl_seconds=0)
+    cache.put("k", "v")
+    time.sleep(0.01)
+    assert cache.get("k") == "v"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_normalize_query():
+    assert normalize_query("  How many   ROWS are there?? ") == "how many rows are there"
+    assert normalize_query("Total sales.\n") == normalize_query("total sales!") == "total sales"
+    # Only trailing punctuation is dropped
+    assert normalize_query("a.b?") == "a.b"
+
+
+def test_code_tier_is_shared_by_datasets_with_the_same_schema():
+    cache = ResultCache()
+    cache.put("data-1", "schema", "Total of a?", "print(df['a'].sum())", "It is 6.")
+    assert cache.get_answer("data-1", "total of a")["answer"] == "It is 6."
+    assert cache.get_answer("data-2", "total of a") is None
+    assert cache.get_code("schema", "TOTAL OF A") == "print(df['a'].sum())"
+    assert cache.get_code("other-schema", "total of a") is None
+
+
+GRAPH_NODES = {"fast_path", "generate_code", "analyze_code", "execute_code", "humanize_answer"}
+
+
+def _run_with_cached_code(code: str, max_retries: int = 2) -> tuple[dict, list]:
+    trace = Trace()
+    config = {"recursion_limit": recursion_limit(max_retries), "configurable": {"trace": trace}}
+    state = asyncio.run(build_workflow(max_retries=max_retries, candidates=1).ainvoke(_state(code), config))
+    # Node spans only (executions also add an "exec" span with their resource use)
+    return state, [span["node"] for span in trace.spans if span["node"] in GRAPH_NODES]
+
+
+def test_cached_code_skips_generation():
+    set_llm(FakeChatModel(latency=0.0, code="print('regenerated')", answer="The total is 6."))
+
+    state, nodes = _run_with_cached_code("print(df['a'].sum())")
+
+    assert nodes == ["fast_path", "analyze_code", "execute_code", "humanize_answer"]
+    assert state["generated_code"] == "print(df['a'].sum())"
+    assert state["code_result"] == "The total is 6." and not state["error"]
+
+
+def test_failing_cached_code_falls_back_to_generation():
+    set_llm(FakeChatModel(latency=0.0, code="print(df['a'].sum())", answer="The total is 6."))
+
+    state, nodes = _run_with_cached_code(BROKEN_CODE)
+
+    assert nodes == [
+        "fast_path", "analyze_code", "execute_code",
+        "generate_code", "analyze_code", "execute_code", "humanize_answer",
+    ]
+    assert state["generated_code"] == "print(df['a'].sum())"
+    assert state["code_result"] == "The total is 6." and not state["error"]
+    assert state["retries"] == 1
@@ -0,0 +1,111 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from services import result_tables
+from services.result_tables import ResultTableStore, as_table, save_result
+
+
+def test_plain_row_numbers_are_dropped():
+    table = as_table(pd.DataFrame({"a": [1, 2]}, index=[5, 7]))
+    assert list(table.columns) == ["a"]
+
+
+def test_meaningful_index_becomes_columns():
+    df = pd.DataFrame({"region": ["n", "s", "n"], "kind": ["x", "x", "y"], "sales": [1, 2, 3]})
+
+    by_region = as_table(df.groupby("region")["sales"].sum())
+    assert list(by_region.columns) == ["region", "sales"]
+    assert by_region.values.tolist() == [["n", 4], ["s", 2]]
+
+    by_two = as_table(df.groupby(["region", "kind"]).agg({"sales": ["sum", "max"]}))
+    assert list(by_two.columns) == ["region", "kind", "sales sum", "sales max"]
+
+    labelled = as_table(pd.Series([1, 2], index=["p", "q"]))
+    assert list(labelled.columns) == ["index", "value"]
+
+
+def test_non_tables_are_not_stored(tmp_path):
+    assert as_table(42) is None
+    assert save_result([1, 2], root=str(tmp_path)) is None
+    assert save_result(pd.DataFrame({"a": []}), root=str(tmp_path)) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultTableStore(root=str(tmp_path), ttl_seconds=60, max_bytes=0)
+
+
+def _save(store: ResultTableStore, rows: int = 10):
+    return save_result(pd.DataFrame({"n": range(rows), "sq": [i * i for i in range(rows)]}), root=store.root)
+
+
+def test_pages_are_bounded(store, monkeypatch):
+    table = _save(store)
+
+    page = store.page(table.id, offset=8, limit=5)
+    assert page["rows"] == [[8, 64], [9, 81]] and page["total_rows"] == 10
+
+    past_end = store.page(table.id, offset=50, limit=5)
+    assert past_end["rows"] == [] and past_end["total_rows"] == 10
+
+    assert store.page(table.id, offset=-3, limit=1)["offset"] == 0
+
+    monkeypatch.setattr(result_tables, "RESULT_PAGE_MAX_ROWS", 4)
+    capped = store.page(table.id, offset=0, limit=1000)
+    assert capped["limit"] == 4 and len(capped["rows"]) == 4
+
+
+@pytest.mark.parametrize("table_id", ["../secrets", "ABCDEF" * 6, "0" * 31, "0" * 32 + ".arrow", ""])
+def test_ids_outside_the_pattern_are_rejected(store, table_id):
+    _save(store)
+    assert store.page(table_id) is None
+    assert not store.exists(table_id)
+
+
+def test_sweep_expires_old_tables(store):
+    old, new = _save(store), _save(store)
+    hour_ago = time.time() - 3600
+    os.utime(os.path.join(store.root, f"{old.id}.arrow"), (hour_ago, hour_ago))
+
+    store.sweep()
+
+    assert not store.exists(old.id) and store.exists(new.id)
+    assert store.stats()["expired"] == 1
+
+
+def test_sweep_evicts_the_oldest_tables_over_the_size_cap(store):
+    tables = [_save(store) for _ in range(3)]
+    for age, table in zip((30, 20, 10), tables):
+        mtime = time.time() - age
+        os.utime(os.path.join(store.root, f"{table.id}.arrow"), (mtime, mtime))
+    size = os.path.getsize(os.path.join(store.root, f"{tables[0].id}.arrow"))
+    store.max_bytes = 2 * size
+
+    store.sweep()
+
+    assert [store.exists(t.id) for t in tables] == [False, True, True]
+    assert store.stats()["evicted"] == 1
+
+
+def test_expired_table_returns_404(store, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "result_tables", store)
+    table = _save(store)
+    client = TestClient(main.app)
+
+    response = client.get(f"/results/{table.id}", params={"offset": 0, "limit": 3})
+    assert response.status_code == 200
+    assert response.json()["rows"] == [[0, 0], [1, 1], [2, 4]]
+
+    hour_ago = time.time() - 3600
+    os.utime(os.path.join(store.root, f"{table.id}.arrow"), (hour_ago, hour_ago))
+    store.sweep()
+
+    assert client.get(f"/results/{table.id}").status_code == 404
+    assert client.get("/results/not-a-table-id").status_code == 404
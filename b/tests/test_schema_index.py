@@ -0,0 +1,27 @@
+import pandas as pd
+
+from services.data_quality import profile_dataframe
+from services.schema_index import SchemaIndex
+
+
+def _index(df: pd.DataFrame) -> SchemaIndex:
+    return SchemaIndex.build(df, profile_dataframe(df))
+
+
+def test_short_column_names_match_whole_words_only():
+    df = pd.DataFrame({"a": [1, 2], "id": [3, 4], "provider": ["x", "y"], "total revenue": [5.0, 6.0]})
+    index = _index(df)
+
+    # "a" is inside "What"/"payable", "id" inside "provider"/"paid": neither is mentioned
+    assert index.rank("What was the total revenue paid per provider?") == [3, 2]
+    assert index.rank("Count rows by id") == [1]
+    assert index.rank("Show a histogram") == [0]
+
+
+def test_multi_word_names_match_as_a_phrase():
+    df = pd.DataFrame({"revenue": [1.0], "totalRevenue": [2.0], "cost": [3.0]})
+    index = _index(df)
+
+    ranked = index.rank("Plot the total revenue by month")
+    assert ranked[0] == 1
+    assert 2 not in ranked
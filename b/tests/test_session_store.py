@@ -0,0 +1,131 @@
+import os
+import time
+
+import pandas as pd
+
+from services.session_store import InMemorySessionBackend, frame_nbytes
+
+
+def _frame(rows: int, start: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({"a": range(start, start + rows), "b": [float(i) for i in range(rows)]})
+
+
+def test_append_charges_a_shared_frame_once(tmp_path):
+    store = InMemorySessionBackend(budget_bytes=0, spill_dir=str(tmp_path))
+    base, rows = _frame(1000), _frame(10, start=1000)
+    store.put("s1", "k1", {"df": base})
+    store.attach("s2", "k1")
+
+    assert store.append("s1", "k1", "k2", rows, {})
+    # s2 still holds the old dataset; the new one only adds the appended rows
+    assert store.stats()["resident_bytes"] == frame_nbytes(base) + frame_nbytes(rows)
+
+    # Reading combines the parts into a copy of its own, charged to the new dataset
+    assert len(store.get("s1")["df"]) == 1010
+    assert store.stats()["resident_bytes"] == 2 * frame_nbytes(base) + frame_nbytes(rows)
+
+    store.delete("s2")
+    assert store.stats()["resident_bytes"] == frame_nbytes(base) + frame_nbytes(rows)
+
+
+def test_append_moves_the_frame_of_the_only_session(tmp_path):
+    store = InMemorySessionBackend(budget_bytes=0, spill_dir=str(tmp_path))
+    base, rows = _frame(1000), _frame(10, start=1000)
+    store.put("s1", "k1", {"df": base})
+
+    assert store.append("s1", "k1", "k2", rows, {})
+    assert store.stats()["datasets"] == 1
+    assert store.stats()["resident_bytes"] == frame_nbytes(base) + frame_nbytes(rows)
+    assert not store.append("s1", "k1", "k3", rows, {})
+
+
+def test_filesystem_attach_waits_for_the_last_detach(tmp_path):
+    import threading
+
+    from services.session_store import FileSystemSessionBackend
+
+    # Two backends on one directory stand in for two workers
+    first, second = (FileSystemSessionBackend(root=str(tmp_path), cache_entries=0) for _ in range(2))
+    first.put("s1", "k1", {"df": _frame(10)})
+    outcome = {}
+
+    def attach():
+        try:
+            outcome["attached"] = second.attach("s2", "k1")
+        except Exception as e:
+            outcome["error"] = e
+
+    read_meta = first._read_meta
+
+    def read_meta_while_another_worker_attaches(dataset_key):
+        # The last detach has removed refs/ and is about to delete the dataset
+        thread = threading.Thread(target=attach)
+        thread.start()
+        thread.join(timeout=0.5)
+        outcome["blocked"] = thread.is_alive()
+        outcome["thread"] = thread
+        return read_meta(dataset_key)
+
+    first._read_meta = read_meta_while_another_worker_attaches
+    first.delete("s1")
+    outcome["thread"].join()
+
+    assert outcome["blocked"]
+    assert "error" not in outcome
+    # The dataset is gone, so the upload re-ingests it instead of attaching
+    assert outcome["attached"] is None
+    assert os.listdir(tmp_path / "datasets") == []
+
+
+def test_upload_status_does_not_load_the_frame(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.session_store import FileSystemSessionBackend
+
+    monkeypatch.setattr(main, "session_store", FileSystemSessionBackend(root=str(tmp_path), cache_entries=0))
+    client = TestClient(main.app)
+    session_id = client.post("/upload", files={"file": ("a.csv", "a,b\n1,2\n")}).json()["session_id"]
+
+    for _ in range(3):
+        assert client.get(f"/upload/{session_id}/status").json()["status"] == "ready"
+    assert main.session_store.stats()["loads"] == 0
+    assert client.get("/upload/unknown/status").status_code == 404
+
+
+def test_idle_sessions_expire_with_their_files(tmp_path):
+    from services.session_store import FileSystemSessionBackend
+
+    memory = InMemorySessionBackend(budget_bytes=1, spill_dir=str(tmp_path / "spill"), ttl_seconds=60, sweep_interval=0)
+    shared = FileSystemSessionBackend(root=str(tmp_path / "shared"), ttl_seconds=60, sweep_interval=0)
+    for store in (memory, shared):
+        store.put("idle", "k-idle", {"df": _frame(100)})
+        store.put("busy", "k-busy", {"df": _frame(100, start=100)})
+        store.dataset_path("idle")
+
+    # "idle" was last used an hour ago
+    an_hour_ago = time.time() - 3600
+    os.utime(shared._session_file("idle"), (an_hour_ago, an_hour_ago))
+    memory._last_used["idle"] = an_hour_ago
+    for store in (memory, shared):
+        store.get("busy")
+
+    assert "k-idle.arrow" in os.listdir(tmp_path / "spill")
+    assert memory.maybe_sweep() == ["idle"]
+    assert shared.maybe_sweep() == ["idle"]
+
+    assert memory.get("idle") is None and memory.get("busy") is not None
+    assert "k-idle.arrow" not in os.listdir(tmp_path / "spill")
+    assert shared.get("idle") is None and shared.get("busy") is not None
+    assert os.listdir(tmp_path / "shared" / "datasets") == ["k-busy"]
+    assert os.listdir(tmp_path / "shared" / "sessions") == ["busy"]
+    assert memory.stats()["expired"] == shared.stats()["expired"] == 1
+
+
+def test_sessions_do_not_expire_without_a_ttl(tmp_path):
+    store = InMemorySessionBackend(spill_dir=str(tmp_path), ttl_seconds=0)
+    store.put("s1", "k1", {"df": _frame(10)})
+    store._last_used["s1"] -= 10 ** 9
+
+    assert store.maybe_sweep() == []
+    assert store.get("s1") is not None
@@ -0,0 +1,154 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+
+import config.settings as settings
+from benchmarks.stub_llm_server import StubLLMServer
+
+CODE = "print(df['b'].mode()[0])"
+ANSWER = "The most common value of b is x."
+
+
+@pytest.fixture
+def stub():
+    """The real (pooled) ChatGroq client, pointed at a local stub of the Groq API."""
+    server = StubLLMServer(latency=0.3, code=CODE, answer=ANSWER).start()
+    previous_url, previous_llm = settings.LLM_BASE_URL, getattr(settings.get_llm, "_llm", None)
+    settings.LLM_BASE_URL = server.url
+    if previous_llm is not None:
+        del settings.get_llm._llm
+    yield server
+    settings.LLM_BASE_URL = previous_url
+    if hasattr(settings.get_llm, "_llm"):
+        del settings.get_llm._llm
+    server.stop()
+
+
+def _run(coroutine):
+    """Runs the test body, then closes the pooled client on the same event loop it used."""
+    async def body():
+        try:
+            return await coroutine
+        finally:
+            await settings.aclose_llm()
+    return asyncio.run(body())
+
+
+def _answer(body: str) -> str:
+    events = [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+    return "".join(event.get("delta", "") for event in events)
+
+
+async def _upload(client: httpx.AsyncClient, body: str) -> str:
+    response = await client.post("/upload", files={"file": ("data.csv", body, "text/csv")})
+    return response.json()["session_id"]
+
+
+async def _chats(requests: list[tuple[int, str, str]], datasets: int = 1) -> list[str]:
+    """POSTs (dataset, query, persistNamespace) chats concurrently; returns the SSE bodies."""
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        sessions = [
+            await _upload(client, "a,b\n" + "\n".join(f"{i},{'xy'[i % 2 or d % 2]}" for i in range(50 + d)))
+            for d in range(datasets)
+        ]
+
+        async def chat(dataset: int, query: str, persist: str) -> str:
+            response = await client.post(
+                "/chat", data={"session_id": sessions[dataset], "query": query, "persistNamespace": persist}
+            )
+            return response.text
+
+        return await asyncio.gather(*(chat(*request) for request in requests))
+
+
+def test_identical_chats_share_one_run(stub):
+    import main
+    coalesced = main.chat_flights.coalesced
+
+    bodies = _run(_chats([(0, "Which value of b is most common?", "")] * 8))
+
+    # One run: one code-generation call and one answer call for all eight chats
+    assert stub.stats()["requests"] == 2
+    assert main.chat_flights.coalesced - coalesced == 7
+    # Every subscriber receives the complete stream, not just the events after it joined
+    assert len(set(bodies)) == 1
+    assert _answer(bodies[0]) == ANSWER and '"done": true' in bodies[0]
+
+
+def test_different_queries_and_datasets_are_not_coalesced(stub):
+    import main
+    coalesced = main.chat_flights.coalesced
+
+    requests = [(0, f"Which value of b is most common below row {i}?", "") for i in range(3)]
+    requests += [(d, "Which value of b is most common in the file?", "") for d in range(3)]
+    bodies = _run(_chats(requests, datasets=3))
+
+    assert stub.stats()["requests"] == 2 * len(requests)
+    assert main.chat_flights.coalesced == coalesced
+    assert all('"done": true' in body for body in bodies)
+
+
+def test_sessions_with_saved_variables_are_not_coalesced(stub):
+    import main
+    coalesced = main.chat_flights.coalesced
+
+    # Two uploads of the same file: one dataset, but each session has its own variables
+    async def run() -> list[str]:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            body = "a,b\n1,x\n2,y\n3,x\n"
+            sessions = [await _upload(client, body) for _ in range(2)]
+            responses = await asyncio.gather(*(
+                client.post("/chat", data={"session_id": s, "query": "Most common b with my variables?", "persistNamespace": "yes"})
+                for s in sessions
+            ))
+            return [r.text for r in responses]
+
+    _run(run())
+
+    assert stub.stats()["requests"] == 4
+    assert main.chat_flights.coalesced == coalesced
+
+
+def test_pooled_client_is_reused_and_closed(stub):
+    llm = settings.get_llm()
+    client = llm.http_async_client
+    assert isinstance(client, httpx.AsyncClient)
+
+    async def calls():
+        for _ in range(3):
+            await settings.get_llm().ainvoke("Say hello.")
+        assert settings.get_llm() is llm and llm.http_async_client is client
+        assert not client.is_closed
+        await settings.aclose_llm()
+
+    asyncio.run(calls())
+
+    # Keep-alive: three sequential requests over a single connection
+    assert stub.stats() == {"requests": 3, "connections": 1, "max_concurrent": 1}
+    assert client.is_closed
+    assert llm.http_client.is_closed
+
+
+def test_a_second_lifespan_gets_a_model_with_open_clients(stub):
+    from benchmarks.fake_llm import FakeChatModel
+
+    first = settings.get_llm()
+    asyncio.run(settings.aclose_llm())
+    assert first.http_async_client.is_closed
+
+    second = settings.get_llm()
+    assert second is not first
+    assert not second.http_async_client.is_closed and not second.http_client.is_closed
+    asyncio.run(settings.aclose_llm())
+
+    # A model set with set_llm() has no pooled clients and survives shutdown
+    fake = FakeChatModel(latency=0.0)
+    settings.set_llm(fake)
+    asyncio.run(settings.aclose_llm())
+    assert settings.get_llm() is fake
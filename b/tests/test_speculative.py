@@ -0,0 +1,33 @@
+import os
+import asyncio
+
+from benchmarks.fake_llm import FakeChatModel
+from config.settings import set_llm, RESULT_TABLE_DIR
+from services.llm_workflow import make_speculative_node
+from tests.test_batch import _state
+
+TABLE_CODE = "result = df.assign(b=df['a'] * 2)\nprint(f'{len(result)} rows')"
+
+
+def _tables() -> set:
+    try:
+        return {name for name in os.listdir(RESULT_TABLE_DIR) if name.endswith(".arrow")}
+    except FileNotFoundError:
+        return set()
+
+
+async def _speculate(candidates: int) -> dict:
+    result = await make_speculative_node(candidates)(_state(""))
+    # Let executions still running when the winner was chosen finish
+    await asyncio.sleep(0.5)
+    return result
+
+
+def test_only_the_winning_candidate_keeps_its_table():
+    set_llm(FakeChatModel(latency=0.0, code=TABLE_CODE))
+    before = _tables()
+
+    result = asyncio.run(_speculate(4))
+
+    assert not result["error"]
+    assert _tables() - before == {f"{result['result_table'].id}.arrow"}
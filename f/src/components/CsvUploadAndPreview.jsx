@@ -1,5 +1,33 @@
 import React, { useState, useRef } from "react";
 import { Upload, Send, Loader2, CheckCircle } from "lucide-react";
+import { API_BASE } from "../config";
+
+const STAGE_LABELS = {
+  queued: "Queued",
+  parsing: "Parsing",
+  profiling: "Profiling columns",
+  optimizing: "Optimizing memory",
+  indexing: "Indexing schema",
+  storing: "Saving session",
+};
+
+// Follows a background upload until it is ready (or failed) and returns its final status.
+const waitForUpload = (sessionId, onProgress) =>
+  new Promise((resolve, reject) => {
+    const events = new EventSource(`${API_BASE}/upload/${sessionId}/events`);
+    events.onmessage = (evt) => {
+      const status = JSON.parse(evt.data);
+      onProgress(status);
+      if (status.status === "ready" || status.status === "failed") {
+        events.close();
+        resolve(status);
+      }
+    };
+    events.onerror = (err) => {
+      events.close();
+      reject(err);
+    };
+  });
 
 const CsvUploadAndPreview = ({
   onDataProcessed,          // parent receives preview / backend result
@@ -15,6 +43,7 @@ const CsvUploadAndPreview = ({
   const [file, setFile] = useState(null);
   const [hasHeader, setHasHeader] = useState("yes");
   const [showModal, setShowModal] = useState(false);
+  const [progress, setProgress] = useState(null);
   const inputRef = useRef(null);
 
   const parseCSV = (text) => {
@@ -74,17 +103,21 @@ const CsvUploadAndPreview = ({
     formData.append("file", file);
     formData.append("hasHeader", hasHeader);
     formData.append("headerRowIndex", headerRowIndex);
+    // Parse/profile in the background; progress arrives over SSE
+    formData.append("background", "yes");
 
     try {
-      const res = await fetch(
-        "https://chatcsv-production-c7d2.up.railway.app/upload",
-        {
-          method: "POST",
-          body: formData,
-        }
-      );
+      const res = await fetch(`${API_BASE}/upload`, {
+        method: "POST",
+        body: formData,
+      });
+
+      let data = await res.json();
 
-      const data = await res.json();
+      if (data.status === "processing") {
+        const final = await waitForUpload(data.session_id, setProgress);
+        data = final.status === "ready" ? final.result : final;
+      }
 
       if (data.status === "ready") {
         onDataProcessed({
@@ -97,11 +130,12 @@ const CsvUploadAndPreview = ({
         console.log("CSV preprocessing done!");
         setShowModal(false);
       } else {
-        console.error("Preprocessing failed.");
+        console.error("Preprocessing failed.", data.error || data.detail || "");
       }
     } catch (err) {
       console.error("Preprocess error:", err);
     } finally {
+      setProgress(null);
       onStopProcessing?.(); // disable spinner
     }
   };
@@ -272,7 +306,16 @@ const CsvUploadAndPreview = ({
             </div>
 
             {/* Preprocess Button */}
-            <div className="mt-4 flex justify-end">
+            <div className="mt-4 flex justify-end items-center gap-4">
+              {progress && (
+                <span className="text-sm text-gray-500 dark:text-gray-400">
+                  {STAGE_LABELS[progress.stage] || progress.stage}
+                  {progress.stage === "parsing" &&
+                    ` ${Math.round(progress.parse_progress * 100)}%`}
+                  {progress.rows != null &&
+                    ` · ${progress.rows.toLocaleString()} rows`}
+                </span>
+              )}
               <button
                 onClick={handlePreprocess}
                 disabled={isProcessing}
@@ -1,11 +1,27 @@
 import React, { useState, useEffect, useCallback, useRef, memo } from 'react';
-import { SendHorizonal, Maximize2, X, Copy, Check } from 'lucide-react';
+import { SendHorizonal, Maximize2, X, Copy, Check, History } from 'lucide-react';
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 import rehypeRaw from "rehype-raw";
+import ResultTable from './ResultTable';
+import { API_BASE } from '../config';
 
-const ChatInput = memo(({ prompt, setPrompt, isEnabled, isLoading, onSubmit }) => (
+const ChatInput = memo(({ prompt, setPrompt, isEnabled, isLoading, onSubmit, rememberVariables, setRememberVariables }) => (
   <form onSubmit={onSubmit} className="flex items-center space-x-2 w-full text-gray-100">
+    {/* Opt-in: keep variables between turns so follow-up questions can reuse earlier work */}
+    <button
+      type="button"
+      onClick={() => setRememberVariables(!rememberVariables)}
+      disabled={!isEnabled || isLoading}
+      title={rememberVariables ? "Follow-ups reuse earlier variables (click to turn off)" : "Let follow-ups reuse earlier variables"}
+      aria-pressed={rememberVariables}
+      className={`p-2 w-10 h-10 flex items-center justify-center rounded-full transition cursor-pointer disabled:cursor-not-allowed disabled:opacity-50 ${
+        rememberVariables ? "bg-indigo-600 text-white" : "bg-gray-700 text-gray-300 hover:bg-gray-600"
+      }`}
+    >
+      <History className="w-4 h-4" />
+    </button>
+
     <input
       type="text"
       placeholder={isEnabled ? 'Ask a question...' : 'Upload CSV first.'}
@@ -69,6 +85,7 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
   const [prompt, setPrompt] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [isExpanded, setIsExpanded] = useState(false);
+  const [rememberVariables, setRememberVariables] = useState(false);
   const chatEndRef = useRef(null);
 
   const scrollToBottom = useCallback(() => {
@@ -90,8 +107,11 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
       const formData = new FormData();
       formData.append('session_id', sessionId);
       formData.append('query', userMessage);
+      if (rememberVariables) {
+        formData.append('persistNamespace', 'yes');
+      }
 
-      const res = await fetch('https://chatcsv-production-c7d2.up.railway.app/chat', {
+      const res = await fetch(`${API_BASE}/chat`, {
         method: 'POST',
         body: formData,
       });
@@ -103,30 +123,44 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
         const reader = res.body.getReader();
         const decoder = new TextDecoder();
         let done = false;
+        let buffer = '';
 
         // Placeholder for LLM response
-        setChatHistory((prev) => [...prev, { role: 'ai', content: '' }]);
+        setChatHistory((prev) => [...prev, { role: 'ai', content: '', status: 'thinking' }]);
+
+        const updateLast = (fn) =>
+          setChatHistory((prev) => {
+            const updated = [...prev];
+            updated[updated.length - 1] = fn(updated[updated.length - 1]);
+            return updated;
+          });
 
         while (!done) {
           const { value, done: readerDone } = await reader.read();
           done = readerDone;
-          const chunk = decoder.decode(value);
+          // Events can be split across reads; keep the incomplete tail for the next one
+          buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+          const events = buffer.split('\n\n');
+          buffer = events.pop();
 
-          chunk.split('\n\n').forEach((line) => {
+          events.forEach((line) => {
             if (line.startsWith('data:')) {
               try {
                 const payload = JSON.parse(line.replace('data:', '').trim());
+                if (payload.status) {
+                  // Progress: generating / executing / retrying / answering
+                  updateLast((last) => ({ ...last, status: payload.status }));
+                }
                 if (payload.delta) {
-                  setChatHistory((prev) => {
-                    const updated = [...prev];
-                    const last = updated[updated.length - 1];
-                    const delta = payload.delta.trim();
-                    // Avoid duplication
-                    if (!last.content.endsWith(delta)) {
-                      last.content += delta;
-                    }
-                    return updated;
-                  });
+                  // Token-level deltas: append as-is (whitespace is significant)
+                  updateLast((last) => ({ ...last, content: last.content + payload.delta }));
+                }
+                if (payload.table) {
+                  // Large table result: shown below the answer, rows fetched page by page
+                  updateLast((last) => ({ ...last, table: payload.table }));
+                }
+                if (payload.done) {
+                  updateLast((last) => ({ ...last, status: null }));
                 }
               } catch (err) {
                 console.warn('Bad JSON chunk:', line);
@@ -183,11 +217,16 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
             >
               {msg.role === 'ai' && <CopyButton text={msg.content} />}
 
+              {msg.role === 'ai' && msg.status && (
+                <p className="text-xs italic text-gray-500 animate-pulse">{msg.status}...</p>
+              )}
+
               <div className="max-h-60 overflow-y-auto pr-6 mr-7">
                 <ReactMarkdown remarkPlugins={[remarkGfm]} rehypePlugins={[rehypeRaw]}>
                   {msg.content}
                 </ReactMarkdown>
               </div>
+              {msg.table && <ResultTable table={msg.table} />}
             </div>
           </div>
         ))}
@@ -200,6 +239,8 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
         isEnabled={isEnabled}
         isLoading={isLoading}
         onSubmit={handleSubmit}
+        rememberVariables={rememberVariables}
+        setRememberVariables={setRememberVariables}
       />
 
       {!isEnabled && <p className="mt-2 text-red-500 text-xs italic">Upload a CSV to enable chat.</p>}
@@ -230,6 +271,7 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
                         {msg.content}
                       </ReactMarkdown>
                     </div>
+                    {msg.table && <ResultTable table={msg.table} />}
                   </div>
                 </div>
               ))}
@@ -241,6 +283,8 @@ const QuestionBox = ({ isEnabled, chatHistory, setChatHistory, sessionId }) => {
                 isEnabled={isEnabled}
                 isLoading={isLoading}
                 onSubmit={handleSubmit}
+                rememberVariables={rememberVariables}
+                setRememberVariables={setRememberVariables}
               />
             </div>
           </div>
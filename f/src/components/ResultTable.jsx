@@ -0,0 +1,98 @@
+import React, { useState, useEffect } from "react";
+import { ChevronLeft, ChevronRight, Loader2 } from "lucide-react";
+import { API_BASE } from "../config";
+
+const PAGE_SIZE = 50;
+
+// Full table a chat answer returned; rows are fetched from the server one page at a time.
+const ResultTable = ({ table }) => {
+  const [offset, setOffset] = useState(0);
+  const [page, setPage] = useState(null);
+  const [error, setError] = useState(null);
+  const [isLoading, setIsLoading] = useState(false);
+
+  useEffect(() => {
+    let cancelled = false;
+    setIsLoading(true);
+    fetch(`${API_BASE}/results/${table.id}?offset=${offset}&limit=${PAGE_SIZE}`)
+      .then((res) => {
+        if (!res.ok) throw new Error(res.status === 404 ? "This table has expired." : `HTTP ${res.status}`);
+        return res.json();
+      })
+      .then((data) => {
+        if (!cancelled) {
+          setPage(data);
+          setError(null);
+        }
+      })
+      .catch((err) => !cancelled && setError(err.message))
+      .finally(() => !cancelled && setIsLoading(false));
+    return () => {
+      cancelled = true;
+    };
+  }, [table.id, offset]);
+
+  const total = page?.total_rows ?? table.rows;
+  const last = Math.min(offset + PAGE_SIZE, total);
+
+  if (error) {
+    return <p className="mt-2 text-xs italic text-red-500">⚠️ {error}</p>;
+  }
+
+  return (
+    <div className="mt-3">
+      <div className="overflow-x-auto max-h-80 rounded-lg border border-gray-200">
+        <table className="min-w-full divide-y divide-gray-200">
+          <thead className="bg-indigo-100 sticky top-0">
+            <tr>
+              {(page?.columns || table.columns).map((col, i) => (
+                <th
+                  key={i}
+                  className="px-4 py-2 text-left text-xs font-medium text-indigo-700 uppercase tracking-wider"
+                >
+                  {col}
+                </th>
+              ))}
+            </tr>
+          </thead>
+          <tbody className="bg-white divide-y divide-gray-200">
+            {(page?.rows || []).map((row, rowIndex) => (
+              <tr key={offset + rowIndex} className="hover:bg-gray-50">
+                {row.map((cell, cellIndex) => (
+                  <td key={cellIndex} className="px-4 py-2 whitespace-nowrap text-sm text-gray-600">
+                    {cell === null ? "" : String(cell)}
+                  </td>
+                ))}
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      </div>
+
+      <div className="mt-2 flex items-center justify-end gap-2 text-xs text-gray-500">
+        {isLoading && <Loader2 className="w-3 h-3 animate-spin" />}
+        <span>
+          Rows {total ? offset + 1 : 0}–{last} of {total.toLocaleString()}
+        </span>
+        <button
+          onClick={() => setOffset(Math.max(0, offset - PAGE_SIZE))}
+          disabled={offset === 0 || isLoading}
+          className="p-1 rounded hover:bg-gray-200 disabled:opacity-40 cursor-pointer disabled:cursor-not-allowed"
+          title="Previous page"
+        >
+          <ChevronLeft className="w-4 h-4" />
+        </button>
+        <button
+          onClick={() => setOffset(offset + PAGE_SIZE)}
+          disabled={last >= total || isLoading}
+          className="p-1 rounded hover:bg-gray-200 disabled:opacity-40 cursor-pointer disabled:cursor-not-allowed"
+          title="Next page"
+        >
+          <ChevronRight className="w-4 h-4" />
+        </button>
+      </div>
+    </div>
+  );
+};
+
+export default ResultTable;
@@ -0,0 +1,2 @@
+// Backend the components talk to; set VITE_API_BASE (e.g. in .env.local) to point at a local server.
+export const API_BASE = import.meta.env.VITE_API_BASE || "https://chatcsv-production-c7d2.up.railway.app";